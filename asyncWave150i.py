@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version asyncio de initAndParkWave150i / parkAxis.
+
+Un seul thread, une boucle d'événements: les deux axes (et plusieurs
+montures si besoin) sont pilotés par des coroutines lancées avec
+asyncio.gather, le polling de statut se fait avec asyncio.sleep.
+
+Les clients gardent le contrat de send_and_recv: (ok, resp, err).
+
+usage: python asyncWave150i.py [--iface [USB, UDP]] [--driver [INDI, SynScan]]
+"""
+
+import asyncio
+import getopt
+import sys
+from typing import Optional, Tuple
+
+import serial
+
+import mountCodec
+import parkAxis
+from initAndParkWave150i import Connection, safe_encode, axis_of
+from parkAxis import set_cmd, TestStatus, axisParam
+
+
+def _stale(data, expected: Optional[int]) -> bool:
+    """
+    Réponse '=' d'une autre longueur que celle attendue (mountCodec.reply_length):
+    réponse tardive d'une commande précédente, à ignorer.
+    """
+    if expected is None:
+        return False
+    ok, resp = mountCodec.decode_reply(data, len(data))
+    return ok and len(resp) != expected
+
+
+# ----------------------------
+# UDP client asyncio: un endpoint par axe
+# ----------------------------
+class _AxisProtocol(asyncio.DatagramProtocol):
+    """Endpoint UDP d'un axe; une seule commande en vol à la fois."""
+
+    def __init__(self):
+        self.transport = None
+        self.waiter: Optional[asyncio.Future] = None
+        self.expected: Optional[int] = None     # longueur de la réponse attendue
+        self.lock = asyncio.Lock()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.waiter is not None and not self.waiter.done() \
+                and not _stale(data, self.expected):
+            self.waiter.set_result(data)
+        # sinon: réponse tardive, ignorée
+
+    def error_received(self, exc):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(exc)
+
+
+class AsyncUDPClient:
+    """
+    Client UDP asyncio. Chaque axe a son propre endpoint, les commandes
+    de deux axes différents se recouvrent sur le réseau.
+    Créer avec: client = await AsyncUDPClient.create(conn)
+    """
+
+    def __init__(self, conn):
+        self.host = conn.MOUNT_IP
+        self.port = conn.MOUNT_PORT
+        self.timeout = conn.DEFAULT_TIMEOUT
+        self.retries = conn.DEFAULT_RETRIES
+        self.inter_cmd_delay = conn.INTER_CMD_DELAY
+        self.verbose = True
+        self._endpoints = {}
+
+    @classmethod
+    async def create(cls, conn):
+        return cls(conn)
+
+    async def _endpoint(self, axis: str) -> _AxisProtocol:
+        proto = self._endpoints.get(axis)
+        if proto is None:
+            loop = asyncio.get_running_loop()
+            _, proto = await loop.create_datagram_endpoint(
+                _AxisProtocol, local_addr=("0.0.0.0", 0))
+            # une autre coroutine a pu créer l'endpoint pendant l'await
+            if axis in self._endpoints:
+                proto.transport.close()
+                proto = self._endpoints[axis]
+            else:
+                self._endpoints[axis] = proto
+        return proto
+
+    async def send_and_recv(self, cmd: str, expect_response: bool = True
+                            ) -> Tuple[bool, Optional[str], Optional[str]]:
+        payload = safe_encode(cmd)
+        proto = await self._endpoint(axis_of(cmd))
+        loop = asyncio.get_running_loop()
+        last_err = ""
+        async with proto.lock:
+            proto.expected = mountCodec.reply_length(payload)
+            for attempt in range(1, self.retries + 1):
+                proto.waiter = loop.create_future()
+                try:
+                    proto.transport.sendto(payload, (self.host, self.port))
+                    if not expect_response:
+                        return True, None, ""
+                    data = await asyncio.wait_for(proto.waiter, self.timeout)
+                except asyncio.TimeoutError:
+                    last_err = f"timeout (attempt {attempt}/{self.retries})"
+                    continue
+                except OSError as e:
+                    last_err = f"OSError: {e}"
+                    break
+                finally:
+                    proto.waiter = None
+                ok, resp = mountCodec.decode_reply(data, len(data))
+                if ok:
+                    if self.verbose:
+                        print("=" + resp)
+                    return True, resp, ""
+                return False, None, ""
+        return False, None, last_err
+
+    async def close(self):
+        for proto in self._endpoints.values():
+            proto.transport.close()
+        self._endpoints.clear()
+
+
+# ----------------------------
+# USB-Serial client asyncio
+# ----------------------------
+class AsyncSerialClient:
+    """
+    Client série asyncio: le descripteur du port est surveillé par la
+    boucle d'événements (add_reader), les réponses sont découpées sur '\\r'.
+    """
+
+    def __init__(self, conn):
+        self.timeout = conn.DEFAULT_TIMEOUT
+        self.retries = conn.DEFAULT_RETRIES
+        self.inter_cmd_delay = conn.INTER_CMD_DELAY
+        self.verbose = True
+        self.ser = serial.Serial(port=conn.MOUNT_PORT,
+                                 baudrate=conn.MOUNT_BAUDRATE,
+                                 timeout=0)
+        self._buf = bytearray()
+        self._waiter: Optional[asyncio.Future] = None
+        self._expected: Optional[int] = None    # longueur de la réponse attendue
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def create(cls, conn):
+        self = cls(conn)
+        asyncio.get_running_loop().add_reader(self.ser.fileno(), self._on_readable)
+        return self
+
+    def _on_readable(self):
+        self._buf += self.ser.read(self.ser.in_waiting or 1)
+        while b"\r" in self._buf:
+            line, _, rest = self._buf.partition(b"\r")
+            self._buf = bytearray(rest)
+            if self._waiter is not None and not self._waiter.done() \
+                    and not _stale(line, self._expected):
+                self._waiter.set_result(bytes(line))
+            # sinon: réponse tardive, ignorée
+
+    async def send_and_recv(self, cmd: str, expect_response: bool = True
+                            ) -> Tuple[bool, Optional[str], Optional[str]]:
+        payload = safe_encode(cmd)
+        loop = asyncio.get_running_loop()
+        last_err = ""
+        async with self._lock:
+            self._expected = mountCodec.reply_length(payload)
+            for attempt in range(1, self.retries + 1):
+                self._waiter = loop.create_future()
+                try:
+                    self.ser.write(payload)
+                    if not expect_response:
+                        return True, None, ""
+                    data = await asyncio.wait_for(self._waiter, self.timeout)
+                except asyncio.TimeoutError:
+                    last_err = f"timeout (attempt {attempt}/{self.retries})"
+                    continue
+                except Exception as e:
+                    last_err = f"<error: {e}>"
+                    break
+                finally:
+                    self._waiter = None
+                ok, resp = mountCodec.decode_reply(data, len(data))
+                if ok:
+                    if self.verbose:
+                        print("=" + resp)
+                    return True, resp, ""
+                return False, None, ""
+        return False, None, last_err
+
+    async def close(self):
+        asyncio.get_running_loop().remove_reader(self.ser.fileno())
+        self.ser.close()
+
+
+# ----------------------------
+# Séquences d'initialisation et de parking (coroutines)
+# ----------------------------
+async def wait_for_status(client, cmd, status, distance=None, timeout=None):
+    """Version asyncio de parkAxis.wait_for_status (même PollScheduler)."""
+    sched = parkAxis.PollScheduler(cmd, distance, timeout, client)
+    cmd = set_cmd(cmd)
+    ok, resp, err = await client.send_and_recv(cmd)
+    while not (ok and TestStatus(resp, status)):
+        if sched.expired():
+            raise TimeoutError(f"{cmd}: status {status} not reached after "
+                               f"{sched.elapsed():.1f} s")
+        await asyncio.sleep(sched.next_delay())
+        ok, resp, err = await client.send_and_recv(cmd)
+    if status == "Stopped":
+        sched.done()
+
+
+async def init_mount(driver, client):
+    """Version asyncio de parkAxis.init_mount: les deux axes en parallèle."""
+
+    async def init_axis(axis):
+        cmd = set_cmd(f":f{axis}")
+        ok, resp, err = await client.send_and_recv(cmd)
+        if not ok:
+            print(f'axis {axis} does not answer: {err}')
+            return False
+        if not TestStatus(resp, "NotInit"):
+            return True
+        print(f'Initialize axis {axis}')
+        failed = []
+        for cmd in parkAxis.init_commands(axis, driver):
+            ok, _, err = await client.send_and_recv(set_cmd(cmd))
+            if not ok:
+                failed.append(cmd)
+        if failed:
+            print(f'init commands failed: {" ".join(failed)}')
+            return False
+        # declared motor Initialized ?
+        ok, resp, err = await client.send_and_recv(set_cmd(f":f{axis}"))
+        if not ok or not TestStatus(resp, "InitDone"):
+            print(f'axis {axis} not initialized: {resp} {err}')
+            return False
+        return True
+
+    return all(await asyncio.gather(init_axis("1"), init_axis("2")))
+
+
+class AsyncParkContext(parkAxis.ParkContext):
+    """
+    ParkContext dont les envois sont rendus au moteur (parkAxis.Send):
+    les étapes de parkAxis.PARK_STEPS tournent telles quelles, park_axis
+    fait les envois et les attentes avec des coroutines.
+    """
+
+    def send(self, cmd):
+        cmd = set_cmd(cmd)
+        # copie: le tampon des gotos (mountCodec.encode_goto) est par thread,
+        # donc partagé entre les coroutines des deux axes
+        return (yield parkAxis.Send(cmd if isinstance(cmd, str) else bytes(cmd)))
+
+
+async def resolve_wait(client, wait):
+    """Version asyncio de parkAxis.block_on: envoie wait.cmd jusqu'à wait.done()."""
+    ok, resp, err = await client.send_and_recv(set_cmd(wait.cmd))
+    while not wait.done(ok, resp):
+        wait.check_timeout()
+        await asyncio.sleep(wait.next_delay())
+        ok, resp, err = await client.send_and_recv(wait.cmd)
+    return wait.resp
+
+
+async def park_axis(client, driver, name, params=None, plan=None):
+    """
+    Version asyncio de parkAxis.park_axis: même plan, mêmes étapes
+    (parkAxis.run_plan), les Send et Wait qu'elles rendent sont résolus ici.
+    """
+    params = params or axisParam[name]
+    ctx = AsyncParkContext(client, name, driver, params)
+    steps = parkAxis.run_plan(ctx, plan or params.get("plan") or parkAxis.PARK_PLAN)
+    print(f'start {name}')
+    result = None
+    while True:
+        try:
+            op = steps.send(result)
+        except StopIteration:
+            return ctx
+        if isinstance(op, parkAxis.Wait):
+            result = await resolve_wait(client, op)
+        else:
+            result = await client.send_and_recv(op.cmd)
+
+
+async def axis1(client, driver, name="Axis1"):
+    await park_axis(client, driver, name)
+    await asyncio.sleep(1.)
+
+
+async def axis2(client, driver, name="Axis2"):
+    await park_axis(client, driver, name)
+
+
+# ----------------------------
+# programme principal
+# ----------------------------
+async def run(conn, iface, driver):
+    if iface == "UDP":
+        client = await AsyncUDPClient.create(conn)
+    else:
+        client = await AsyncSerialClient.create(conn)
+    try:
+        print("[INIT] Démarrage initialisation...")
+        if not await init_mount(driver, client):
+            print("[MAIN] Initialisation échouée -> arrêt.")
+            return False
+        print("[INIT] Initialisation terminée avec succès.")
+        await asyncio.gather(axis1(client, driver), axis2(client, driver))
+        print("[MAIN] Parking terminé.")
+        return True
+    finally:
+        await client.close()
+
+
+def main():
+    driver = "SynScan"
+    iface = "UDP"
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "d:i:", ["driver=", "iface="])
+    except getopt.GetoptError:
+        raise ValueError(f"usage: {sys.argv[0]} [--driver [INDI, SynScan]][--iface [UDP, USB]]")
+    for opt, arg in opts:
+        if opt in ("-d", "--driver"):
+            driver = arg
+        if opt in ("-i", "--iface"):
+            iface = arg
+
+    conn = Connection(iface)
+    try:
+        asyncio.run(run(conn, iface, driver))
+    except KeyboardInterrupt:
+        print("[MAIN] Ctrl-C reçu -> arrêt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banc de mesure: durée de l'initialisation et du parking, débit de commandes.
+
+Par défaut chaque scénario tourne contre un simulateur local neuf
+(simulWave150i); --host/--port permet de viser une autre monture.
+Scénarios:
+    init    run_initialization (parkAxis.init_mount)
+    park    parking des deux axes (park_axes -> parkAxis.axis1 / axis2)
+    plan    parking des deux axes planifié dans un thread (plan_park -> parkAxis.park_both)
+    replay  rejeu d'un fichier de commandes comme piloteDepuisFichierWave150
+    replay_fast  même fichier en mode --fast (pipeliné, CSV en tâche de fond)
+    raw     boucle de send_and_recv sur les deux axes en parallèle
+Pour chaque scénario: temps total, RTT par commande (percentiles),
+nombre de réémissions, temps passé dans time.sleep. Sortie en JSON.
+
+usage: python benchWave150i.py [--scenarios init,park,replay,raw] [--client udp|pipeline]
+                               [--out bench.json] [--speedup k] [--latency s] ...
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import parkAxis
+import piloteDepuisFichierWave150 as replay
+from initAndParkWave150i import (Connection, PipelinedUDPClient, make_client,
+                                 run_initialization, park_axes, plan_park)
+from simulWave150i import MountSimulator
+
+
+# ----------------------------
+# Mesures
+# ----------------------------
+def percentiles(values, ps=(50, 90, 99)) -> dict:
+    """Percentiles (en ms) d'une liste de durées en secondes."""
+    if not values:
+        return {}
+    v = sorted(values)
+    out = {f"p{p}": round(v[min(len(v) - 1, int(round(p / 100 * (len(v) - 1))))] * 1e3, 3)
+           for p in ps}
+    out["mean"] = round(sum(v) / len(v) * 1e3, 3)
+    out["max"] = round(v[-1] * 1e3, 3)
+    return out
+
+
+class TimedClient:
+    """
+    Enveloppe un client et chronomètre chaque send_and_recv (et submit, si
+    le client l'a: les polls d'un client pipeliné restent pipelinés). Les
+    autres attributs (inter_cmd_delay, metrics, verbose, ...) sont ceux
+    du client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.rtts = []
+        self.failures = 0
+        self._lock = threading.Lock()
+        if hasattr(client, "submit"):
+            self.submit = self._submit
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        if name == "verbose":
+            self.client.verbose = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def _count(self, dt, ok):
+        with self._lock:
+            self.rtts.append(dt)
+            if not ok:
+                self.failures += 1
+
+    def _submit(self, cmd, expect_response=True, **kw):
+        t0 = time.perf_counter()
+        fut = self.client.submit(cmd, expect_response, **kw)
+        fut.add_done_callback(lambda f: self._count(time.perf_counter() - t0, f.result()[0]))
+        return fut
+
+    def send_and_recv(self, cmd, expect_response=True):
+        t0 = time.perf_counter()
+        res = self.client.send_and_recv(cmd, expect_response)
+        self._count(time.perf_counter() - t0, res[0])
+        return res
+
+    def send_batch(self, cmds, window=1):
+        if not hasattr(self.client, "send_batch"):
+            return [self.send_and_recv(c) for c in cmds]
+        t0 = time.perf_counter()
+        results = self.client.send_batch(cmds, window)
+        # lot pipeliné: on n'observe que la durée totale, répartie par commande
+        dt = (time.perf_counter() - t0) / max(1, len(cmds))
+        with self._lock:
+            self.rtts += [dt] * len(cmds)
+            self.failures += sum(1 for r in results if not r[0])
+        return results
+
+    def close(self):
+        self.client.close()
+
+
+class SleepMeter:
+    """
+    Compte le temps d'attente (tous threads) pendant le bloc: time.sleep,
+    et parkAxis.pause, qui attend sur le stop_event des workers de
+    parking (une attente dans pause n'est comptée qu'une fois).
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._orig = time.sleep
+        self._orig_pause = parkAxis.pause
+        self._inside = threading.local()
+
+    def _timed(self, fn, *args):
+        if getattr(self._inside, "on", False):
+            return fn(*args)
+        self._inside.on = True
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._inside.on = False
+            with self._lock:
+                self.total += time.perf_counter() - t0
+                self.calls += 1
+
+    def _sleep(self, s):
+        self._timed(self._orig, s)
+
+    def _pause(self, delay, what, stop_event=None):
+        self._timed(self._orig_pause, delay, what, stop_event)
+
+    def __enter__(self):
+        time.sleep = self._sleep
+        parkAxis.pause = self._pause
+        return self
+
+    def __exit__(self, *exc):
+        time.sleep = self._orig
+        parkAxis.pause = self._orig_pause
+        return False
+
+
+# ----------------------------
+# Scénarios
+# ----------------------------
+class Target:
+    """Monture visée: simulateur neuf par scénario, ou adresse fournie."""
+
+    def __init__(self, args):
+        self.args = args
+        self.sim = None
+
+    def __enter__(self):
+        a = self.args
+        if a.host:
+            self.host, self.port = a.host, a.port
+        else:
+            self.sim = MountSimulator(port=0, latency=a.latency, jitter=a.jitter,
+                                      loss=a.loss, speedup=a.speedup, seed=a.seed).start()
+            self.host, self.port = "127.0.0.1", self.sim.port
+        return self
+
+    def requests(self):
+        return self.sim.requests if self.sim else None
+
+    def __exit__(self, *exc):
+        if self.sim:
+            self.sim.stop()
+        return False
+
+
+def _client(target, args):
+    conn = Connection("UDP", host=target.host, port=target.port)
+    conn.DEFAULT_TIMEOUT = args.timeout
+    return TimedClient(make_client(conn, args.client == "pipeline"))
+
+
+def _result(wall, rtts, commands, sleep, target, failures=0):
+    sent = target.requests()
+    return {
+        "wall_s": round(wall, 4),
+        "commands": commands,
+        "cmd_per_s": round(commands / wall, 1) if wall > 0 else None,
+        "rtt_ms": percentiles(rtts),
+        "failures": failures,
+        # réémissions vues du simulateur (requêtes reçues - commandes)
+        "retries": None if sent is None else max(0, sent - commands),
+        "sleep_s": round(sleep.total, 4),
+        "sleep_calls": sleep.calls,
+    }
+
+
+def bench_init(args):
+    with Target(args) as target:
+        client = _client(target, args)
+        try:
+            with SleepMeter() as sleep:
+                t0 = time.perf_counter()
+                ok = run_initialization(args.driver, client)
+                wall = time.perf_counter() - t0
+        finally:
+            client.close()
+        res = _result(wall, client.rtts, len(client.rtts), sleep, target, client.failures)
+        res["ok"] = ok
+        return res
+
+
+def bench_park(args, park=park_axes):
+    with Target(args) as target:
+        client = _client(target, args)
+        try:
+            run_initialization(args.driver, client)
+            client.rtts.clear()
+            n0 = target.requests()
+            with SleepMeter() as sleep:
+                t0 = time.perf_counter()
+                errors = park(args.driver, client, threading.Event())
+                wall = time.perf_counter() - t0
+        finally:
+            client.close()
+        res = _result(wall, client.rtts, len(client.rtts), sleep, target, client.failures)
+        if n0 is not None:
+            res["retries"] = max(0, target.requests() - n0 - len(client.rtts))
+        res["ok"] = not errors
+        res["errors"] = errors
+        return res
+
+
+def _default_cmdfile(n):
+    lines = []
+    for i in range(n // 4):
+        lines += [":f1<cr>", ":X10003<cr>", ":f2<cr>", ":X20003<cr>"]
+    return replay.load_commands_from_lines(lines)
+
+
+def bench_replay(args):
+    if args.cmdfile:
+        commands = replay.load_commands(args.cmdfile)
+    else:
+        commands = _default_cmdfile(args.n)
+    with Target(args) as target:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("", 0))
+        rtts, fails = [], 0
+        try:
+            with SleepMeter() as sleep:
+                t0 = time.perf_counter()
+                for kind, val, raw in commands:
+                    if kind == "WAIT":
+                        time.sleep(float(val))
+                        continue
+                    ok, resp, rtt, err = replay.send_and_recv(
+                        sock, target.host, target.port, val.encode("ascii"),
+                        args.timeout, 2)
+                    if ok:
+                        rtts.append(rtt)
+                    else:
+                        fails += 1
+                wall = time.perf_counter() - t0
+        finally:
+            sock.close()
+        return _result(wall, rtts, len(rtts) + fails, sleep, target, fails)
+
+
+def bench_replay_fast(args):
+    if args.cmdfile:
+        commands = replay.load_commands(args.cmdfile)
+    else:
+        commands = _default_cmdfile(args.n)
+    steps = replay.compile_commands(commands)
+    with Target(args) as target:
+        conn = Connection("UDP", host=target.host, port=target.port)
+        conn.DEFAULT_TIMEOUT = args.timeout
+        client = PipelinedUDPClient(conn, window=args.window)
+        client.verbose = False
+        log = replay.CsvLogWriter(Path(os.devnull))
+        log.start()
+        try:
+            with SleepMeter() as sleep:
+                res = replay.replay_fast(steps, client, log, args.window)
+        finally:
+            log.close()
+            client.close()
+        return _result(res["wall_s"], res["rtts"], res["sent"], sleep, target, res["failed"])
+
+
+def bench_raw(args):
+    with Target(args) as target:
+        client = _client(target, args)
+        cmds = {"1": (":f1", ":X10003"), "2": (":f2", ":X20003")}
+
+        def loop(axis):
+            for i in range(args.n // 2):
+                client.send_and_recv(cmds[axis][i % 2])
+
+        try:
+            with SleepMeter() as sleep:
+                t0 = time.perf_counter()
+                threads = [threading.Thread(target=loop, args=(a,)) for a in "12"]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                wall = time.perf_counter() - t0
+        finally:
+            client.close()
+        return _result(wall, client.rtts, len(client.rtts), sleep, target, client.failures)
+
+
+def bench_plan(args):
+    return bench_park(args, plan_park)
+
+
+SCENARIOS = {"init": bench_init, "park": bench_park, "plan": bench_plan,
+             "replay": bench_replay, "replay_fast": bench_replay_fast, "raw": bench_raw}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Banc de mesure init/parking/débit.")
+    p.add_argument("--scenarios", default="init,park,replay,raw",
+                   help="Liste de scénarios séparés par des virgules")
+    p.add_argument("--client", choices=["udp", "pipeline"], default="udp",
+                   help="ThreadSafeUDPClient ou PipelinedUDPClient [def: udp]")
+    p.add_argument("--driver", default="SynScan", choices=["INDI", "SynScan"])
+    p.add_argument("--host", help="Monture réelle/externe (sinon simulateur local)")
+    p.add_argument("--port", type=int, default=11880)
+    p.add_argument("--timeout", type=float, default=1.0, help="Timeout client (s)")
+    p.add_argument("--n", type=int, default=2000,
+                   help="Nombre de commandes pour raw/replay [def: 2000]")
+    p.add_argument("--cmdfile", type=Path, help="Fichier de commandes pour replay")
+    p.add_argument("--window", type=int, default=8,
+                   help="replay_fast: commandes en vol au plus [def: 8]")
+    p.add_argument("--latency", type=float, default=0.002, help="Simulateur: latence (s)")
+    p.add_argument("--jitter", type=float, default=0.0, help="Simulateur: gigue (s)")
+    p.add_argument("--loss", type=float, default=0.0, help="Simulateur: perte [0-1]")
+    p.add_argument("--speedup", type=float, default=50.0,
+                   help="Simulateur: accélération des mouvements [def: 50]")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", type=Path, help="Fichier JSON de résultats (sinon stdout)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in names if s not in SCENARIOS]
+    if unknown:
+        print(f"[ERREUR] scénario inconnu: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    parkAxis.DEBUG = False
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "client": args.client,
+            "target": f"{args.host}:{args.port}" if args.host else "simulator",
+            "simulator": None if args.host else {
+                "latency": args.latency, "jitter": args.jitter,
+                "loss": args.loss, "speedup": args.speedup},
+        },
+        "results": {},
+    }
+    for name in names:
+        print(f"[BENCH] {name}...", file=sys.stderr)
+        # les clients tracent chaque réponse: on coupe stdout pendant la mesure
+        with contextlib.redirect_stdout(io.StringIO()):
+            report["results"][name] = SCENARIOS[name](args)
+        r = report["results"][name]
+        print(f"[BENCH] {name}: {r['wall_s']} s, {r['commands']} commandes, "
+              f"p50 {r['rtt_ms'].get('p50')} ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
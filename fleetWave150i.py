@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Initialisation et parking de plusieurs montures en parallèle.
+
+Chaque monture de l'inventaire passe par run_initialization puis le
+parking des deux axes (park_axes, ou plan_park avec --planner: un seul
+thread par monture), dans un pool de threads borné.
+Un rapport par monture (durées, succès, erreur) est affiché à la fin,
+et peut être écrit en JSON.
+
+Inventaire: une monture par ligne (ou par argument), '#' = commentaire
+    192.168.4.1                  # UDP, port 11880
+    192.168.1.21:11880 INDI      # UDP, driver propre à cette monture
+    /dev/ttyUSB0                 # USB (port série)
+    /dev/ttyUSB1@115200          # USB, débit du port série
+    127.0.0.1:11881              # monture simulée sur la boucle locale
+
+Avec --discover, les montures trouvées par mountDiscovery (diffusion
+UDP sur --subnet, ports série USB) s'ajoutent à l'inventaire.
+
+usage: python fleetWave150i.py [--driver D] [--workers N] [--pipeline] [--planner]
+                               [--inventory FILE] [--discover] [--subnet NET ...]
+                               [--json FILE] [mount ...]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import parkAxis
+import mountDiscovery
+import mountState
+from initAndParkWave150i import (Connection, make_client, run_initialization, park_axes,
+                                 plan_park)
+
+
+class MountSpec:
+    """Une entrée de l'inventaire."""
+
+    def __init__(self, address: str, driver: str, baud: int = None):
+        self.address = address
+        self.driver = driver
+        self.baud = baud
+        if address.startswith("/dev/") or address.upper().startswith("COM"):
+            self.iface = "USB"
+            port, _, rate = address.partition("@")
+            self.host, self.port = None, port
+            if rate:
+                self.baud = int(rate)
+        else:
+            self.iface = "UDP"
+            host, _, port = address.partition(":")
+            self.host, self.port = host, int(port) if port else None
+
+    def connection(self) -> Connection:
+        return Connection(self.iface, host=self.host, port=self.port, baud=self.baud)
+
+
+def parse_inventory(lines, default_driver):
+    mounts = []
+    for ln, raw in enumerate(lines, start=1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if len(parts) > 2:
+            raise ValueError(f"Ligne {ln}: entrée d'inventaire invalide -> {raw}")
+        driver = parts[1] if len(parts) == 2 else default_driver
+        mounts.append(MountSpec(parts[0], driver))
+    return mounts
+
+
+def run_mount(spec: MountSpec, pipeline: bool, stop_event: threading.Event,
+              state=None, rehome=False, planner=False) -> dict:
+    """Initialise puis parque une monture; renvoie son rapport."""
+    report = {"mount": spec.address, "iface": spec.iface, "driver": spec.driver,
+              "ok": False, "init_s": None, "park_s": None, "total_s": None,
+              "error": ""}
+    t0 = time.perf_counter()
+    client = None
+    try:
+        client = make_client(spec.connection(), pipeline)
+        client.verbose = parkAxis.DEBUG     # --quiet: réponses non tracées
+        if state is not None and rehome:
+            state.invalidate(client)
+        if not run_initialization(spec.driver, client, state):
+            report["error"] = "initialisation échouée"
+            return report
+        t1 = time.perf_counter()
+        report["init_s"] = round(t1 - t0, 3)
+        park = plan_park if planner else park_axes
+        errors = park(spec.driver, client, stop_event, state)
+        report["park_s"] = round(time.perf_counter() - t1, 3)
+        report["ok"] = not errors
+        report["error"] = "; ".join(errors)
+    except Exception as e:
+        report["error"] = repr(e)
+    finally:
+        if client is not None:
+            client.close()
+        report["total_s"] = round(time.perf_counter() - t0, 3)
+    return report
+
+
+def run_fleet(mounts, workers: int = 4, pipeline: bool = False,
+              state=None, rehome=False, planner=False) -> list:
+    """Traite toutes les montures avec au plus `workers` en parallèle."""
+    stop_event = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(run_mount, m, pipeline, stop_event, state, rehome, planner)
+                   for m in mounts]
+        try:
+            return [f.result() for f in futures]
+        except KeyboardInterrupt:
+            print("[FLEET] Ctrl-C reçu -> arrêt...")
+            stop_event.set()
+            for f in futures:
+                f.cancel()
+            raise
+
+
+def print_report(reports, wall_s):
+    print(f"\n{'monture':<24}{'iface':<6}{'init(s)':>9}{'park(s)':>9}{'total(s)':>10}  résultat")
+    for r in reports:
+        init_s = "-" if r["init_s"] is None else f"{r['init_s']:.2f}"
+        park_s = "-" if r["park_s"] is None else f"{r['park_s']:.2f}"
+        status = "OK" if r["ok"] else f"ECHEC {r['error']}"
+        print(f"{r['mount']:<24}{r['iface']:<6}{init_s:>9}{park_s:>9}{r['total_s']:>10.2f}  {status}")
+    n_ok = sum(r["ok"] for r in reports)
+    print(f"[FLEET] {n_ok}/{len(reports)} montures parquées en {wall_s:.2f} s")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Initialisation et parking de plusieurs montures en parallèle.")
+    p.add_argument("mounts", nargs="*", help="host[:port] ou port série")
+    p.add_argument("--inventory", type=Path, help="Fichier inventaire des montures")
+    p.add_argument("--driver", default="SynScan", choices=["INDI", "SynScan"],
+                   help="Driver par défaut [def: SynScan]")
+    p.add_argument("--workers", type=int, default=4,
+                   help="Nombre de montures traitées en parallèle [def: 4]")
+    p.add_argument("--pipeline", action="store_true",
+                   help="UDP: un socket par axe (PipelinedUDPClient)")
+    p.add_argument("--planner", action="store_true",
+                   help="Parking des deux axes planifié dans un seul thread (plan_park)")
+    p.add_argument("--discover", action="store_true",
+                   help="Ajouter les montures trouvées par mountDiscovery (UDP et série)")
+    p.add_argument("--subnet", action="append",
+                   help=f"Sous-réseau exploré par --discover (répétable) "
+                        f"[def: {' '.join(mountDiscovery.SUBNETS)}]")
+    p.add_argument("--json", type=Path, help="Écrire le rapport en JSON")
+    p.add_argument("--state", type=Path, default=mountState.STATE_PATH,
+                   help="Fichier d'état des montures (repère codeur connu)")
+    p.add_argument("--rehome", action="store_true",
+                   help="Ignorer l'état mémorisé: homing complet")
+    p.add_argument("--quiet", action="store_true", help="Ne pas tracer les commandes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    lines = list(args.mounts)
+    if args.inventory:
+        lines += args.inventory.read_text(encoding="utf-8").splitlines()
+    try:
+        mounts = parse_inventory(lines, args.driver)
+    except ValueError as e:
+        print(f"[ERREUR] Inventaire: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.discover:
+        found = mountDiscovery.discover(args.subnet or mountDiscovery.SUBNETS)
+        known = {(getattr(c, "MOUNT_IP", None), c.MOUNT_PORT)
+                 for c in (m.connection() for m in mounts)}
+        mounts += [MountSpec(f.address, args.driver, f.baud) for f in found
+                   if (f.host, f.port) not in known]
+        print(f"[FLEET] Découverte: {', '.join(f.address for f in found) or 'aucune monture'}")
+    if not mounts:
+        print("[ERREUR] Aucune monture dans l'inventaire", file=sys.stderr)
+        sys.exit(1)
+    if args.quiet:
+        parkAxis.DEBUG = False
+
+    t0 = time.perf_counter()
+    state = mountState.MountStateCache(args.state)
+    reports = run_fleet(mounts, args.workers, args.pipeline, state, args.rehome,
+                        args.planner)
+    wall_s = time.perf_counter() - t0
+    print_report(reports, wall_s)
+    if args.json:
+        args.json.write_text(json.dumps({"wall_s": round(wall_s, 3), "mounts": reports},
+                                        indent=2), encoding="utf-8")
+    sys.exit(0 if all(r["ok"] for r in reports) else 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,20 @@ Traitement des erreurs incomplet
 TODO: error management
 """
 
+import select
 import socket
+import selectors
 import serial
 import threading
 import time
-from typing import Optional, Tuple, Callable
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Tuple, Callable, Union
+import mountCache
+import mountCodec
+import mountMetrics
+import mountRtt
+import mountState
 import parkAxis
 import sys
 import getopt
@@ -28,13 +37,14 @@ import getopt
 #
 # =================================================================
 class Connection:
-    def __init__(self, iface):
+    def __init__(self, iface, host=None, port=None, baud=None):
     # ----------------------------
     # Configuration UDP / temps
     # ----------------------------
+        self.iface = iface
         if iface == "UDP":           
-            self.MOUNT_IP = "192.168.4.1"   # adapter
-            self.MOUNT_PORT = 11880         # adapter
+            self.MOUNT_IP = host or "192.168.4.1"   # adapter
+            self.MOUNT_PORT = port or 11880         # adapter
             self.LOCAL_BIND_PORT = 0        # 0 = auto
             self.RECV_BUF = 4096
             self.DEFAULT_TIMEOUT = 1.0      # s
@@ -45,14 +55,22 @@ class Connection:
     # Configuration USB / temps
     # ----------------------------
         elif iface == "USB":
-            self.MOUNT_PORT = "/dev/tty.usbserial-A10NDBX9"         # adapter
-            self.MOUNT_BAUDRATE = 9600
+            self.MOUNT_PORT = port or "/dev/tty.usbserial-A10NDBX9"         # adapter
+            self.MOUNT_BAUDRATE = baud or 9600      # 115200 si la monture le supporte (--baud)
             self.DEFAULT_TIMEOUT = 1.0      # s
             self.DEFAULT_RETRIES = 2
             self.INTER_CMD_DELAY = 0.05     # s entre envois
+            self.SERIAL_WINDOW = 2          # commandes en vol avec --pipeline
+
+    # ----------------------------
+    # Démon local (mountDaemon.py) propriétaire de la liaison
+    # ----------------------------
+        elif iface == "DAEMON":
+            self.MOUNT_PORT = port or "/tmp/wave150i.sock"      # socket Unix du démon
+            self.INTER_CMD_DELAY = 0.05     # s entre envois
             
         else:
-            raise ValueError('interface must be one of (USB, UDP)')
+            raise ValueError('interface must be one of (USB, UDP, DAEMON)')
 
 
 
@@ -61,118 +79,740 @@ class Connection:
 #                 Utilities
 #
 # =================================================================
-def safe_encode(cmd: str) -> bytes:
-    """Encoder en ascii; remplacer les littéraux <cr> si nécessaires."""
+def safe_encode(cmd: Union[str, bytes]) -> bytes:
+    """Encoder en ascii (bytes mis en cache, voir mountCodec.encode; octets: tels quels)."""
     # si tu veux accepter l'écriture :f1<cr> dans les listes, décommenter
     # cmd = cmd.replace("<cr>", "\r")
-    tmp = cmd.strip().replace(" ","")+"\r"
-    return tmp.encode("ascii", errors="ignore")
+    return mountCodec.encode(cmd)
 
 
 # ----------------------------
 # UDP client thread-safe
 # ----------------------------
+class _Link:
+    """Socket dédié à un axe (non bloquant, attente par select), avec son lock et son tampon."""
+
+    def __init__(self, name: str, bufsize: int, bind_port: int = 0):
+        self.name = name
+        self.lock = threading.Lock()
+        self.rbuf = bytearray(bufsize)          # tampon de réception réutilisé
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        try:
+            self.sock.bind(("", bind_port))
+        except OSError as e:
+            self.sock.close()
+            raise RuntimeError(f"Impossible de binder le port local: {e}")
+
+    def drain(self) -> int:
+        """Jette les réponses déjà reçues (tardives); renvoie leur nombre."""
+        n = 0
+        while True:
+            try:
+                self.sock.recvfrom_into(self.rbuf)
+            except (BlockingIOError, InterruptedError):
+                return n
+            n += 1
+
+    def recv(self, deadline: float) -> int:
+        """Attend un datagramme jusqu'à deadline (perf_counter); socket.timeout sinon."""
+        while True:
+            try:
+                n, _addr = self.sock.recvfrom_into(self.rbuf)
+                return n
+            except (BlockingIOError, InterruptedError):
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not select.select([self.sock], [], [], remaining)[0]:
+                raise socket.timeout("timed out")
+
+
 class ThreadSafeUDPClient:
+    """
+    Client UDP synchrone. Chaque axe a son socket et son lock (canal):
+    le recvfrom bloquant (timeout, réémissions) d'une commande de l'axe 1
+    ne retient pas les commandes de l'axe 2, et une réponse tardive ne
+    peut être lue que sur le canal de l'axe qui l'a demandée.
+    Les commandes sans axe (ou axe 3) passent par le canal '0'.
+    Avec un port local fixe (LOCAL_BIND_PORT), un seul canal pour tout.
+
+    Réémission (mountRtt): les commandes sans risque (mountCodec.retry_safe:
+    lectures, écritures idempotentes) sont réémises dès que le RTO estimé
+    expire (doublé à chaque timeout par rtt.backoff()), dans la limite de
+    DEFAULT_TIMEOUT x DEFAULT_RETRIES; les autres (goto, slew, :W) attendent DEFAULT_TIMEOUT
+    avant chaque réémission. Avant chaque envoi, les réponses tardives en
+    attente sur le canal sont jetées, et une réponse de longueur inattendue
+    (mountCodec.reply_length) est ignorée.
+    """
+
     def __init__(self, conn):
         self.host = conn.MOUNT_IP
         self.port = conn.MOUNT_PORT
         self.timeout = conn.DEFAULT_TIMEOUT
         self.retries = conn.DEFAULT_RETRIES
         self.RECV_BUF = conn.RECV_BUF
-        self.lock = threading.Lock()           # protège send+recv
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.settimeout(self.timeout)
+        self.lock = threading.Lock()           # protège la table des canaux
         self.inter_cmd_delay = conn.INTER_CMD_DELAY
-        try:
-            self.sock.bind(("", conn.LOCAL_BIND_PORT))
-        except OSError as e:
-            raise RuntimeError(f"Impossible de binder le port local: {e}")
+        self.verbose = True                    # trace chaque réponse
+        self.rtt = mountRtt.RttEstimator(conn.DEFAULT_TIMEOUT, conn.DEFAULT_TIMEOUT)
+        self.metrics = mountMetrics.ClientMetrics()
+        self.metrics.rtt = self.rtt
+        self.per_axis = not conn.LOCAL_BIND_PORT
+        self._links = {"0": _Link("0", self.RECV_BUF, conn.LOCAL_BIND_PORT)}
+
+    def _link(self, payload: bytes) -> _Link:
+        axis = axis_of(payload) if self.per_axis else "0"
+        link = self._links.get(axis)
+        if link is None:
+            with self.lock:
+                link = self._links.get(axis)
+                if link is None:
+                    link = self._links[axis] = _Link(axis, self.RECV_BUF)
+        return link
 
     def close(self):
         with self.lock:
-            try:
-                self.sock.close()
-            except Exception:
-                pass
+            for link in self._links.values():
+                with link.lock:
+                    try:
+                        link.sock.close()
+                    except Exception:
+                        pass
+
+    def _attempt_timeout(self, safe: bool, attempt: int) -> float:
+        if not safe:
+            return self.timeout
+        return min(self.timeout, self.rtt.rto())     # doublé par rtt.backoff() à chaque timeout
 
     def send_and_recv(self, cmd: str, expect_response: bool = True
                      ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Envoie payload (bytes) et attend une réponse si expect_response True.
-        Protège send+recv par un lock pour éviter les croisements de trames.
+        Protège send+recv par le lock du canal de l'axe pour éviter les
+        croisements de trames.
         Retourne: (ok, response_bytes_or_None, error_message_or_empty)
         """
         payload = safe_encode(cmd)
         last_err = ""
-        for attempt in range(1, self.retries + 1):
-            with self.lock:
+        link = self._link(payload)
+        safe = mountCodec.retry_safe(payload)
+        expected = mountCodec.reply_length(payload)
+        timeouts = 0
+        stale = 0
+        waited = 0.0
+        t0 = None
+        attempt = 0
+        while True:
+            attempt += 1
+            t = time.perf_counter()
+            with link.lock:
+                sent = time.perf_counter()
+                waited += sent - t
+                if t0 is None:
+                    t0 = sent
                 try:
+                    stale += link.drain()
                     # Envoi
-                    self.sock.sendto(payload, (self.host, self.port))
+                    link.sock.sendto(payload, (self.host, self.port))
                     # Lecture seulement si on attend une réponse
                     if expect_response:
-                        data, _addr = self.sock.recvfrom(self.RECV_BUF)
-                        txt = data.decode("ascii", errors="ignore").strip("\r\n")
-                        if txt[0]=='=':
-                            print(txt)
-                            return True, txt[1:], ""
+                        deadline = sent + self._attempt_timeout(safe, attempt)
+                        while True:
+                            n = link.recv(deadline)
+                            ok, resp = mountCodec.decode_reply(link.rbuf, n)
+                            if ok and expected is not None and len(resp) != expected:
+                                stale += 1      # réponse tardive d'une autre commande
+                                continue
+                            break
+                        now = time.perf_counter()
+                        if attempt == 1:
+                            self.rtt.sample(now - sent)     # Karn: premier envoi seulement
+                        if stale:
+                            self.metrics.count_stale(stale)
+                        self.metrics.record(payload, now - t0, ok, attempt,
+                                            timeouts, n, waited, link.name)
+                        if ok:
+                            if self.verbose:
+                                print("=" + resp)
+                            return True, resp, ""
                         else:
                             return False, None, ""
                     else:
+                        self.metrics.record(payload, None, True, attempt, timeouts, 0, waited, link.name)
                         return True, None, ""
                 except socket.timeout:
-                    last_err = f"timeout (attempt {attempt}/{self.retries})"
+                    last_err = f"timeout (attempt {attempt})"
+                    timeouts += 1
+                    self.rtt.backoff()
                 except OSError as e:
                     last_err = f"OSError: {e}"
                     break
             # si on arrive ici c'est qu'on a eu timeout ou erreur
-            time.sleep(0.02)  # petite pause avant retry
+            if safe:
+                if time.perf_counter() - t0 >= self.timeout * self.retries:
+                    break
+            else:
+                if attempt >= self.retries:
+                    break
+                time.sleep(0.02)  # petite pause avant retry
+        if stale:
+            self.metrics.count_stale(stale)
+        self.metrics.record(payload, None, False, attempt, timeouts, 0, waited, link.name)
         return False, None, last_err
 
+    def send_batch(self, cmds, window: int = 1) -> list:
+        """Lot de commandes, envoyées une par une (pas de pipeline)."""
+        return [self.send_and_recv(c) for c in cmds]
+
+
+# ----------------------------
+# UDP client pipeliné: un canal (socket) par axe
+# ----------------------------
+def axis_of(cmd) -> str:
+    """Axe visé par une commande (':f1' -> '1', ':X20003' -> '2'), '0' sinon."""
+    if isinstance(cmd, str):
+        c = cmd.strip().replace(" ", "")
+        a = c[2] if len(c) > 2 else "0"
+    else:
+        a = chr(cmd[2]) if len(cmd) > 2 else "0"
+    return a if a in ("1", "2", "3") else "0"
+
+
+class _Pending:
+    """Commande en vol sur un canal."""
+    __slots__ = ("future", "payload", "window", "attempt", "deadline", "last_err",
+                 "t_submit", "t_first", "t_head", "timeouts", "safe", "expected")
+
+    def __init__(self, future: Future, payload: bytes, window: int):
+        self.future = future
+        self.payload = payload
+        self.window = window
+        self.attempt = 0
+        self.deadline = 0.0
+        self.last_err = ""
+        self.t_submit = time.monotonic()
+        self.t_first = 0.0          # premier envoi (sortie du backlog)
+        self.t_head = 0.0           # série: début de l'attente de la réponse
+        self.timeouts = 0
+        self.safe = mountCodec.retry_safe(payload)          # réémission au RTO
+        self.expected = mountCodec.reply_length(payload)    # longueur de la réponse
+
+
+def _joins(p: _Pending, inflight) -> bool:
+    """
+    p peut-elle partir derrière les commandes en vol ? Sans numéro de
+    séquence, une réponse perdue n'est visible qu'à la longueur de la
+    suivante: les longueurs de réponse en vol doivent être connues et
+    toutes différentes. Une commande non rejouable part seule: une
+    resynchronisation ne peut pas la faire échouer par ricochet.
+    """
+    if not p.safe or p.expected is None:
+        return False
+    return all(q.safe and q.expected is not None and q.expected != p.expected
+               for q in inflight)
+
+
+class _Channel:
+    """Socket dédié à un axe + file FIFO des commandes en vol."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.inflight = deque()     # commandes envoyées, réponse attendue
+        self.backlog = deque()      # commandes en attente de place dans la fenêtre
+        self.rbuf = bytearray(4096) # tampon de réception (thread d'IO seulement)
+
+
+class PipelinedUDPClient:
+    """
+    Client UDP gardant plusieurs commandes en vol.
+    Chaque axe a son propre socket: une réponse reçue sur un socket est
+    appariée à la plus ancienne commande en vol de ce canal (le moteur
+    répond dans l'ordre). Les commandes de l'axe 1 et de l'axe 2 se
+    recouvrent donc sur le réseau au lieu de se sérialiser sur un lock.
+
+    submit() renvoie un Future dont le résultat est (ok, resp, err);
+    send_and_recv() garde le contrat de ThreadSafeUDPClient.
+    window = nombre max de commandes en vol par canal, de longueurs de
+    réponse différentes (voir _joins).
+    Réémission et réponses tardives: comme ThreadSafeUDPClient (RTO
+    estimé, mountCodec.retry_safe, mountCodec.reply_length).
+    """
+
+    def __init__(self, conn, window: int = 1):
+        self.host = conn.MOUNT_IP
+        self.port = conn.MOUNT_PORT
+        self.timeout = conn.DEFAULT_TIMEOUT
+        self.retries = conn.DEFAULT_RETRIES
+        self.RECV_BUF = conn.RECV_BUF
+        self.inter_cmd_delay = conn.INTER_CMD_DELAY
+        self.window = max(1, window)
+        self.verbose = True
+        self.rtt = mountRtt.RttEstimator(conn.DEFAULT_TIMEOUT, conn.DEFAULT_TIMEOUT)
+        self.metrics = mountMetrics.ClientMetrics()
+        self.metrics.rtt = self.rtt
+
+        self._sel = selectors.DefaultSelector()
+        self._channels = {}
+        self._chan_lock = threading.Lock()
+        # réveil du thread de réception quand une nouvelle échéance arrive
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._closed = False
+        self._io = threading.Thread(target=self._io_loop, name="udp-io", daemon=True)
+        self._io.start()
+
+    # --- canaux -------------------------------------------------------
+    def _channel(self, axis: str) -> _Channel:
+        with self._chan_lock:
+            ch = self._channels.get(axis)
+            if ch is None:
+                ch = _Channel(axis)
+                try:
+                    ch.sock.bind(("", 0))
+                except OSError as e:
+                    raise RuntimeError(f"Impossible de binder le port local: {e}")
+                self._channels[axis] = ch
+                self._sel.register(ch.sock, selectors.EVENT_READ, ch)
+                self._wake()
+            return ch
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _transmit(self, ch: _Channel, p: _Pending):
+        """Envoie (ou réenvoie) p; appelé avec ch.lock tenu."""
+        p.attempt += 1
+        now = time.monotonic()
+        if p.attempt == 1:
+            p.t_first = now
+        if p.safe:
+            p.deadline = now + min(self.timeout, self.rtt.rto())    # doublé par rtt.backoff()
+        else:
+            p.deadline = now + self.timeout
+        try:
+            ch.sock.sendto(p.payload, (self.host, self.port))
+        except OSError as e:
+            p.last_err = f"OSError: {e}"
+            p.deadline = 0.0        # échec traité par le thread d'IO
+
+    def _fill_window(self, ch: _Channel):
+        """Fait passer les commandes du backlog en vol; ch.lock tenu."""
+        while ch.backlog and len(ch.inflight) < ch.backlog[0].window:
+            if ch.inflight and not _joins(ch.backlog[0], ch.inflight):
+                break
+            p = ch.backlog.popleft()
+            ch.inflight.append(p)
+            self._transmit(ch, p)
+
+    # --- API ----------------------------------------------------------
+    def submit(self, cmd: Union[str, bytes], expect_response: bool = True,
+               window: Optional[int] = None) -> Future:
+        """
+        Envoie cmd sans attendre; le Future donne (ok, resp, err).
+        cmd: texte (":f1") ou octets déjà encodés (b":f1\r", tampon de
+        mountCodec.encode_goto, copié ici).
+        window: nombre max de commandes en vol admis pour celle-ci
+        (par défaut self.window). future.attempts = nombre d'envois.
+        """
+        if self._closed:
+            raise RuntimeError("client fermé")
+        fut = Future()
+        fut.attempts = 0
+        ch = self._channel(axis_of(cmd))
+        # copie: le tampon des gotos (mountCodec) est réutilisé par le thread appelant
+        p = _Pending(fut, bytes(safe_encode(cmd)), max(1, window or self.window))
+        with ch.lock:
+            if not expect_response:
+                self._transmit(ch, p)
+                fut.attempts = 1
+                self.metrics.record(p.payload, None, not p.last_err, 1, 0, 0,
+                                    p.t_first - p.t_submit, ch.name)
+                fut.set_result((True, None, "") if not p.last_err
+                               else (False, None, p.last_err))
+                return fut
+            ch.backlog.append(p)
+            self._fill_window(ch)
+        self._wake()
+        return fut
+
+    def send_and_recv(self, cmd: str, expect_response: bool = True
+                      ) -> Tuple[bool, Optional[str], Optional[str]]:
+        return self.submit(cmd, expect_response).result()
+
+    def send_batch(self, cmds, window: int = 8) -> list:
+        """
+        Envoie une liste ordonnée de commandes avec au plus `window`
+        commandes en vol par axe, puis attend toutes les réponses.
+        Seules des commandes de longueurs de réponse différentes sont en vol
+        ensemble (_joins): une réponse perdue ne décale pas l'appariement.
+        Retourne la liste des (ok, resp, err) dans l'ordre de cmds.
+        """
+        futures = [self.submit(c, window=window) for c in cmds]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._closed = True
+        self._wake()
+        self._io.join(timeout=2.0)
+        for ch in self._channels.values():
+            with ch.lock:
+                for p in list(ch.inflight) + list(ch.backlog):
+                    if not p.future.done():
+                        p.future.set_result((False, None, "client fermé"))
+                ch.inflight.clear()
+                ch.backlog.clear()
+            try:
+                ch.sock.close()
+            except Exception:
+                pass
+        self._sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    # --- thread de réception -----------------------------------------
+    def _resolve_head(self, ch: _Channel, result, received: int = 0, i: int = 0):
+        """Résout la commande en vol n° i (la plus ancienne par défaut)."""
+        p = ch.inflight[i]
+        del ch.inflight[i]
+        p.future.attempts = p.attempt
+        if received and p.attempt == 1:
+            self.rtt.sample(time.monotonic() - p.t_first)   # Karn: premier envoi seulement
+        self.metrics.record(p.payload, time.monotonic() - p.t_first if received else None,
+                            result[0], p.attempt, p.timeouts, received, p.t_first - p.t_submit,
+                            ch.name)
+        if not p.future.done():
+            p.future.set_result(result)
+        self._fill_window(ch)
+
+    def _on_datagram(self, ch: _Channel, n: int):
+        ok, resp = mountCodec.decode_reply(ch.rbuf, n)
+        with ch.lock:
+            if not ch.inflight:
+                self.metrics.count_stale()
+                return              # réponse tardive sans demandeur: ignorée
+            i = 0
+            if ok and ch.inflight[0].expected is not None:
+                # longueurs en vol toutes différentes (_joins): la réponse d'une
+                # commande plus récente signale la perte de celles d'avant, qui
+                # seront réémises à leur échéance
+                i = next((k for k, q in enumerate(ch.inflight) if q.expected == len(resp)), None)
+                if i is None:
+                    self.metrics.count_stale()
+                    return          # réponse tardive d'une autre commande
+            if ok:
+                if self.verbose:
+                    print("=" + resp)
+                self._resolve_head(ch, (True, resp, ""), n, i)
+            else:
+                self._resolve_head(ch, (False, None, ""), n)
+
+    def _check_deadlines(self) -> float:
+        """Réémet ou abandonne les commandes expirées; renvoie le prochain délai."""
+        now = time.monotonic()
+        nxt = None
+        for ch in list(self._channels.values()):
+            with ch.lock:
+                while ch.inflight and ch.inflight[0].deadline <= now:
+                    p = ch.inflight[0]
+                    if not p.last_err.startswith("OSError"):
+                        p.last_err = f"timeout (attempt {p.attempt})"
+                        p.timeouts += 1
+                        self.rtt.backoff()
+                    if p.safe:
+                        again = now - p.t_first < self.timeout * self.retries
+                    else:
+                        again = p.attempt < self.retries
+                    if again and not p.last_err.startswith("OSError"):
+                        self._transmit(ch, p)
+                    else:
+                        self._resolve_head(ch, (False, None, p.last_err))
+                if ch.inflight:
+                    d = ch.inflight[0].deadline - now
+                    nxt = d if nxt is None else min(nxt, d)
+        return nxt
+
+    def _io_loop(self):
+        while not self._closed:
+            delay = self._check_deadlines()
+            for key, _ in self._sel.select(delay):
+                ch = key.data
+                if ch is None:
+                    try:
+                        while self._wake_r.recv(64):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                while True:
+                    try:
+                        n, _addr = ch.sock.recvfrom_into(ch.rbuf)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        break
+                    self._on_datagram(ch, n)
+
 
 # ----------------------------
 # USB-Serial client thread-safe
 # ----------------------------
+BAUDRATES = (115200, 9600)      # débits essayés par detect_baudrate, du plus rapide
+READ_TICK = 0.01                # s: timeout de lecture du thread de réception
+
+
+def detect_baudrate(port: str, rates=BAUDRATES, timeout: float = 0.2) -> Optional[int]:
+    """Premier débit de `rates` auquel la monture répond à :e1 (lecture sans effet), None sinon."""
+    import mountDiscovery
+    found = mountDiscovery.probe_serial(port, rates, timeout)
+    return found.baud if found else None
+
+
 class ThreadSafeSerialClient:
-    def __init__(self, conn): 
-    
-        self.lock = threading.Lock()
+    """
+    Client série: un thread de réception remplit un tampon et découpe les
+    réponses sur '\\r'; la monture répond dans l'ordre, chaque réponse va à
+    la plus ancienne commande en vol. Jusqu'à `window` commandes en vol
+    (1 par défaut, conn.SERIAL_WINDOW avec --pipeline), de longueurs de
+    réponse différentes (voir _joins): la commande suivante est déjà sur la
+    ligne pendant que la monture traite la précédente.
+
+    submit() renvoie un Future (ok, resp, err), send_and_recv() garde le
+    contrat de ThreadSafeUDPClient. Réémission et réponses tardives comme
+    les clients UDP (RTO estimé, mountCodec.retry_safe, reply_length); les
+    délais comptent en plus la durée de transmission au débit du port.
+    Sur timeout de la plus ancienne commande, le tampon d'entrée est vidé et
+    les commandes en vol sont réémises dans l'ordre (dans le budget de
+    réémission).
+    """
+
+    def __init__(self, conn, window: int = 1):
+        self.port = conn.MOUNT_PORT
+        self.baudrate = conn.MOUNT_BAUDRATE
+        self.timeout = conn.DEFAULT_TIMEOUT
         self.retries = conn.DEFAULT_RETRIES
+        self.inter_cmd_delay = conn.INTER_CMD_DELAY
+        self.window = max(1, window)
+        self.verbose = True
+        self.rtt = mountRtt.RttEstimator(conn.DEFAULT_TIMEOUT, conn.DEFAULT_TIMEOUT)
+        self.metrics = mountMetrics.ClientMetrics()
+        self.metrics.rtt = self.rtt
+
+        self.lock = threading.Lock()
+        self.inflight = deque()     # commandes écrites, réponse attendue (FIFO)
+        self.backlog = deque()      # commandes en attente de place dans la fenêtre
+        self._buf = bytearray()     # octets reçus, pas encore découpés (thread de réception)
+        self._closed = False
 
         # ouverture du port série
         self.ser = serial.Serial(
             port=conn.MOUNT_PORT,
             baudrate=conn.MOUNT_BAUDRATE,
-            timeout=conn.DEFAULT_TIMEOUT
+            timeout=READ_TICK
         )
-        self.inter_cmd_delay = conn.INTER_CMD_DELAY
+        self._reader = threading.Thread(target=self._read_loop, name="serial-read", daemon=True)
+        self._reader.start()
+
+    # --- envoi --------------------------------------------------------
+    def _wire(self, p: _Pending) -> float:
+        """Durée de transmission de la commande et de sa réponse (10 bits par octet)."""
+        return (len(p.payload) + (p.expected or 0) + 2) * 10 / self.baudrate
+
+    def _arm(self, p: _Pending, now: float):
+        """Échéance de p, comptée depuis now (envoi, ou passage en tête de file)."""
+        p.t_head = now
+        if p.safe:
+            rto = min(self.timeout, self.rtt.rto())     # doublé par rtt.backoff()
+        else:
+            rto = self.timeout
+        p.deadline = max(p.deadline, now + rto + self._wire(p))
+
+    def _transmit(self, p: _Pending):
+        """Écrit (ou réécrit) p; appelé avec self.lock tenu."""
+        p.attempt += 1
+        now = time.monotonic()
+        if p.attempt == 1:
+            p.t_first = now
+        p.deadline = 0.0
+        self._arm(p, now)
+        try:
+            self.ser.write(p.payload)
+        except Exception as e:
+            p.last_err = f"<error: {e}>"
+            p.deadline = 0.0        # échec traité par le thread de réception
+
+    def _fill_window(self):
+        """Fait passer les commandes du backlog en vol; self.lock tenu."""
+        while self.backlog and len(self.inflight) < self.backlog[0].window:
+            if self.inflight and not _joins(self.backlog[0], self.inflight):
+                break
+            p = self.backlog.popleft()
+            self.inflight.append(p)
+            self._transmit(p)
+
+    # --- API ----------------------------------------------------------
+    def submit(self, cmd: Union[str, bytes], expect_response: bool = True,
+               window: Optional[int] = None) -> Future:
+        """
+        Envoie cmd sans attendre; le Future donne (ok, resp, err).
+        cmd: texte ou octets déjà encodés, comme PipelinedUDPClient.submit.
+        La monture répond à toutes les commandes: sans expect_response, la
+        réponse est tout de même lue (pour garder l'appariement) mais le
+        Future est résolu tout de suite. future.attempts = nombre d'envois.
+        """
+        if self._closed:
+            raise RuntimeError("client fermé")
+        fut = Future()
+        fut.attempts = 0
+        # copie: le tampon des gotos (mountCodec) est réutilisé par le thread appelant
+        p = _Pending(fut if expect_response else Future(), bytes(safe_encode(cmd)),
+                     max(1, window or self.window))
+        p.future.attempts = 0
+        with self.lock:
+            self.backlog.append(p)
+            self._fill_window()
+        if not expect_response:
+            fut.attempts = 1
+            fut.set_result((True, None, ""))
+        return fut
 
     def send_and_recv(self, cmd: str, expect_response: bool = True
                       ) -> Tuple[bool, Optional[str], Optional[str]]:
-        """Envoie une commande et lit la réponse de manière thread-safe"""
+        """Envoie une commande et attend sa réponse (thread-safe)."""
+        return self.submit(cmd, expect_response).result()
+
+    def send_batch(self, cmds, window: int = 8) -> list:
+        """
+        Envoie une liste ordonnée de commandes avec au plus `window` commandes
+        en vol, puis attend toutes les réponses (dans l'ordre de cmds).
+        Après un timeout, le tampon vidé et les réémissions dans l'ordre
+        gardent l'appariement: pas de rejeu un par un comme en UDP.
+        """
+        futures = [self.submit(c, window=window) for c in cmds]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._closed = True
+        self._reader.join(timeout=2.0)
         with self.lock:
-            if not cmd.endswith("\r"):
-                cmd = cmd + "\r"
+            for p in list(self.inflight) + list(self.backlog):
+                if not p.future.done():
+                    p.future.set_result((False, None, "client fermé"))
+            self.inflight.clear()
+            self.backlog.clear()
+        self.ser.close()
+
+    # --- thread de réception -----------------------------------------
+    def _finish(self, p: _Pending, result, received: int = 0):
+        """Résultat de p (retirée de la file); self.lock tenu."""
+        now = time.monotonic()
+        p.future.attempts = p.attempt
+        if received and p.attempt == 1 and p.t_head == p.t_first:
+            # Karn: premier envoi seulement, écrit sur une ligne libre (sinon
+            # la réponse a pu commencer avant le passage en tête); temps de
+            # ligne exclu (ajouté à chaque échéance)
+            self.rtt.sample(max(0.0, now - p.t_head - self._wire(p)))
+        self.metrics.record(p.payload, now - p.t_first if received else None,
+                            result[0], p.attempt, p.timeouts, received,
+                            p.t_first - p.t_submit if p.attempt else None)
+        if not p.future.done():
+            p.future.set_result(result)
+
+    def _resolve_head(self, result, received: int = 0):
+        p = self.inflight.popleft()
+        self._finish(p, result, received)
+        if self.inflight:
+            # la suivante n'attend sa réponse qu'à partir de maintenant
+            self._arm(self.inflight[0], time.monotonic())
+        self._fill_window()
 
-            # envoi
-            self.ser.write(cmd.encode("ascii"))
+    def _on_line(self, line: bytes):
+        if line[:1] not in (b"=", b"!"):
+            self.metrics.count_stale()
+            return                  # fin d'une réponse coupée par reset_input_buffer
+        ok, resp = mountCodec.decode_reply(line, len(line))
+        with self.lock:
+            if not self.inflight:
+                self.metrics.count_stale()
+                return              # réponse tardive sans demandeur: ignorée
+            expected = self.inflight[0].expected
+            if ok and expected is not None and len(resp) != expected:
+                self.metrics.count_stale()
+                return              # réponse tardive d'une commande réémise
+            if ok:
+                if self.verbose:
+                    print("=" + resp)
+                self._resolve_head((True, resp, ""), len(line) + 1)
+            else:
+                self._resolve_head((False, None, ""), len(line) + 1)
 
-            # lecture (jusqu’au retour chariot ou timeout)
+    def _check_deadlines(self):
+        """Timeout de la tête: resynchronisation, réémission ou abandon."""
+        now = time.monotonic()
+        with self.lock:
+            if not self.inflight or self.inflight[0].deadline > now:
+                return
+            head = self.inflight[0]
+            if not head.last_err.startswith("<error"):
+                head.last_err = f"timeout (attempt {head.attempt})"
+                head.timeouts += 1
+                self.rtt.backoff()
+            # les réponses encore attendues ne peuvent plus être attribuées
             try:
-                data = self.ser.readline()
-                txt = data.decode("ascii", errors="ignore").strip("\r\n")
-                if txt[0]=='=':
-                    print(txt)
-                    return True, txt[1:], ""
+                self.ser.reset_input_buffer()
+            except Exception:
+                pass
+            self._buf.clear()
+            pending = list(self.inflight)
+            self.inflight.clear()
+            again = []
+            for p in pending:
+                if p is not head and not p.last_err:
+                    p.last_err = "resynchronisation after timeout"
+                if p.last_err.startswith("<error"):
+                    retry = False
+                elif p.safe:
+                    retry = now - p.t_first < self.timeout * self.retries
+                else:
+                    retry = p.attempt < self.retries    # seule en vol (_fill_window)
+                if retry:
+                    again.append(p)
                 else:
-                    return False, None, ""
+                    self._finish(p, (False, None, p.last_err))
+            self.backlog.extendleft(reversed(again))
+            self._fill_window()
 
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
             except Exception as e:
+                if self._closed:
+                    break
                 err = f"<error: {e}>"
-                return False, None, err
-
-    def close(self):
-        self.ser.close()
+                with self.lock:
+                    for p in list(self.inflight) + list(self.backlog):
+                        self._finish(p, (False, None, err))
+                    self.inflight.clear()
+                    self.backlog.clear()
+                self._closed = True
+                break
+            if data:
+                self._buf += data
+                while True:
+                    i = self._buf.find(b"\r")
+                    if i < 0:
+                        break
+                    line = bytes(self._buf[:i])
+                    del self._buf[:i + 1]
+                    self._on_line(line)
+            self._check_deadlines()
 
 # ----------------------------
 # Worker thread pour un axe
@@ -182,7 +822,9 @@ class AxisWorker(threading.Thread):
                  driver: str,
                  client: ThreadSafeUDPClient, 
                  stop_event: threading.Event, 
-                 process: Optional[Callable[[str, bytes], None]] = None):
+                 process: Optional[Callable[[str, bytes], None]] = None,
+                 state=None,
+                 monitor=None):
         super().__init__(daemon=True)
         self.name = name
         self.client = client
@@ -190,17 +832,30 @@ class AxisWorker(threading.Thread):
         self.stop_event = stop_event
         self.delay_between_cmd = client.inter_cmd_delay
         self.process = process
+        self.error = None       # exception levée par process, le cas échéant
+        self.park = None        # parkAxis.ParkContext du parking (durée des étapes)
+        self.state = state      # mountState.MountStateCache, ou None
+        self.monitor = monitor  # mountMonitor.StatusMonitor partagé, ou None
         
-        self.thread = threading.Thread(target=process, args=(name, self))
+        self.thread = threading.Thread(target=self._run, args=(name,))
+
+    def _run(self, name):
+        try:
+            self.process(name, self)
+        except parkAxis.ParkInterrupted as e:
+            self.error = e      # arrêt demandé (stop_event): pas de trace
+        except Exception as e:
+            self.error = e
+            raise
 
 
 # ----------------------------
 # Routine d'initialisation séquentielle
 # ----------------------------
-def run_initialization(driver, client: ThreadSafeUDPClient) -> bool:
+def run_initialization(driver, client: ThreadSafeUDPClient, state=None) -> bool:
     print("[INIT] Démarrage initialisation séquentielle...")
     # Sequence d'initialisation
-    ok=parkAxis.init_mount(driver, client)
+    ok=parkAxis.init_mount(driver, client, state)
     if (ok):
         print("[INIT] Initialisation terminée avec succès.")
         return True
@@ -208,6 +863,90 @@ def run_initialization(driver, client: ThreadSafeUDPClient) -> bool:
         print("[INIT] Initialisation échoué.")
         return False
 
+# ----------------------------
+# Création du client selon l'interface
+# ----------------------------
+def make_client(conn, pipeline: bool = False, cache: bool = False, capture=None):
+    if conn.iface == "DAEMON":
+        import mountDaemon
+        client = mountDaemon.DaemonClient(conn.MOUNT_PORT, conn.INTER_CMD_DELAY)
+    elif conn.iface == "UDP" and pipeline:
+        client = PipelinedUDPClient(conn)
+    elif conn.iface == "UDP":
+        client = ThreadSafeUDPClient(conn)
+    elif pipeline:
+        client = ThreadSafeSerialClient(conn, window=conn.SERIAL_WINDOW)
+    else:
+        client = ThreadSafeSerialClient(conn)
+    if capture:
+        # trafic avec la monture enregistré dans une capture binaire (mountCapture)
+        import mountCapture
+        client = mountCapture.CapturingClient(client, mountCapture.CaptureWriter(capture))
+    if cache:
+        # réponses des lectures partagées pendant leur TTL (mountCache)
+        client = mountCache.CachedClient(client)
+    return client
+
+# ----------------------------
+# Parking des deux axes en parallèle
+# ----------------------------
+def park_axes(driver, client, stop_event: threading.Event, state=None, monitor=None) -> list:
+    """
+    Lance un thread par axe et attend leur fin (ou Ctrl-C).
+    state: mountState.MountStateCache pour éviter le homing si le repère est connu.
+    monitor: mountMonitor.StatusMonitor, les fins de mouvement des deux axes
+    sont attendues sur son polling partagé.
+    Retourne la liste des erreurs ("Axis1: ...") , vide si tout s'est bien passé.
+    """
+    axis1 = AxisWorker("Axis1", driver, client,  stop_event, process=parkAxis.axis1,
+                       state=state, monitor=monitor)
+    axis2 = AxisWorker("Axis2", driver, client,  stop_event, process=parkAxis.axis2,
+                       state=state, monitor=monitor)
+
+    # Démarre les threads
+    axis1.thread.start()
+    axis2.thread.start()
+
+    # attendre fin ou Ctrl-C
+    try:
+        # join et non sleep: fin dès que les deux axes sont parqués
+        for w in (axis1, axis2):
+            while w.thread.is_alive():
+                w.thread.join(0.2)
+    except KeyboardInterrupt:
+        print("[MAIN] Ctrl-C reçu -> arrêt des threads...")
+        stop_event.set()
+
+    axis1.thread.join(timeout=2.0)
+    axis2.thread.join(timeout=2.0)
+    errors = []
+    for w in (axis1, axis2):
+        if state is not None and w.thread.is_alive():
+            # parking interrompu: repère incertain
+            state.invalidate(client, w.name)
+        if w.park is not None:
+            steps = ", ".join(f"{step} {dt:.2f}" for step, dt in w.park.timings)
+            print(f"[{w.name}] étapes (s): {steps}")
+        if w.thread.is_alive():
+            errors.append(f"{w.name}: toujours en cours")
+        elif w.error is not None:
+            errors.append(f"{w.name}: {w.error!r}")
+    return errors
+
+def plan_park(driver, client, stop_event: threading.Event, state=None) -> list:
+    """
+    Parking des deux axes depuis le thread appelant (parkAxis.park_both):
+    les mouvements des deux axes se recouvrent à chaque étape, un seul
+    polling (:f1 et :f2 ensemble) pour les axes en attente.
+    Même retour que park_axes.
+    """
+    parks, errors = parkAxis.park_both(client, driver, state=state, stop_event=stop_event)
+    for name, ctx in parks.items():
+        if ctx.timings:
+            steps = ", ".join(f"{step} {dt:.2f}" for step, dt in ctx.timings)
+            print(f"[{name}] étapes (s): {steps}")
+    return errors
+
 # ----------------------------
 # programme principal
 # ----------------------------
@@ -216,58 +955,121 @@ def main():
     # parse command line args
     driver = "SynScan"
     iface = "UDP"
+    pipeline = False
+    telemetry = None
+    rehome = False
+    cache = False
+    capture = None
+    metrics = None
+    planner = False
+    shared = False
+    baud = None
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "d:i:", ["driver=", "iface="])
+        opts, args = getopt.getopt(sys.argv[1:], "d:i:pt:c:rCm:PMb:",
+                                   ["driver=", "iface=", "pipeline", "telemetry=", "config=",
+                                    "rehome", "cache", "capture=", "metrics=", "planner",
+                                    "monitor", "baud="])
     except:
-        raise ValueError("usage: {sys.argv[0]} [--driver [INDI, SynScan]][--iface [UDP, USB]]")
+        raise ValueError("usage: {sys.argv[0]} [--driver [INDI, SynScan]][--iface [UDP, USB, DAEMON, AUTO]][--pipeline][--telemetry FILE][--config FILE][--rehome][--cache][--capture FILE][--metrics FILE][--planner][--monitor][--baud [N, auto]]")
     
     for opt, arg in opts:
         if opt in ("-d", "--driver"):
             driver = arg
         if opt in ("-i", "--iface"):
             iface = arg
+        if opt in ("-p", "--pipeline"):
+            pipeline = True
+        if opt in ("-t", "--telemetry"):
+            telemetry = arg
+        if opt in ("-c", "--config"):
+            # paramètres d'axes (et plan de parking) d'une autre monture
+            parkAxis.load_axis_params(arg)
+        if opt in ("-r", "--rehome"):
+            # ignorer l'état mémorisé: homing complet des deux axes
+            rehome = True
+        if opt in ("-C", "--cache"):
+            # lectures servies par un cache à TTL court (mountCache)
+            cache = True
+        if opt == "--capture":
+            capture = arg
+        if opt in ("-m", "--metrics"):
+            # mesures du client (latences par commande, ...) en JSON, toutes les 5 s
+            metrics = arg
+        if opt in ("-P", "--planner"):
+            # un seul thread: mouvements des deux axes planifiés ensemble
+            planner = True
+        if opt in ("-M", "--monitor"):
+            # un seul polling de statut partagé (mountMonitor) par les threads
+            # de parking et la télémétrie
+            shared = True
+        if opt in ("-b", "--baud"):
+            # débit du port série (USB); auto: premier débit auquel la monture répond
+            baud = arg
         
         
     stop_event = threading.Event()
-    conn = Connection(iface)
+    if iface == "AUTO":
+        # première monture trouvée par mountDiscovery (Wifi, puis ports USB)
+        import mountDiscovery
+        found = mountDiscovery.discover()
+        if not found:
+            print("[MAIN] Aucune monture trouvée -> arrêt.")
+            return
+        print(f"[MAIN] Monture {found[0].address} (firmware {found[0].firmware})")
+        conn = found[0].connection()
+    else:
+        if baud == "auto":
+            baud = detect_baudrate(Connection("USB").MOUNT_PORT) if iface == "USB" else None
+            print(f"[MAIN] Débit détecté: {baud}")
+        conn = Connection(iface, baud=int(baud) if baud else None)
     client = None
+    dumper = None
+    state = mountState.MountStateCache()
     try:
-        if iface == "UDP":
-            client = ThreadSafeUDPClient(conn)
-        elif iface == "USB":
-            client = ThreadSafeSerialClient(conn)
+        client = make_client(conn, pipeline, cache, capture)
+        if metrics:
+            dumper = mountMetrics.JsonDumper(client.metrics, metrics, period=5.0).start()
+        if rehome:
+            state.invalidate(client)
 
         # 1) initialisation séquentielle
-        ok = run_initialization(driver, client)
+        ok = run_initialization(driver, client, state)
         if not ok:
             print("[MAIN] Initialisation échouée -> arrêt.")
             return
 
-        # 2) lancer les workers et les threads pour chaque axe
-        axis1 = AxisWorker("Axis1", driver, client,  stop_event, process=parkAxis.axis1)
-        axis2 = AxisWorker("Axis2", driver, client,  stop_event, process=parkAxis.axis2)
-
-
-    # Démarre les threads
-        axis1.thread.start()
-        axis2.thread.start()
-
-
-        # 3) attendre fin ou Ctrl-C
+        # 2) lancer les workers et les threads pour chaque axe, attendre
+        sampler = monitor = None
+        if shared:
+            import mountMonitor
+            monitor = mountMonitor.StatusMonitor(client).start()
+        if telemetry:
+            import telemetryWave150i
+            sampler = telemetryWave150i.TelemetrySampler(client, telemetry,
+                                                         monitor=monitor).start()
         try:
-            while axis1.thread.is_alive() or axis2.thread.is_alive():
-                time.sleep(0.2)
-        except KeyboardInterrupt:
-            print("[MAIN] Ctrl-C reçu -> arrêt des threads...")
-            stop_event.set()
-
-        axis1.thread.join(timeout=2.0)
-        axis2.thread.join(timeout=2.0)
+            if planner:
+                errors = plan_park(driver, client, stop_event, state)
+            else:
+                errors = park_axes(driver, client, stop_event, state, monitor)
+            if errors:
+                print(f"[MAIN] Parking: {'; '.join(errors)}")
+        finally:
+            if sampler is not None:
+                sampler.stop()
+                print(f"[MAIN] Télémétrie: {sampler.samples} échantillons -> {telemetry}")
+            if monitor is not None:
+                monitor.stop()
+                print(f"[MAIN] Moniteur: {monitor.stats()}")
+        if cache:
+            print(f"[MAIN] Cache: {client.stats()}")
+        print(client.metrics.report())
         print("[MAIN] Workers terminés, fermeture cliente.")
     finally:
+        if dumper is not None:
+            dumper.stop()
         if client is not None:
             client.close()
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analyse hors ligne des sessions et de la télémétrie, vectorisée avec NumPy.
+
+Entrées:
+- capture binaire (mountCapture, .cap)
+- journal CSV de piloteDepuisFichierWave150 (session_log.csv)
+- télémétrie (telemetryWave150i, .tlm)
+Les échanges (commande + réponse) sont chargés en tableaux; le décodage
+(statuts, positions int32 et 24 bits, réponses :X..0F) se fait en bloc
+sur des tableaux d'octets, sans boucle Python par ligne.
+
+Résultats: histogramme et percentiles des RTT, taux d'échecs par axe,
+profils de mouvement (vitesse / accélération par axe) et durée jusqu'à
+l'arrêt de chaque goto.
+
+usage: python mountAnalysis.py FICHIER [--json out.json] [--bins N]
+"""
+
+import argparse
+import csv
+import json
+import struct
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+import mountCapture
+import mountStatus
+
+
+WIDTH = 32      # octets gardés par commande / réponse (un goto :X.04 en fait 29)
+
+# ascii -> valeur d'un chiffre hexa (0 pour les autres caractères)
+_NIBBLE = np.zeros(256, dtype=np.uint32)
+for _i, _c in enumerate(b"0123456789ABCDEF"):
+    _NIBBLE[_c] = _i
+for _i, _c in enumerate(b"abcdef"):
+    _NIBBLE[_c] = 10 + _i
+
+
+class Exchanges(NamedTuple):
+    """Une ligne par commande envoyée (tableaux de même longueur)."""
+    t: np.ndarray           # float64, s depuis le début de la session
+    axis: np.ndarray        # uint8, ascii '1' '2' '3' '0'
+    cmd: np.ndarray         # uint8, lettre de commande
+    payload: np.ndarray     # S32, commande envoyée
+    reply: np.ndarray       # S32, réponse brute ('=...'), b'' si aucune
+    rtt: np.ndarray         # float64, s (nan si pas de réponse)
+    status: np.ndarray      # uint8, mountCapture.OK / ERROR / TIMEOUT / NO_REPLY
+
+
+# =================================================================
+#
+#                 Décodage en bloc
+#
+# =================================================================
+def _chars(a: np.ndarray) -> np.ndarray:
+    """Tableau S<n> -> matrice (N, n) d'octets."""
+    return a.view(np.uint8).reshape(len(a), a.dtype.itemsize)
+
+
+def hex_field(a: np.ndarray, start: int, n: int) -> np.ndarray:
+    """Valeur (uint64) des n chiffres hexa à partir de `start` de chaque élément."""
+    d = _NIBBLE[_chars(a)[:, start:start + n]].astype(np.uint64)
+    shifts = np.arange(4 * (n - 1), -1, -4, dtype=np.uint64)
+    return (d << shifts).sum(axis=1, dtype=np.uint64)
+
+
+def int32_field(a: np.ndarray, start: int = 1) -> np.ndarray:
+    """Réponses '=XXXXXXXX' -> int32 signés (comme mountCodec.int32)."""
+    return hex_field(a, start, 8).astype(np.uint32).view(np.int32)
+
+
+def position24(a: np.ndarray, start: int = 1) -> np.ndarray:
+    """
+    Réponses 24 bits octets inversés ('=563412' -> 0x123456), comme
+    decode_position, moins l'origine 0x800000.
+    """
+    v = hex_field(a, start, 6)
+    swapped = ((v & 0xFF) << 16) | (v & 0xFF00) | (v >> 16)
+    return swapped.astype(np.int64) - 0x800000
+
+
+def x0f_positions(a: np.ndarray) -> tuple:
+    """Réponses de :X.0F -> (pos1, pos2) int32, découpage de piloteInteractif."""
+    return int32_field(a, 1), int32_field(a, 9)
+
+
+def status_bits(a: np.ndarray, start: int = 1) -> dict:
+    """Réponses de :f -> {nom de mountStatus.FLAGS: tableau de booléens}."""
+    raw = hex_field(a, start, 3)
+    return {name: (raw & mask) == val for name, (mask, val) in mountStatus.FLAGS.items()}
+
+
+# =================================================================
+#
+#                 Chargement
+#
+# =================================================================
+CHUNK = 1 << 16     # enregistrements par lot de copie (tableaux d'index bornés)
+
+
+def _take(buf: np.ndarray, offs: np.ndarray, width: int) -> np.ndarray:
+    """Matrice (N, width) des octets buf[off : off+width] de chaque offset."""
+    out = np.zeros((len(offs), width), dtype=np.uint8)
+    cols = np.arange(width)
+    for i in range(0, len(offs), CHUNK):
+        idx = offs[i:i + CHUNK, None] + cols
+        out[i:i + CHUNK] = buf[np.minimum(idx, len(buf) - 1)]
+    return out
+
+
+def _gather(buf: np.ndarray, offs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Octets buf[offs : offs+lengths] (tronqués à WIDTH) -> tableau S<WIDTH>."""
+    out = _take(buf, offs, WIDTH)
+    out[np.arange(WIDTH) >= np.minimum(lengths, WIDTH)[:, None]] = 0
+    return out.view(f"S{WIDTH}").ravel()
+
+
+REC_DTYPE = np.dtype([("t", "<f8"), ("dir", "u1"), ("axis", "u1"), ("cmd", "u1"),
+                      ("status", "u1"), ("rtt", "<f4"), ("n", "<u2")])     # mountCapture.REC
+
+
+def _offsets(reader) -> np.ndarray:
+    """Offsets des enregistrements, lus dans l'index du pied (parcours si interrompue)."""
+    if not reader.spans:
+        return np.fromiter(reader.offsets(), dtype=np.int64, count=-1)
+    parts = [np.frombuffer(reader.mm, dtype="<u8", count=n, offset=off)
+             for off, n in reader.spans.values()]
+    offs = np.sort(np.concatenate(parts)).astype(np.int64)
+    del parts
+    return offs
+
+
+def load_capture(path: Path) -> Exchanges:
+    """Capture mountCapture -> échanges (envois appariés aux réponses par axe)."""
+    assert REC_DTYPE.itemsize == mountCapture.REC.size
+    with mountCapture.CaptureReader(path) as reader:
+        buf = np.frombuffer(reader.mm, dtype=np.uint8)
+        offs = _offsets(reader)
+        hdr = _take(buf, offs, mountCapture.REC.size)
+        rec = hdr.view(REC_DTYPE).ravel()
+        data = _gather(buf, offs + mountCapture.REC.size, rec["n"].astype(np.int64))
+        del buf, hdr
+    sent = rec["dir"] == mountCapture.SENT
+    n = int(sent.sum())
+    reply = np.zeros(n, dtype=f"S{WIDTH}")
+    rtt = np.full(n, np.nan)
+    status = np.full(n, mountCapture.TIMEOUT, dtype=np.uint8)
+    s_all = np.flatnonzero(sent)
+    pos = np.empty(len(rec), dtype=np.int64)
+    pos[s_all] = np.arange(n)
+    # k-ième réponse d'un axe = réponse à son k-ième envoi
+    for a in np.unique(rec["axis"]):
+        s_idx = np.flatnonzero(sent & (rec["axis"] == a))
+        r_idx = np.flatnonzero(~sent & (rec["axis"] == a))
+        k = min(len(s_idx), len(r_idx))
+        dst = pos[s_idx[:k]]
+        reply[dst] = data[r_idx[:k]]
+        rtt[dst] = rec["rtt"][r_idx[:k]]
+        status[dst] = rec["status"][r_idx[:k]]
+    reply[status != mountCapture.OK] = b""
+    return Exchanges(rec["t"][sent], rec["axis"][sent], rec["cmd"][sent],
+                     data[sent], reply, rtt, status)
+
+
+def load_csv(path: Path) -> Exchanges:
+    """Journal CSV de piloteDepuisFichierWave150 -> échanges (lignes SEND)."""
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        rows = [r for r in csv.DictReader(f) if r["directive"] == "SEND"]
+    payload = np.array([r["payload_sent"].replace("<CR>", "\r").encode("ascii", "replace")
+                        for r in rows], dtype=f"S{WIDTH}")
+    reply = np.array([r["response_text"].encode("ascii", "replace") for r in rows],
+                     dtype=f"S{WIDTH}")
+    ok = np.array([r["ok"] == "True" for r in rows], dtype=bool)
+    timeout = np.array(["timeout" in r["error"] for r in rows], dtype=bool)
+    rtt = np.array([float(r["rtt_ms"] or 0.0) for r in rows]) / 1e3
+    rtt[~ok] = np.nan
+    if rows and "sent_ms" in rows[0] and all(r["sent_ms"] for r in rows):
+        t = np.array([float(r["sent_ms"]) for r in rows]) / 1e3
+    else:
+        # anciens journaux: pas d'instant d'envoi, on cumule les RTT
+        t = np.cumsum(np.nan_to_num(rtt))
+    status = np.where(ok, mountCapture.OK,
+                      np.where(timeout, mountCapture.TIMEOUT, mountCapture.ERROR)).astype(np.uint8)
+    reply[~ok] = b""
+    chars = _chars(payload)
+    axis = chars[:, 2] if payload.dtype.itemsize > 2 else np.zeros(len(payload), np.uint8)
+    axis = np.where(np.isin(axis, list(b"123")), axis, ord("0")).astype(np.uint8)
+    return Exchanges(t, axis, chars[:, 1].copy(), payload, reply, rtt, status)
+
+
+def load_telemetry(path: Path) -> np.ndarray:
+    """Télémétrie telemetryWave150i -> tableau structuré (t, pos1, pos2, st1, st2, valid)."""
+    import telemetryWave150i as tlm
+    dtype = np.dtype([("t", "<f8"), ("pos1", "<i4"), ("pos2", "<i4"),
+                      ("st1", "<u2"), ("st2", "<u2"), ("valid", "u1")])
+    assert dtype.itemsize == tlm.RECORD.size
+    raw = np.fromfile(path, dtype=np.uint8)
+    if raw[:len(tlm.MAGIC)].tobytes() != tlm.MAGIC:
+        raise ValueError(f"{path}: pas un fichier de télémétrie")
+    body = raw[len(tlm.MAGIC):]
+    body = body[:len(body) - len(body) % dtype.itemsize]
+    return body.view(dtype)
+
+
+def load(path: Path):
+    """Charge selon le contenu: échanges (capture, CSV) ou télémétrie."""
+    with Path(path).open("rb") as f:
+        head = f.read(8)
+    if head == mountCapture.MAGIC:
+        return load_capture(path)
+    if head == b"W150TLM1":
+        return load_telemetry(path)
+    return load_csv(path)
+
+
+# =================================================================
+#
+#                 Analyses
+#
+# =================================================================
+def rtt_stats(ex: Exchanges, bins: int = 50) -> dict:
+    """Histogramme (ms) et percentiles des RTT des échanges réussis."""
+    rtt = ex.rtt[np.isfinite(ex.rtt)] * 1e3
+    if len(rtt) == 0:
+        return {"count": 0}
+    counts, edges = np.histogram(rtt, bins=bins)
+    p = np.percentile(rtt, [50, 90, 99])
+    return {"count": int(len(rtt)),
+            "p50": round(float(p[0]), 3), "p90": round(float(p[1]), 3),
+            "p99": round(float(p[2]), 3), "mean": round(float(rtt.mean()), 3),
+            "max": round(float(rtt.max()), 3),
+            "histogram": {"edges_ms": np.round(edges, 3).tolist(), "counts": counts.tolist()}}
+
+
+def failure_rates(ex: Exchanges) -> dict:
+    """Par axe: envois, timeouts, erreurs et taux d'échec."""
+    out = {}
+    for a in np.unique(ex.axis):
+        m = ex.axis == a
+        n = int(m.sum())
+        timeouts = int((m & (ex.status == mountCapture.TIMEOUT)).sum())
+        errors = int((m & (ex.status == mountCapture.ERROR)).sum())
+        out[chr(a)] = {"sent": n, "timeouts": timeouts, "errors": errors,
+                       "failure_rate": round((timeouts + errors) / n, 5) if n else 0.0}
+    return out
+
+
+def positions(ex: Exchanges) -> dict:
+    """Positions lues (:X.0003 int32, :j 24 bits) -> {axe: (t, pos)} triés par t."""
+    ok = ex.status == mountCapture.OK
+    chars = _chars(ex.payload)
+    is_x = ok & (ex.cmd == ord("X")) & (chars[:, 3] == ord("0")) & (chars[:, 4] == ord("0")) \
+        & (chars[:, 5] == ord("0")) & (chars[:, 6] == ord("3"))
+    is_j = ok & (ex.cmd == ord("j"))
+    t = np.concatenate([ex.t[is_x], ex.t[is_j]])
+    pos = np.concatenate([int32_field(ex.reply[is_x]).astype(np.int64),
+                          position24(ex.reply[is_j])])
+    axis = np.concatenate([ex.axis[is_x], ex.axis[is_j]])
+    out = {}
+    for a in (ord("1"), ord("2")):
+        m = axis == a
+        order = np.argsort(t[m], kind="stable")
+        out[chr(a)] = (t[m][order], pos[m][order])
+    return out
+
+
+def motion_profile(t: np.ndarray, pos: np.ndarray) -> dict:
+    """Vitesse (pas/s) et accélération (pas/s²) par différences finies."""
+    if len(t) < 3:
+        return {"samples": int(len(t))}
+    t, idx = np.unique(t, return_index=True)
+    pos = pos[idx].astype(np.float64)
+    vel = np.gradient(pos, t)
+    acc = np.gradient(vel, t)
+    return {"samples": int(len(t)), "t": t, "pos": pos, "vel": vel, "acc": acc,
+            "max_speed": round(float(np.abs(vel).max()), 1),
+            "max_accel": round(float(np.abs(acc).max()), 1),
+            "travel": int(np.abs(np.diff(pos)).sum())}
+
+
+def goto_stop_times(ex: Exchanges) -> dict:
+    """
+    Pour chaque goto (:X.04...) d'un axe: délai jusqu'à la première réponse
+    de :f de cet axe indiquant l'arrêt (Stopped), nan si jamais vu.
+    """
+    chars = _chars(ex.payload)
+    is_goto = (ex.cmd == ord("X")) & (chars[:, 3] == ord("0")) & (chars[:, 4] == ord("4"))
+    is_f = (ex.cmd == ord("f")) & (ex.status == mountCapture.OK)
+    stopped = np.zeros(len(ex.t), dtype=bool)
+    if is_f.any():
+        stopped[is_f] = status_bits(ex.reply[is_f])["Stopped"]
+    out = {}
+    for a in (ord("1"), ord("2")):
+        g = ex.t[is_goto & (ex.axis == a)]
+        s = np.sort(ex.t[stopped & (ex.axis == a)])
+        i = np.searchsorted(s, g, side="right")
+        delay = np.full(len(g), np.nan)
+        seen = i < len(s)
+        delay[seen] = s[i[seen]] - g[seen]
+        out[chr(a)] = {"t": g, "time_to_stop": delay}
+    return out
+
+
+def telemetry_profiles(tl: np.ndarray) -> dict:
+    """Profils de mouvement des deux axes depuis la télémétrie (échantillons valides)."""
+    out = {}
+    for bit, name in ((1, "1"), (2, "2")):
+        m = (tl["valid"] & bit) != 0
+        out[name] = motion_profile(tl["t"][m], tl[f"pos{name}"][m])
+    return out
+
+
+def summarize(data, bins: int = 50) -> dict:
+    """Rapport JSON-isable d'un fichier chargé par load()."""
+    def scalars(d):
+        return {k: v for k, v in d.items() if not isinstance(v, np.ndarray)}
+
+    if not isinstance(data, Exchanges):
+        return {"kind": "telemetry", "samples": int(len(data)),
+                "motion": {a: scalars(p) for a, p in telemetry_profiles(data).items()}}
+    stops = goto_stop_times(data)
+    return {
+        "kind": "session",
+        "exchanges": int(len(data.t)),
+        "duration_s": round(float(data.t.max() - data.t.min()), 3) if len(data.t) else 0.0,
+        "rtt_ms": rtt_stats(data, bins),
+        "failures": failure_rates(data),
+        "motion": {a: scalars(motion_profile(t, p)) for a, (t, p) in positions(data).items()},
+        "gotos": {a: {"count": int(len(s["t"])),
+                      "time_to_stop_s": [None if np.isnan(v) else round(float(v), 4)
+                                         for v in s["time_to_stop"]]}
+                  for a, s in stops.items()},
+    }
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Analyse d'une capture, d'un journal CSV ou d'une télémétrie.")
+    p.add_argument("path", type=Path, help="Fichier .cap, .csv ou .tlm")
+    p.add_argument("--json", type=Path, help="Écrire le rapport en JSON")
+    p.add_argument("--bins", type=int, default=50, help="Classes de l'histogramme des RTT")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        data = load(args.path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"[ERREUR] {args.path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    report = summarize(data, args.bins)
+    text = json.dumps(report, indent=2)
+    if args.json:
+        args.json.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
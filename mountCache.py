@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des réponses aux commandes de lecture, devant un client
+(ThreadSafeUDPClient, PipelinedUDPClient, ThreadSafeSerialClient, ...).
+
+Une lecture (:f1, :X1000B, :X10003, :q1010000, :e1, ...) dont la réponse
+a moins de TTL secondes est servie sans requête vers la monture: les
+threads de parking, la télémétrie et la console qui surveillent le même
+axe partagent les réponses au lieu de multiplier le trafic UDP.
+
+Toute écriture sur un axe (:X.04 goto, :X.02 slew, :X.01 position,
+:W, :F, :K, ...) efface les réponses de cet axe (axe 3: les deux axes).
+Une réponse demandée avant une écriture et reçue après n'est pas gardée.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Tuple
+
+import mountCodec
+
+
+# durée de validité (s) selon la commande (":f", ":X", ...)
+TTL = {
+    b":f": 0.02,        # statut (POLL_MIN de parkAxis)
+    b":j": 0.05,        # position
+    b":X": 0.05,        # :X.00.. (position, index, ...)
+    b":e": 3600.,       # version du firmware
+    b":q": 3600.,       # capacités
+    b":a": 3600., b":b": 3600., b":g": 3600., b":s": 3600., b":D": 3600.,
+}
+DEFAULT_TTL = 0.05
+
+
+def ttl_of(payload: bytes, table=TTL) -> float:
+    return table.get(payload[:2], DEFAULT_TTL)
+
+
+def _axes(payload: bytes):
+    a = payload[2:3]
+    return (b"1", b"2") if a == b"3" else (a,)
+
+
+class CachedClient:
+    """
+    Client à cache de lecture; même contrat que le client enveloppé
+    (send_and_recv, send_batch, submit s'il existe, close). Les autres
+    attributs (inter_cmd_delay, host, ...) sont ceux du client.
+    """
+
+    def __init__(self, client, ttl=None):
+        self.client = client
+        self.ttl = dict(TTL, **(ttl or {}))
+        self.lock = threading.Lock()
+        self._cache = {}        # commande -> (échéance, réponse)
+        self._gen = {}          # axe -> nombre d'écritures
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if hasattr(client, "submit"):
+            self.submit = self._submit
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        if name == "verbose":
+            self.client.verbose = value
+        else:
+            object.__setattr__(self, name, value)
+
+    # --- cache --------------------------------------------------------
+    def _lookup(self, payload: bytes):
+        """(réponse en cache ou None, génération de l'axe); écriture: invalide l'axe."""
+        with self.lock:
+            if not mountCodec.is_query(payload):
+                for a in _axes(payload):
+                    self._gen[a] = self._gen.get(a, 0) + 1
+                    for k in [k for k in self._cache if k[2:3] == a]:
+                        del self._cache[k]
+                        self.invalidations += 1
+                return None, None
+            gen = self._gen.get(payload[2:3], 0)
+            entry = self._cache.get(payload)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1], gen
+            self.misses += 1
+            return None, gen
+
+    def _store(self, payload: bytes, gen, result):
+        ok, resp, err = result
+        if not ok or gen is None or resp is None:
+            return
+        with self.lock:
+            if self._gen.get(payload[2:3], 0) == gen:
+                self._cache[payload] = (time.monotonic() + ttl_of(payload, self.ttl), resp)
+
+    def clear(self):
+        with self.lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "invalidations": self.invalidations,
+                    "hit_ratio": round(self.hits / total, 3) if total else 0.0}
+
+    # --- API client ---------------------------------------------------
+    def send_and_recv(self, cmd, expect_response: bool = True
+                      ) -> Tuple[bool, Optional[str], Optional[str]]:
+        payload = bytes(mountCodec.encode(cmd))
+        resp, gen = self._lookup(payload)
+        if resp is not None and expect_response:
+            if self.client.verbose:
+                print("=" + resp)
+            return True, resp, ""
+        result = self.client.send_and_recv(cmd, expect_response)
+        self._store(payload, gen, result)
+        return result
+
+    def _submit(self, cmd, expect_response: bool = True, **kw) -> Future:
+        payload = bytes(mountCodec.encode(cmd))
+        resp, gen = self._lookup(payload)
+        if resp is not None and expect_response:
+            fut = Future()
+            fut.attempts = 0
+            fut.set_result((True, resp, ""))
+            return fut
+        fut = self.client.submit(cmd, expect_response, **kw)
+        if gen is not None:
+            fut.add_done_callback(lambda f: self._store(payload, gen, f.result()))
+        return fut
+
+    def send_batch(self, cmds, window: int = 1) -> list:
+        """Lot du client enveloppé, sans les lectures servies par le cache."""
+        results = [None] * len(cmds)
+        todo = []
+        for i, c in enumerate(cmds):
+            payload = bytes(mountCodec.encode(c))
+            resp, gen = self._lookup(payload)
+            if resp is not None:
+                results[i] = (True, resp, "")
+            else:
+                todo.append((i, c, payload, gen))
+        sent = self.client.send_batch([t[1] for t in todo], window) if todo else []
+        for (i, c, payload, gen), r in zip(todo, sent):
+            self._store(payload, gen, r)
+            results[i] = r
+        return results
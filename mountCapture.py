@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Capture binaire d'une session (commandes envoyées, réponses reçues).
+
+Fichier: en-tête puis enregistrements ajoutés au fil de l'eau, et à la
+fermeture un index en pied de fichier. Tout est little endian.
+    en-tête     MAGIC | t0 (float64, heure d'époque du début)
+    enregistr.  REC: t (float64, s depuis t0) | direction (uint8, SENT/RECV) |
+                axe (uint8, '1' '2' '3' ou '0') | commande (uint8, ':f1' -> 'f') |
+                statut (uint8, OK/ERROR/TIMEOUT/NO_REPLY) | rtt (float32, s) |
+                longueur (uint16) | octets bruts
+    index       TIME_ENTRY * n: (t, offset) tous les INDEX_EVERY enregistrements
+                par commande: (commande uint8, n uint32) puis n offsets uint64
+    pied        TRAILER: offset index temps | offset index commandes |
+                nombre d'enregistrements | END_MAGIC
+Chaque envoi a son enregistrement RECV, même sans réponse attendue
+(statut NO_REPLY, octets vides): les envois et réponses d'un axe
+s'apparient dans l'ordre.
+Une capture interrompue (pas de pied) reste lisible: le lecteur
+reconstruit l'index par un parcours séquentiel.
+
+CaptureReader projette le fichier en mémoire (mmap): itération, accès
+par instant (seek) ou par commande sans tout charger.
+
+usage: python mountCapture.py session.cap [--csv out.csv]
+                              [--start s] [--end s] [--cmd f]
+"""
+
+import argparse
+import bisect
+import csv
+import mmap
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional, Union
+
+import mountCodec
+
+
+MAGIC = b"W150CAP1"
+END_MAGIC = b"W150IDX1"
+HEADER = struct.Struct("<8sd")
+REC = struct.Struct("<dBBBBfH")
+TIME_ENTRY = struct.Struct("<dQ")
+TYPE_ENTRY = struct.Struct("<BI")
+OFFSET = struct.Struct("<Q")
+TRAILER = struct.Struct("<QQQ8s")
+
+SENT, RECV = 0, 1
+OK, ERROR, TIMEOUT, NO_REPLY = 0, 1, 2, 3
+INDEX_EVERY = 256
+
+
+class Record(NamedTuple):
+    """Un enregistrement de la capture (t en s depuis le début)."""
+    t: float
+    direction: int
+    axis: str
+    cmd: str
+    status: int
+    rtt: float
+    data: bytes
+
+
+def _cmd_axis(payload) -> tuple:
+    cmd = payload[1] if len(payload) > 1 else ord("?")
+    axis = payload[2] if len(payload) > 2 and chr(payload[2]) in "123" else ord("0")
+    return cmd, axis
+
+
+# =================================================================
+#
+#                 Écriture
+#
+# =================================================================
+class CaptureWriter:
+    """Écrit une capture; utilisable depuis plusieurs threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.t0 = time.time()
+        self._p0 = time.perf_counter()
+        self._f = self.path.open("wb", buffering=1 << 16)
+        self._f.write(HEADER.pack(MAGIC, self.t0))
+        self._offset = HEADER.size
+        self._times = []        # (t, offset) tous les INDEX_EVERY enregistrements
+        self._types = {}        # commande -> offsets
+        self.count = 0
+
+    def now(self) -> float:
+        return time.perf_counter() - self._p0
+
+    def record(self, direction: int, payload, cmd: int, axis: int,
+               status: int = OK, rtt: float = 0.0, t: Optional[float] = None):
+        payload = bytes(payload[:0xFFFF])
+        t = self.now() if t is None else t
+        with self.lock:
+            if self._f is None:
+                return
+            if self.count % INDEX_EVERY == 0:
+                self._times.append((t, self._offset))
+            self._types.setdefault(cmd, []).append(self._offset)
+            self._f.write(REC.pack(t, direction, axis, cmd, status, rtt, len(payload)))
+            self._f.write(payload)
+            self._offset += REC.size + len(payload)
+            self.count += 1
+
+    def sent(self, payload, t: Optional[float] = None):
+        """Commande envoyée; retourne l'instant noté (pour le rtt de la réponse)."""
+        t = self.now() if t is None else t
+        cmd, axis = _cmd_axis(payload)
+        self.record(SENT, payload, cmd, axis, OK, 0.0, t)
+        return t
+
+    def received(self, cmd_payload, reply, t_sent: float, err: str = ""):
+        """Réponse (octets bruts, ou None si rien reçu) à la commande cmd_payload."""
+        t = self.now()
+        cmd, axis = _cmd_axis(cmd_payload)
+        if reply is None:
+            status = TIMEOUT if "timeout" in (err or "") else ERROR
+            reply = (err or "").encode("ascii", "replace")
+        else:
+            status = OK if reply[:1] == b"=" else ERROR
+        self.record(RECV, reply, cmd, axis, status, t - t_sent, t)
+
+    def unanswered(self, cmd_payload, t_sent: float):
+        """Fin d'une commande envoyée sans attendre de réponse (NO_REPLY)."""
+        t = self.now()
+        cmd, axis = _cmd_axis(cmd_payload)
+        self.record(RECV, b"", cmd, axis, NO_REPLY, t - t_sent, t)
+
+    def close(self):
+        with self.lock:
+            if self._f is None:
+                return
+            f, self._f = self._f, None
+            time_off = self._offset
+            for t, off in self._times:
+                f.write(TIME_ENTRY.pack(t, off))
+            type_off = time_off + TIME_ENTRY.size * len(self._times)
+            for cmd, offs in sorted(self._types.items()):
+                f.write(TYPE_ENTRY.pack(cmd, len(offs)))
+                f.write(b"".join(OFFSET.pack(o) for o in offs))
+            f.write(TRAILER.pack(time_off, type_off, self.count, END_MAGIC))
+            f.close()
+
+
+class CapturingClient:
+    """
+    Client qui capture chaque commande et sa réponse dans un CaptureWriter;
+    même contrat que le client enveloppé. Les réponses sont reconstruites
+    ('=' + réponse + <cr>) à partir de ce que le client renvoie.
+    """
+
+    def __init__(self, client, writer: CaptureWriter):
+        self.client = client
+        self.writer = writer
+        if hasattr(client, "submit"):
+            self.submit = self._submit
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        if name == "verbose":
+            self.client.verbose = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def _done(self, payload, t_sent, result, expect_response):
+        ok, resp, err = result
+        if not expect_response:
+            self.writer.unanswered(payload, t_sent)
+            return
+        reply = ("=" + resp + "\r").encode("ascii") if ok and resp is not None else (
+            None if err else b"!\r")
+        self.writer.received(payload, reply, t_sent, err)
+
+    def send_and_recv(self, cmd, expect_response: bool = True):
+        payload = mountCodec.encode(cmd)
+        t_sent = self.writer.sent(payload)
+        result = self.client.send_and_recv(cmd, expect_response)
+        self._done(payload, t_sent, result, expect_response)
+        return result
+
+    def _submit(self, cmd: Union[str, bytes], expect_response: bool = True, **kw):
+        """submit du client enveloppé (cmd: texte ou octets encodés), capturé."""
+        payload = bytes(mountCodec.encode(cmd))
+        t_sent = self.writer.sent(payload)
+        fut = self.client.submit(cmd, expect_response, **kw)
+        fut.add_done_callback(lambda f: self._done(payload, t_sent, f.result(), expect_response))
+        return fut
+
+    def send_batch(self, cmds, window: int = 1) -> list:
+        payloads = [bytes(mountCodec.encode(c)) for c in cmds]
+        t_sent = [self.writer.sent(p) for p in payloads]
+        results = self.client.send_batch(cmds, window)
+        for p, t, r in zip(payloads, t_sent, results):
+            self._done(p, t, r, True)
+        return results
+
+    def close(self):
+        self.client.close()
+        self.writer.close()
+
+
+# =================================================================
+#
+#                 Lecture
+#
+# =================================================================
+class CaptureReader:
+    """Capture projetée en mémoire; à fermer (ou with)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._f = self.path.open("rb")
+        self.mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.t0 = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: pas un fichier de capture")
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+        self._f.close()
+
+    def _load_index(self):
+        mm = self.mm
+        self.times, self.types = [], {}
+        self.spans = {}         # commande -> (offset, n) de ses offsets dans le pied
+        if len(mm) >= HEADER.size + TRAILER.size:
+            time_off, type_off, count, end = TRAILER.unpack_from(mm, len(mm) - TRAILER.size)
+            if end == END_MAGIC:
+                self.end = time_off
+                self.count = count
+                self.times = [TIME_ENTRY.unpack_from(mm, o)
+                              for o in range(time_off, type_off, TIME_ENTRY.size)]
+                off, stop = type_off, len(mm) - TRAILER.size
+                while off < stop:
+                    cmd, n = TYPE_ENTRY.unpack_from(mm, off)
+                    off += TYPE_ENTRY.size
+                    self.types[chr(cmd)] = struct.unpack_from(f"<{n}Q", mm, off)
+                    self.spans[chr(cmd)] = (off, n)
+                    off += n * OFFSET.size
+                return
+        # capture interrompue: index reconstruit par un parcours
+        self.end = len(mm)
+        self.count = 0
+        types = {}
+        for off in self.offsets():
+            t, _, _, cmd, _, _, _ = REC.unpack_from(mm, off)
+            if self.count % INDEX_EVERY == 0:
+                self.times.append((t, off))
+            types.setdefault(chr(cmd), []).append(off)
+            self.count += 1
+        self.types = {k: tuple(v) for k, v in types.items()}
+
+    def offsets(self, off: int = HEADER.size):
+        """Offsets des enregistrements complets à partir de off."""
+        while off + REC.size <= self.end:
+            n = REC.unpack_from(self.mm, off)[6]
+            if off + REC.size + n > self.end:
+                break
+            yield off
+            off += REC.size + n
+
+    def at(self, off: int) -> Record:
+        t, d, axis, cmd, status, rtt, n = REC.unpack_from(self.mm, off)
+        start = off + REC.size
+        return Record(t, d, chr(axis), chr(cmd), status, rtt, self.mm[start:start + n])
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self.at(off) for off in self.offsets())
+
+    def seek(self, t: float):
+        """Itère à partir du premier enregistrement d'instant >= t."""
+        i = bisect.bisect_right([e[0] for e in self.times], t) - 1
+        start = self.times[i][1] if i >= 0 else HEADER.size
+        for off in self.offsets(start):
+            rec = self.at(off)
+            if rec.t >= t:
+                yield rec
+
+    def by_command(self, cmd: str):
+        """Enregistrements (envois et réponses) d'un type de commande ('f', 'X', ...)."""
+        return (self.at(off) for off in self.types.get(cmd, ()))
+
+
+# =================================================================
+#
+#                 Conversion CSV
+#
+# =================================================================
+def to_csv(reader: CaptureReader, out: Path, records=None) -> int:
+    """
+    Écrit les échanges (envoi + réponse) au format CSV de
+    piloteDepuisFichierWave150; retourne le nombre de lignes.
+    """
+    from piloteDepuisFichierWave150 import CSV_HEADER, hexdump, normalize_text_resp
+    pending = {}        # axe -> envois sans réponse, dans l'ordre
+    n = 0
+    with Path(out).open("w", newline="", encoding="utf-8") as fcsv:
+        w = csv.writer(fcsv)
+        w.writerow(CSV_HEADER)
+        for rec in (records if records is not None else reader):
+            if rec.direction == SENT:
+                pending.setdefault(rec.axis, []).append(rec)
+                continue
+            queue = pending.get(rec.axis)
+            if not queue:
+                continue
+            sent = queue.pop(0)
+            payload = bytes(sent.data)
+            payload_str = payload.decode("ascii", errors="replace")
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(reader.t0 + sent.t))
+            if rec.status == NO_REPLY:
+                row = [stamp, payload_str.replace("\r", "<cr>"), "SEND",
+                       payload_str.replace("\r", "<CR>"), hexdump(payload), True, "", "",
+                       round(rec.rtt * 1000.0, 2), "", "", round(sent.t * 1000.0, 3)]
+            elif rec.status == OK or rec.status == ERROR and rec.data[:1] == b"!":
+                txt = normalize_text_resp(bytes(rec.data))
+                ok = txt.startswith("=")
+                row = [stamp, payload_str.replace("\r", "<cr>"), "SEND",
+                       payload_str.replace("\r", "<CR>"), hexdump(payload), ok, txt,
+                       hexdump(bytes(rec.data)), round(rec.rtt * 1000.0, 2),
+                       "" if ok else "Unexpected format", "", round(sent.t * 1000.0, 3)]
+            else:
+                row = [stamp, payload_str.replace("\r", "<cr>"), "SEND",
+                       payload_str.replace("\r", "<CR>"), hexdump(payload), False, "", "",
+                       0.0, bytes(rec.data).decode("ascii", "replace"),
+                       "", round(sent.t * 1000.0, 3)]
+            w.writerow(row)
+            n += 1
+    return n
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Lecture / conversion d'une capture de session.")
+    p.add_argument("capture", type=Path, help="Fichier de capture")
+    p.add_argument("--csv", type=Path, help="Convertir en CSV (colonnes de piloteDepuisFichier)")
+    p.add_argument("--start", type=float, default=None, help="À partir de t (s)")
+    p.add_argument("--end", type=float, default=None, help="Jusqu'à t (s)")
+    p.add_argument("--cmd", default=None, help="Seulement ce type de commande (f, X, j, ...)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        reader = CaptureReader(args.capture)
+    except (OSError, ValueError) as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        sys.exit(1)
+    with reader:
+        if args.cmd:
+            records = reader.by_command(args.cmd)
+        elif args.start is not None:
+            records = reader.seek(args.start)
+        else:
+            records = iter(reader)
+        records = (r for r in records
+                   if (args.start is None or r.t >= args.start)
+                   and (args.end is None or r.t <= args.end))
+        if args.csv:
+            n = to_csv(reader, args.csv, records)
+            print(f"[CAP] {n} échanges -> {args.csv}", file=sys.stderr)
+            return
+        names = {SENT: ">", RECV: "<"}
+        for r in records:
+            rtt = f" {r.rtt * 1e3:.2f} ms" if r.direction == RECV else ""
+            print(f"{r.t:10.4f} {names[r.direction]} {r.axis} "
+                  f"{bytes(r.data).decode('ascii', 'replace').strip()!s}{rtt}")
+    print(f"[CAP] {len(reader)} enregistrements", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
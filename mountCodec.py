@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Codage des commandes et décodage des réponses, commun aux clients UDP et série.
+
+- encode(): commandes normalisées (espaces retirés, <cr> final) et mises
+  en cache sous forme de bytes; les commandes fixes des boucles de
+  polling (:f1, :X10003, :X1000B, ...) sont pré-encodées à l'import.
+- encode_goto(): commande :X.04 écrite en place dans un bytearray réutilisé.
+- decode_reply(): réponse lue par recvfrom_into dans un tampon préalloué.
+- int32(): hexa -> entier signé 32 bits par arithmétique (sans ctypes).
+- is_query(): commande de lecture seule (cache, coalescence).
+- retry_safe(): commande qui peut être réémise sans risque (réémission rapide).
+- reply_length(): longueur attendue de la réponse (réponses tardives).
+"""
+
+import threading
+from typing import Optional, Tuple
+
+
+CACHE_MAX = 512         # au-delà, les nouvelles commandes ne sont plus mises en cache
+
+_cache = {}
+
+FIXED_COMMANDS = [
+    c for a in "12" for c in (
+        f":f{a}", f":e{a}", f":j{a}", f":F{a}",
+        f":X{a}0003", f":X{a}000B", f":X{a}0002",
+        f":W{a}080000", f":X{a}020000000000000000",
+    )
+]
+
+
+def _normalize(cmd: str) -> bytes:
+    return (cmd.strip().replace(" ", "") + "\r").encode("ascii", errors="ignore")
+
+
+def encode(cmd) -> bytes:
+    """Commande -> octets à envoyer (avec <cr>). bytes/bytearray passent tels quels."""
+    if not isinstance(cmd, str):
+        return cmd
+    b = _cache.get(cmd)
+    if b is None:
+        b = _normalize(cmd)
+        if len(_cache) < CACHE_MAX:
+            _cache[cmd] = b
+    return b
+
+
+for _c in FIXED_COMMANDS:
+    encode(_c)
+
+
+# ----------------------------
+# GOTO: :X<axe>04<cible 8 hexa><16 zéros><cr>
+# ----------------------------
+_HEX = b"0123456789ABCDEF"
+_GOTO_TEMPLATE = b":X004" + b"0" * 8 + b"0" * 16 + b"\r"
+_local = threading.local()
+
+
+def encode_goto(axis: str, target: int, out: Optional[bytearray] = None) -> bytearray:
+    """
+    Écrit la commande de goto de `axis` vers `target` dans `out` (ou dans un
+    tampon propre au thread appelant, valable jusqu'à l'appel suivant).
+    """
+    if out is None:
+        out = getattr(_local, "goto", None)
+        if out is None:
+            out = _local.goto = bytearray(_GOTO_TEMPLATE)
+    elif len(out) != len(_GOTO_TEMPLATE):
+        out[:] = _GOTO_TEMPLATE
+    out[2] = ord(axis)
+    v = target & 0xFFFFFFFF
+    for i in range(12, 4, -1):
+        out[i] = _HEX[v & 0xF]
+        v >>= 4
+    return out
+
+
+# ----------------------------
+# Réponses
+# ----------------------------
+_EQ = ord("=")
+_CR = ord("\r")
+_LF = ord("\n")
+
+
+def decode_reply(buf, n: int) -> Tuple[bool, Optional[str]]:
+    """
+    Réponse brute buf[:n] -> (ok, texte sans '=' ni <cr>).
+    ok est False pour une réponse vide ou d'erreur ('!..').
+    """
+    while n and buf[n - 1] in (_CR, _LF):
+        n -= 1
+    if n == 0 or buf[0] != _EQ:
+        return False, None
+    return True, str(memoryview(buf)[1:n], "ascii", "ignore")
+
+
+# commandes de lecture: :a :b :d :e :f :g :j :q :s :D, et :X<axe>00..
+QUERY_CMDS = b"abdefgjqsD"
+
+
+def is_query(payload: bytes) -> bool:
+    """Vrai pour une commande (encodée) qui ne fait que lire l'état de la monture."""
+    if len(payload) < 3 or payload[0] != ord(":"):
+        return False
+    if payload[1] in QUERY_CMDS:
+        return True
+    return payload[1] == ord("X") and payload[3:5] == b"00"
+
+
+# écritures qui fixent une valeur: les rejouer laisse la monture dans le même état
+# (:F init faite, :P vitesse d'autoguidage, :V, :X.01 position, :X.05 / :X.0E)
+_IDEMPOTENT = b"FPVKL"
+_IDEMPOTENT_X = (b"01", b"05", b"0E")
+_STOP_SPEED = b"0" * 16
+
+
+def retry_safe(payload: bytes) -> bool:
+    """
+    Vrai si la commande peut être réémise dès qu'un délai court (RTO)
+    expire: lectures et écritures idempotentes, dont l'arrêt :X.02 à
+    vitesse nulle. Les gotos (:X.04), slews (:X.02 à vitesse non nulle)
+    et :W (remise à zéro de l'index) ne le sont pas: une réponse perdue
+    ne dit pas si la commande a été exécutée.
+    """
+    if is_query(payload):
+        return True
+    if len(payload) < 3 or payload[0] != ord(":"):
+        return False
+    if payload[1] in _IDEMPOTENT:
+        return True
+    if payload[1] == ord("X"):
+        sub = payload[3:5]
+        return sub in _IDEMPOTENT_X or (sub == b"02" and payload[5:21] == _STOP_SPEED)
+    return False
+
+
+# longueur de la réponse (sans '=' ni <cr>), seulement pour les commandes
+# dont elle est sûre: une longueur fausse ferait écarter la bonne réponse
+# comme tardive. Les autres (:a :b :s :q :D, :X.01 :X.05 :X.0E, ...)
+# rendent None: pas de filtrage.
+_REPLY_LENGTH = {ord("f"): 3, ord("e"): 6, ord("j"): 6,
+                 ord("F"): 0, ord("W"): 0, ord("P"): 0, ord("V"): 0}
+_REPLY_LENGTH_X = {b"0003": 8, b"000B": 8, b"02": 0, b"04": 0}
+
+
+def reply_length(payload: bytes) -> Optional[int]:
+    """
+    Longueur attendue de la réponse à payload, None si inconnue.
+    Une réponse '=' d'une autre longueur est la réponse tardive d'une
+    commande précédente (après un timeout) et doit être ignorée.
+    """
+    if len(payload) < 3:
+        return None
+    if payload[1] == ord("X"):
+        sub = bytes(payload[3:5])
+        return _REPLY_LENGTH_X.get(bytes(payload[3:7]) if sub == b"00" else sub)
+    return _REPLY_LENGTH.get(payload[1])
+
+
+def int32(resp) -> int:
+    """Chaîne (ou octets) hexa -> entier signé 32 bits."""
+    v = int(resp, 16) & 0xFFFFFFFF
+    return v - 0x100000000 if v & 0x80000000 else v
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Démon local propriétaire de la liaison avec la monture (UDP ou série).
+
+Les outils (initAndParkWave150i --iface DAEMON, piloteDepuisFichierWave150
+--daemon, telemetryWave150i --daemon, ...) se connectent à un socket Unix
+au lieu d'ouvrir chacun leur socket / port série: le port USB, qui ne peut
+être ouvert que par un processus, est partagé, et l'ouverture d'un outil
+ne coûte plus qu'une connexion locale.
+
+Protocole sur le socket Unix (flux, une ligne par requête, fin = <cr>):
+    :f1<cr>          -> =<réponse><cr>  ou  !<erreur><cr>
+    ~:X1020...<cr>   -> =<cr>           (commande sans réponse attendue)
+    ?id<cr>          -> =<identifiant de la monture><cr>
+    ?stats<cr>       -> =requests=.. coalesced=.. clients=..<cr>
+    ?metrics<cr>     -> =<mesures du client vers la monture, JSON><cr>
+Un client peut envoyer plusieurs lignes sans attendre: les réponses
+reviennent dans l'ordre des requêtes de la connexion.
+
+Deux requêtes de lecture identiques (:f1, :j2, :X10003, ...) en cours en
+même temps, venant de clients différents, ne partent qu'une fois vers la
+monture, sauf si une commande d'écriture sur le même axe les sépare.
+
+usage: python mountDaemon.py [--iface UDP|USB] [--host H] [--port P]
+                             [--socket PATH] [--no-pipeline]
+                             [--metrics-port N] [--metrics-json FILE]
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Tuple, Union
+
+import mountCodec
+import mountMetrics
+import mountState
+
+
+DAEMON_PATH = "/tmp/wave150i.sock"
+
+
+def _axis(payload: bytes) -> int:
+    return payload[2] if len(payload) > 2 else 0
+
+
+# =================================================================
+#
+#                 Démon
+#
+# =================================================================
+class MountDaemon:
+    """
+    Partage un client (make_client) entre les connexions du socket Unix.
+    submit() renvoie un Future (ok, resp, err), partagé par les lectures
+    identiques simultanées.
+    """
+
+    def __init__(self, conn, path: str = DAEMON_PATH, pipeline: bool = True):
+        from initAndParkWave150i import make_client
+        self.client = make_client(conn, pipeline)
+        self.client.verbose = False
+        self.mount = mountState.mount_id(self.client)
+        self.path = path
+        self.lock = threading.Lock()
+        self._pending = {}      # lecture en vol -> (Future, génération d'écriture de l'axe)
+        self._writes = {}       # axe -> nombre d'écritures soumises
+        self.requests = 0
+        self.coalesced = 0
+        self.clients = 0
+        self._server = None
+        self._thread = None
+
+    # --- requêtes -----------------------------------------------------
+    def submit(self, cmd, expect_response: bool = True) -> Future:
+        payload = mountCodec.encode(cmd)
+        axis = _axis(payload)
+        coalesce = expect_response and mountCodec.is_query(payload)
+        sync = not hasattr(self.client, "submit")
+        with self.lock:
+            self.requests += 1
+            gen = self._writes.get(axis, 0)
+            if coalesce:
+                entry = self._pending.get(payload)
+                if entry is not None and entry[1] == gen:
+                    self.coalesced += 1
+                    return entry[0]
+            else:
+                self._writes[axis] = gen + 1
+            if sync:
+                fut = Future()
+            else:
+                # soumis sous le lock: l'ordre d'envoi suit l'ordre des requêtes
+                fut = self.client.submit(payload, expect_response)
+            if coalesce:
+                self._pending[payload] = (fut, gen)
+        if coalesce:
+            fut.add_done_callback(lambda f, k=payload: self._forget(k, f))
+        if sync:
+            # client série: la requête s'exécute dans le thread de la connexion
+            try:
+                fut.set_result(self.client.send_and_recv(payload, expect_response))
+            except Exception as e:
+                fut.set_result((False, None, f"<error: {e}>"))
+        return fut
+
+    def _forget(self, key, fut):
+        with self.lock:
+            entry = self._pending.get(key)
+            if entry is not None and entry[0] is fut:
+                del self._pending[key]
+
+    def stats(self) -> str:
+        return f"requests={self.requests} coalesced={self.coalesced} clients={self.clients}"
+
+    def prometheus(self) -> str:
+        """Mesures du client vers la monture et compteurs du démon (format Prometheus)."""
+        lab = f'{{mount="{self.mount}"}}'
+        out = [self.client.metrics.prometheus(labels={"mount": self.mount})]
+        for name, kind, v in (("daemon_requests_total", "counter", self.requests),
+                              ("daemon_coalesced_total", "counter", self.coalesced),
+                              ("daemon_clients", "gauge", self.clients)):
+            out.append(f"# TYPE wave150i_{name} {kind}\nwave150i_{name}{lab} {v}\n")
+        return "".join(out)
+
+    # --- serveur ------------------------------------------------------
+    def start(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                probe.close()
+                raise RuntimeError(f"un démon écoute déjà sur {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)        # socket orphelin d'un démon arrêté
+        self._server = _Server(self.path, _Handler)
+        self._server.mount_daemon = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="daemon-accept", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(timeout=2.0)
+            self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.client.close()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    mount_daemon = None
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Une connexion: lecture des requêtes ici, réponses dans l'ordre par un thread d'écriture."""
+
+    def handle(self):
+        daemon = self.server.mount_daemon
+        with daemon.lock:
+            daemon.clients += 1
+        replies = deque()
+        ready = threading.Condition()
+        writer = threading.Thread(target=self._write_loop, args=(replies, ready),
+                                  name="daemon-write", daemon=True)
+        writer.start()
+        buf = b""
+        try:
+            while True:
+                try:
+                    data = self.request.recv(4096)
+                except OSError:
+                    break
+                if not data:
+                    break
+                buf += data
+                *lines, buf = buf.split(b"\r")
+                for line in lines:
+                    line = line.strip()
+                    if line:
+                        fut = self._dispatch(daemon, line)
+                        with ready:
+                            replies.append(fut)
+                            ready.notify()
+        finally:
+            with ready:
+                replies.append(None)
+                ready.notify()
+            writer.join(timeout=5.0)
+            with daemon.lock:
+                daemon.clients -= 1
+
+    def _dispatch(self, daemon, line: bytes) -> Future:
+        if line.startswith(b"?"):
+            fut = Future()
+            if line == b"?id":
+                fut.set_result((True, daemon.mount, ""))
+            elif line == b"?stats":
+                fut.set_result((True, daemon.stats(), ""))
+            elif line == b"?metrics":
+                fut.set_result((True, json.dumps(daemon.client.metrics.snapshot()), ""))
+            else:
+                fut.set_result((False, None, f"requête inconnue {line!r}"))
+            return fut
+        if line.startswith(b"~"):
+            return daemon.submit(line[1:] + b"\r", expect_response=False)
+        return daemon.submit(line + b"\r")
+
+    def _write_loop(self, replies, ready):
+        while True:
+            with ready:
+                while not replies:
+                    ready.wait()
+                fut = replies.popleft()
+            if fut is None:
+                return
+            ok, resp, err = fut.result()
+            out = ("=" + (resp or "")) if ok else ("!" + (err or ""))
+            try:
+                self.request.sendall(out.replace("\r", " ").encode("ascii", "replace") + b"\r")
+            except OSError:
+                return
+
+
+# =================================================================
+#
+#                 Client
+#
+# =================================================================
+class DaemonClient:
+    """
+    Client du démon, même contrat que ThreadSafeUDPClient
+    (send_and_recv -> (ok, resp, err)). Les requêtes de plusieurs threads
+    sont pipelinées sur la connexion: submit() renvoie un Future.
+    metrics: latences vues du client (démon et monture compris).
+    """
+
+    def __init__(self, path: str = DAEMON_PATH, inter_cmd_delay: float = 0.05):
+        self.path = path
+        self.inter_cmd_delay = inter_cmd_delay
+        self.verbose = True
+        self.metrics = mountMetrics.ClientMetrics()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(self.path)
+        except OSError as e:
+            raise RuntimeError(f"Démon injoignable sur {self.path}: {e}")
+        self.lock = threading.Lock()            # protège l'envoi + la file
+        self._waiting = deque()                 # (Future, ligne, appel, envoi) dans l'ordre des requêtes
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="daemon-read", daemon=True)
+        self._reader.start()
+        ok, ident, err = self.submit("?id").result()
+        self.mount_id = ident if ok else self.path
+
+    def _read_loop(self):
+        buf = b""
+        err = "démon déconnecté"
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError as e:
+                err = f"OSError: {e}"
+                data = b""
+            if not data:
+                break
+            buf += data
+            *lines, buf = buf.split(b"\r")
+            for line in lines:
+                with self.lock:
+                    fut, req, t, t0 = self._waiting.popleft()
+                ok = line.startswith(b"=")
+                if not req.startswith(b"?"):
+                    self.metrics.record(req.lstrip(b"~"), time.perf_counter() - t0, ok,
+                                        received=len(line) + 1, wait=t0 - t)
+                if ok:
+                    fut.set_result((True, str(line[1:], "ascii", "ignore"), ""))
+                else:
+                    fut.set_result((False, None, str(line[1:], "ascii", "ignore")))
+        with self.lock:
+            self._closed = True
+            while self._waiting:
+                self._waiting.popleft()[0].set_result((False, None, err))
+
+    def submit(self, cmd: Union[str, bytes], expect_response: bool = True,
+               window: Optional[int] = None) -> Future:
+        """
+        cmd: texte ou octets encodés (contrat de PipelinedUDPClient.submit).
+        window: accepté pour le contrat de PipelinedUDPClient (le démon ordonne).
+        """
+        line = mountCodec.encode(cmd)
+        if not expect_response:
+            line = b"~" + line
+        fut = Future()
+        t = time.perf_counter()
+        with self.lock:
+            if self._closed:
+                fut.set_result((False, None, "démon déconnecté"))
+                return fut
+            self._waiting.append((fut, line, t, time.perf_counter()))
+            try:
+                self.sock.sendall(line)
+            except OSError as e:
+                self._waiting.pop()
+                fut.set_result((False, None, f"OSError: {e}"))
+        return fut
+
+    def send_and_recv(self, cmd, expect_response: bool = True
+                      ) -> Tuple[bool, Optional[str], Optional[str]]:
+        ok, resp, err = self.submit(cmd, expect_response).result()
+        if not expect_response:
+            resp = None
+        elif ok and self.verbose:
+            print("=" + resp)
+        return ok, resp, err
+
+    def send_batch(self, cmds, window: int = 8) -> list:
+        """Lot de commandes envoyées d'un coup; le démon répond dans l'ordre."""
+        futures = [self.submit(c) for c in cmds]
+        return [f.result() for f in futures]
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.join(timeout=2.0)
+        self.sock.close()
+
+
+# ----------------------------
+# programme principal
+# ----------------------------
+def parse_args():
+    p = argparse.ArgumentParser(description="Démon local partageant la liaison avec la monture.")
+    p.add_argument("--iface", default="UDP", choices=["UDP", "USB"], help="Liaison [def: UDP]")
+    p.add_argument("--host", default=None, help="Adresse de la monture [def: 192.168.4.1]")
+    p.add_argument("--port", default=None,
+                   help="Port UDP [def: 11880] ou port série (USB)")
+    p.add_argument("--baud", type=int, default=None,
+                   help="USB: débit du port série [def: 9600]")
+    p.add_argument("--socket", default=DAEMON_PATH,
+                   help=f"Socket Unix d'écoute [def: {DAEMON_PATH}]")
+    p.add_argument("--no-pipeline", action="store_true",
+                   help="UDP: client à un seul socket (ThreadSafeUDPClient)")
+    p.add_argument("--metrics-port", type=int, default=None,
+                   help="Sert les mesures au format Prometheus sur http://127.0.0.1:N/metrics")
+    p.add_argument("--metrics-json", default=None,
+                   help="Écrit les mesures (JSON) dans ce fichier toutes les 10 s")
+    return p.parse_args()
+
+
+def main():
+    from initAndParkWave150i import Connection
+    args = parse_args()
+    port = int(args.port) if args.iface == "UDP" and args.port else args.port
+    daemon = MountDaemon(Connection(args.iface, host=args.host, port=port, baud=args.baud),
+                         args.socket, pipeline=not args.no_pipeline)
+    try:
+        daemon.start()
+    except RuntimeError as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"[DAEMON] {daemon.mount} <- {args.socket}", file=sys.stderr)
+    http = dumper = None
+    if args.metrics_port:
+        http = mountMetrics.serve_prometheus(daemon.prometheus, args.metrics_port)
+    if args.metrics_json:
+        dumper = mountMetrics.JsonDumper(daemon.client.metrics, args.metrics_json).start()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"[DAEMON] {daemon.stats()}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if http is not None:
+            http.shutdown()
+        if dumper is not None:
+            dumper.stop()
+        daemon.stop()
+    print(daemon.client.metrics.report(), file=sys.stderr)
+    print(f"[DAEMON] arrêt: {daemon.stats()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Découverte des montures joignables: :e1 (version du firmware, lecture sans
+effet) diffusé en UDP sur le port 11880 des sous-réseaux configurés, et
+envoyé en parallèle sur les ports série candidats.
+
+Chaque monture qui répond est rendue (Found) avec sa réponse à :e1 et le
+RTT mesuré; found.connection() donne la Connection à passer à make_client,
+found.address l'entrée d'inventaire de fleetWave150i (--discover).
+
+UDP: un seul socket, une diffusion par sous-réseau, répétée à mi-délai
+contre une perte; les réponses sont lues jusqu'au délai (0.3 s). Le RTT
+est compté depuis la première diffusion (majoré si elle a été perdue).
+Série: un thread par port, chaque débit de BAUDRATES essayé tour à tour
+(0.15 s chacun). Les ports /dev/ttyACM* (Arduino, modems...) ne sont
+sondés qu'avec --acm: :e1 y serait écrit sans savoir ce qui écoute.
+
+UDP et série se font en même temps: une découverte dure environ 0.3 s,
+quel que soit le nombre de montures.
+
+usage: python mountDiscovery.py [--subnet 192.168.4.0/24 ...] [--port 11880 ...]
+                                [--serial PORT ...] [--no-serial] [--acm] [--timeout s]
+                                [--inventory FILE] [--json FILE]
+"""
+
+import argparse
+import fnmatch
+import glob
+import ipaddress
+import json
+import select
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import serial
+
+import mountCodec
+from initAndParkWave150i import BAUDRATES, Connection
+
+
+SUBNETS = ("192.168.4.0/24",)       # réseau du point d'accès Wifi de la monture
+UDP_PORTS = (11880,)
+SERIAL_PATTERNS = ("/dev/tty.usbserial*", "/dev/ttyUSB*")
+ACM_PATTERN = "/dev/ttyACM*"        # USB CDC: sondé seulement sur demande (--acm)
+UDP_TIMEOUT = 0.3       # s: attente des réponses à la diffusion
+SERIAL_TIMEOUT = 0.15   # s: attente de la réponse, par débit essayé
+PROBE = b":e1\r"
+
+
+class Found(NamedTuple):
+    """Monture qui a répondu à :e1."""
+    iface: str              # "UDP" ou "USB"
+    host: Optional[str]     # adresse IP (UDP)
+    port: object            # port UDP (int) ou port série (str)
+    baud: Optional[int]     # débit du port série (USB)
+    firmware: str           # réponse à :e1
+    rtt: float              # s
+
+    @property
+    def address(self) -> str:
+        """Entrée d'inventaire (fleetWave150i): host:port ou port série."""
+        return f"{self.host}:{self.port}" if self.iface == "UDP" else self.port
+
+    def connection(self) -> Connection:
+        return Connection(self.iface, host=self.host, port=self.port, baud=self.baud)
+
+
+def _is_probe_reply(ok: bool, resp: Optional[str]) -> bool:
+    return ok and len(resp) == 6
+
+
+# =================================================================
+#
+#                 UDP
+#
+# =================================================================
+def broadcast_address(subnet: str) -> str:
+    """'192.168.4.0/24' -> '192.168.4.255' ('127.0.0.1/32' -> '127.0.0.1')."""
+    return str(ipaddress.ip_network(subnet, strict=False).broadcast_address)
+
+
+def discover_udp(subnets=SUBNETS, ports=UDP_PORTS, timeout: float = UDP_TIMEOUT) -> list:
+    """Montures qui répondent à :e1 diffusé sur chaque (sous-réseau, port)."""
+    dests = [(broadcast_address(s), p) for s in subnets for p in ports]
+    found = {}
+    buf = bytearray(256)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.bind(("", 0))
+        t0 = time.monotonic()
+        end = t0 + timeout
+        rounds = [t0, t0 + timeout / 2]     # deuxième diffusion contre une perte
+        while True:
+            now = time.monotonic()
+            if rounds and now >= rounds[0]:
+                rounds.pop(0)
+                for dest in dests:
+                    try:
+                        sock.sendto(PROBE, dest)
+                    except OSError:
+                        pass        # sous-réseau sans route: les autres continuent
+                continue
+            if now >= end:
+                break
+            r, _, _ = select.select([sock], [], [], min(end, rounds[0] if rounds else end) - now)
+            if not r:
+                continue
+            try:
+                n, addr = sock.recvfrom_into(buf)
+            except OSError:
+                continue
+            rtt = time.monotonic() - t0     # depuis la première diffusion
+            ok, resp = mountCodec.decode_reply(buf, n)
+            if _is_probe_reply(ok, resp) and addr not in found:
+                found[addr] = Found("UDP", addr[0], addr[1], None, resp, rtt)
+    return sorted(found.values(), key=lambda f: (socket.inet_aton(f.host), f.port))
+
+
+# =================================================================
+#
+#                 Série
+#
+# =================================================================
+def serial_candidates(patterns=SERIAL_PATTERNS) -> list:
+    """
+    Ports série USB: ceux que liste pyserial (serial.tools), et ceux des
+    motifs. Les ports de ACM_PATTERN ne sont gardés que si ce motif est
+    dans patterns.
+    """
+    ports = []
+    try:
+        from serial.tools import list_ports
+        ports += [p.device for p in list_ports.comports() if p.vid is not None
+                  and (ACM_PATTERN in patterns or not fnmatch.fnmatch(p.device, ACM_PATTERN))]
+    except ImportError:
+        pass
+    for pattern in patterns:
+        ports += glob.glob(pattern)
+    return sorted(set(ports))
+
+
+def probe_serial(port: str, rates=BAUDRATES, timeout: float = SERIAL_TIMEOUT) -> Optional[Found]:
+    """La monture sur port, au premier débit de rates auquel elle répond à :e1; None sinon."""
+    for rate in rates:
+        try:
+            with serial.Serial(port=port, baudrate=rate, timeout=timeout) as ser:
+                ser.reset_input_buffer()
+                t = time.monotonic()
+                ser.write(PROBE)
+                data = ser.read_until(b"\r")
+                rtt = time.monotonic() - t
+        except (serial.SerialException, OSError):
+            return None     # port absent ou déjà ouvert: les autres débits n'y changent rien
+        ok, resp = mountCodec.decode_reply(data, len(data))
+        if data.endswith(b"\r") and _is_probe_reply(ok, resp):
+            return Found("USB", None, port, rate, resp, rtt)
+    return None
+
+
+# =================================================================
+#
+#                 Découverte
+#
+# =================================================================
+def discover(subnets=SUBNETS, ports=UDP_PORTS, serial_ports=None,
+             timeout: float = UDP_TIMEOUT, serial_timeout: float = SERIAL_TIMEOUT,
+             acm: bool = False) -> list:
+    """
+    Montures UDP (subnets x ports) et série (serial_ports, par défaut
+    serial_candidates(), avec les ports ACM si acm), sondées en même temps.
+    Liste de Found, UDP d'abord.
+    """
+    if serial_ports is None:
+        serial_ports = serial_candidates(SERIAL_PATTERNS + ((ACM_PATTERN,) if acm else ()))
+    with ThreadPoolExecutor(max_workers=max(1, len(serial_ports))) as pool:
+        futures = [pool.submit(probe_serial, p, BAUDRATES, serial_timeout) for p in serial_ports]
+        found = discover_udp(subnets, ports, timeout) if subnets else []
+        found += [f for f in (fut.result() for fut in futures) if f is not None]
+    return found
+
+
+# ----------------------------
+# programme principal
+# ----------------------------
+def parse_args():
+    p = argparse.ArgumentParser(description="Découverte des montures (UDP et série).")
+    p.add_argument("--subnet", action="append",
+                   help=f"Sous-réseau où diffuser :e1 (répétable) [def: {' '.join(SUBNETS)}]")
+    p.add_argument("--port", type=int, action="append",
+                   help=f"Port UDP des montures (répétable) [def: {UDP_PORTS[0]}]")
+    p.add_argument("--serial", action="append",
+                   help="Port série à sonder (répétable) [def: ports USB présents]")
+    p.add_argument("--no-serial", action="store_true", help="Ne pas sonder les ports série")
+    p.add_argument("--acm", action="store_true",
+                   help=f"Sonder aussi les ports {ACM_PATTERN} (Arduino, modems...)")
+    p.add_argument("--timeout", type=float, default=UDP_TIMEOUT,
+                   help=f"Attente des réponses UDP, s [def: {UDP_TIMEOUT}]")
+    p.add_argument("--inventory", type=Path,
+                   help="Écrire les montures trouvées en inventaire (fleetWave150i --inventory)")
+    p.add_argument("--json", type=Path, help="Écrire les montures trouvées en JSON")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    t0 = time.perf_counter()
+    found = discover(args.subnet or SUBNETS, args.port or UDP_PORTS,
+                     [] if args.no_serial else args.serial, args.timeout, acm=args.acm)
+    wall_s = time.perf_counter() - t0
+
+    print(f"{'monture':<24}{'iface':<6}{'débit':>8}{'firmware':>10}{'RTT(ms)':>9}")
+    for f in found:
+        print(f"{f.address:<24}{f.iface:<6}{f.baud or '-':>8}{f.firmware:>10}{f.rtt * 1e3:>9.1f}")
+    print(f"[DISCOVERY] {len(found)} monture(s) en {wall_s:.2f} s")
+    if args.inventory:
+        args.inventory.write_text("".join(f"{f.address}@{f.baud}\n" if f.baud else f"{f.address}\n"
+                                          for f in found), encoding="utf-8")
+    if args.json:
+        args.json.write_text(json.dumps([dict(f._asdict(), address=f.address) for f in found],
+                                        indent=2), encoding="utf-8")
+    sys.exit(0 if found else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesures des échanges d'un client avec la monture (ThreadSafeUDPClient,
+PipelinedUDPClient, ThreadSafeSerialClient): client.metrics.
+
+Par type de commande (":f", ":j", ":X0003", ":X04", ...):
+    nombre de requêtes, échecs, timeouts, réémissions,
+    histogramme de latence (du premier envoi à la réponse, réémissions comprises).
+Pour le client: octets envoyés / reçus, réponses tardives jetées,
+estimation du RTT (mountRtt), histogramme de l'attente avant le
+premier envoi (lock du canal; fenêtre du canal pour PipelinedUDPClient),
+en tout et par canal (axe '1', '2', '0' pour les commandes sans axe).
+
+Histogrammes à bornes fixes: une mesure = un bisect et quelques
+additions sous un lock non disputé (~1 µs), à comparer à un RTT de
+quelques ms; les mesures peuvent rester actives en production.
+
+Sorties:
+    metrics.snapshot()            dict (JSON)
+    metrics.prometheus()          texte au format d'exposition Prometheus
+    serve_prometheus(metrics, port)   GET /metrics sur un port HTTP local
+    JsonDumper(metrics, path, period) snapshot écrit périodiquement
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# bornes supérieures des classes (s); la dernière classe est +Inf
+BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+
+def command_type(payload: bytes) -> str:
+    """':f1' -> ':f', ':X10003' -> ':X0003', ':X104...' -> ':X04'."""
+    if payload[1:2] == b"X":
+        sub = payload[3:5]
+        if sub == b"00":
+            sub = payload[3:7]
+        return ":X" + sub.decode("ascii", "replace")
+    return payload[:2].decode("ascii", "replace")
+
+
+class Histogram:
+    """Comptes par classe (BOUNDS), somme et maximum."""
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(BOUNDS, v)] += 1
+        self.count += 1
+        self.sum += v
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> float:
+        """Borne supérieure de la classe contenant le quantile q (bornée par le max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank and c:
+                return min(BOUNDS[i], self.max) if i < len(BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1e3, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1e3, 3),
+            "p99_ms": round(self.quantile(0.99) * 1e3, 3),
+            "max_ms": round(self.max * 1e3, 3),
+            "buckets": {("+Inf" if i == len(BOUNDS) else f"{BOUNDS[i]:g}"): c
+                        for i, c in enumerate(self.counts) if c},
+        }
+
+
+class _CommandStats:
+    __slots__ = ("requests", "failures", "timeouts", "retries", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.latency = Histogram()
+
+
+class ClientMetrics:
+    """Compteurs et histogrammes d'un client; record() après chaque commande."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.commands = {}          # type de commande -> _CommandStats
+        self.wait = Histogram()     # attente avant le premier envoi
+        self.waits = {}             # canal -> Histogram de l'attente
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.stale = 0              # réponses tardives jetées
+        self.rtt = None             # mountRtt.RttEstimator du client, s'il en a un
+
+    def count_stale(self, n: int = 1):
+        with self.lock:
+            self.stale += n
+
+    def record(self, payload: bytes, latency, ok: bool, attempts: int = 1,
+               timeouts: int = 0, received: int = 0, wait=None, channel=None):
+        """
+        Une commande terminée. latency (s): None si pas de réponse
+        (commande sans réponse attendue, ou abandon); wait (s): attente
+        avant le premier envoi, si mesurée, sur le canal `channel`.
+        """
+        key = command_type(payload)
+        with self.lock:
+            c = self.commands.get(key)
+            if c is None:
+                c = self.commands[key] = _CommandStats()
+            c.requests += 1
+            if not ok:
+                c.failures += 1
+            c.timeouts += timeouts
+            if attempts > 1:
+                c.retries += attempts - 1
+            if latency is not None:
+                c.latency.observe(latency)
+            if wait is not None:
+                self.wait.observe(wait)
+                if channel is not None:
+                    h = self.waits.get(channel)
+                    if h is None:
+                        h = self.waits[channel] = Histogram()
+                    h.observe(wait)
+            self.bytes_sent += len(payload) * attempts
+            self.bytes_received += received
+
+    def reset(self):
+        with self.lock:
+            self.commands.clear()
+            self.wait = Histogram()
+            self.waits.clear()
+            self.bytes_sent = self.bytes_received = 0
+            self.stale = 0
+            self.started = time.time()
+
+    # --- sorties ------------------------------------------------------
+    def snapshot(self) -> dict:
+        with self.lock:
+            cmds = {k: {"requests": c.requests, "failures": c.failures,
+                        "timeouts": c.timeouts, "retries": c.retries,
+                        "latency": c.latency.summary()}
+                    for k, c in sorted(self.commands.items())}
+            return {
+                "time": time.time(),
+                "uptime_s": round(time.time() - self.started, 3),
+                "requests": sum(c["requests"] for c in cmds.values()),
+                "failures": sum(c["failures"] for c in cmds.values()),
+                "timeouts": sum(c["timeouts"] for c in cmds.values()),
+                "retries": sum(c["retries"] for c in cmds.values()),
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "stale_replies": self.stale,
+                "rtt": self.rtt.snapshot() if self.rtt is not None else None,
+                "wait": self.wait.summary(),
+                "wait_by_channel": {k: h.summary() for k, h in sorted(self.waits.items())},
+                "commands": cmds,
+            }
+
+    def report(self) -> str:
+        s = self.snapshot()
+        worst = sorted(s["commands"].items(), key=lambda kv: -kv[1]["latency"]["p99_ms"])[:3]
+        lat = ", ".join(f"{k} p50 {v['latency']['p50_ms']} / p99 {v['latency']['p99_ms']} ms"
+                        for k, v in worst)
+        chans = "".join(f", canal {k} {v['mean_ms']} (max {v['max_ms']})"
+                        for k, v in s["wait_by_channel"].items())
+        if s["rtt"] is not None:
+            chans += (f"; RTT lissé {s['rtt']['srtt_ms']} ms, RTO {s['rtt']['rto_ms']} ms, "
+                      f"{s['stale_replies']} réponses tardives jetées")
+        return (f"[METRICS] {s['requests']} commandes, {s['failures']} échecs, "
+                f"{s['timeouts']} timeouts, {s['retries']} réémissions, "
+                f"{s['bytes_sent']} o envoyés / {s['bytes_received']} o reçus, "
+                f"attente moyenne {s['wait']['mean_ms']} ms{chans}; {lat}")
+
+    def prometheus(self, prefix: str = "wave150i", labels: dict = None) -> str:
+        """Texte au format d'exposition Prometheus (labels: ajoutés à chaque série)."""
+        base = "".join(f',{k}="{v}"' for k, v in (labels or {}).items())
+        glob = "{" + base[1:] + "}" if base else ""
+        out = []
+
+        def hist(name, h, lab):
+            acc = 0
+            for i, c in enumerate(h.counts):
+                acc += c
+                le = "+Inf" if i == len(BOUNDS) else f"{BOUNDS[i]:g}"
+                out.append(f'{prefix}_{name}_bucket{{{lab}le="{le}"}} {acc}')
+            tail = "{" + lab.rstrip(",") + "}" if lab else ""
+            out.append(f"{prefix}_{name}_sum{tail} {h.sum:.6f}")
+            out.append(f"{prefix}_{name}_count{tail} {h.count}")
+
+        with self.lock:
+            items = sorted(self.commands.items())
+            for field in ("requests", "failures", "timeouts", "retries"):
+                out.append(f"# TYPE {prefix}_{field}_total counter")
+                for k, c in items:
+                    out.append(f'{prefix}_{field}_total{{cmd="{k}"{base}}} {getattr(c, field)}')
+            out.append(f"# TYPE {prefix}_latency_seconds histogram")
+            for k, c in items:
+                hist("latency_seconds", c.latency, f'cmd="{k}"{base},')
+            out.append(f"# TYPE {prefix}_wait_seconds histogram")
+            hist("wait_seconds", self.wait, base[1:] + "," if base else "")
+            if self.waits:
+                out.append(f"# TYPE {prefix}_channel_wait_seconds histogram")
+            for k, h in sorted(self.waits.items()):
+                hist("channel_wait_seconds", h, f'channel="{k}"{base},')
+            for name, v in (("bytes_sent_total", self.bytes_sent),
+                            ("bytes_received_total", self.bytes_received),
+                            ("stale_replies_total", self.stale)):
+                out.append(f"# TYPE {prefix}_{name} counter")
+                out.append(f"{prefix}_{name}{glob} {v}")
+            if self.rtt is not None:
+                for name, v in (("srtt_seconds", self.rtt.srtt), ("rto_seconds", self.rtt.rto())):
+                    out.append(f"# TYPE {prefix}_{name} gauge")
+                    out.append(f"{prefix}_{name}{glob} {v or 0.0:.6f}")
+        return "\n".join(out) + "\n"
+
+
+# =================================================================
+#
+#                 Exposition
+#
+# =================================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_prometheus(metrics, port: int, host: str = "127.0.0.1", labels: dict = None):
+    """
+    Sert metrics.prometheus() sur http://host:port/metrics dans un thread.
+    metrics: ClientMetrics, ou fonction renvoyant le texte à servir.
+    Retourne le serveur (server.shutdown() pour l'arrêter).
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.render = metrics if callable(metrics) else (lambda: metrics.prometheus(labels=labels))
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonDumper:
+    """Écrit metrics.snapshot() dans path toutes les period s, et à l'arrêt."""
+
+    def __init__(self, metrics, path: str, period: float = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.period = period
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-json", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def dump(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.metrics.snapshot(), f, indent=1)
+        os.replace(tmp, self.path)      # lecteurs: jamais de fichier à moitié écrit
+
+    def _loop(self):
+        while not self._stop.wait(self.period):
+            self.dump()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self.dump()
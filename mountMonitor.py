@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moniteur de statut partagé: un seul flux de polling par monture, publié
+aux abonnés au lieu d'une boucle de polling par attente.
+
+Les abonnés déclarent la commande à suivre (":f1", ":X20003", ":X1000B",
+...) et la période voulue; le thread du moniteur envoie ensemble
+(parkAxis.poll_round) les commandes arrivées à échéance, chacune à la
+plus courte période demandée pour elle, et publie les réponses:
+    subscribe(cmd, callback)        rappel à chaque réponse (ou changement)
+    subscribe((cmd1, cmd2), cb)     rappel avec les réponses d'un même tour
+    when(cmd, test) / wait(...)     threading.Event levé quand test(resp)
+    stopped(axis), within(axis, target, counts)
+    async for u in updates(cmd)     itérateur asynchrone
+Dix attentes sur :f1 coûtent un seul :f1 par période.
+
+Une attente ne prend en compte que les réponses à des requêtes envoyées
+après son inscription: un statut "Stopped" lu juste avant un goto ne
+termine pas l'attente de ce goto.
+Un tour en échec (exception du client) est publié comme réponses en
+échec (ok=False); après MAX_FAILED_ROUNDS échecs de suite le moniteur
+s'arrête et les attentes en cours se terminent sur MonitorStopped.
+Les rappels s'exécutent dans le thread du moniteur et doivent être courts.
+"""
+
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import mountCodec
+import mountStatus
+import parkAxis
+
+
+PERIOD = 0.05           # s: période de polling par défaut (parkAxis.SLEW_POLL)
+MAX_FAILED_ROUNDS = 5   # tours en échec de suite avant l'arrêt du moniteur
+
+
+class MonitorStopped(RuntimeError):
+    """Le moniteur s'est arrêté sur une erreur: l'attente ne peut aboutir."""
+
+
+class Update(NamedTuple):
+    """Réponse publiée; t = perf_counter() de l'envoi du tour."""
+    cmd: str
+    ok: bool
+    resp: Optional[str]
+    t: float
+
+    @property
+    def status(self) -> mountStatus.AxisStatus:
+        """Statut décodé (réponse de :f)."""
+        return mountStatus.decode(self.resp)
+
+    @property
+    def position(self) -> int:
+        """Position en int32 (réponse de :X.0003, :X.000B)."""
+        return mountCodec.int32(self.resp)
+
+
+class Subscription:
+    """Abonnement d'un rappel à une commande (ou à un groupe); cancel() le retire."""
+
+    def __init__(self, monitor, cmds, callback, period, changes_only, cadence=None):
+        self.monitor = monitor
+        self.cmds = cmds
+        self.callback = callback
+        self.period = period
+        self.cadence = cadence          # () -> délai avant le prochain envoi, ou None
+        self.delay = period             # délai courant (cadence() après chaque tour)
+        self.changes_only = changes_only
+        self.fail = None                # (exc) -> None: arrêt du moniteur sur erreur
+        self.since = time.perf_counter()
+        self.last = None
+
+    def cancel(self):
+        self.monitor._remove(self)
+
+
+class StatusMonitor:
+    """
+    Polling partagé des commandes de lecture de `client` (contrat
+    send_and_recv / submit). start() lance le thread, stop() l'arrête;
+    s'utilise aussi avec `with`.
+    """
+
+    def __init__(self, client, period: float = PERIOD):
+        self.client = client
+        self.period = period
+        self.cond = threading.Condition()
+        self._subs = []
+        self._due = {}          # commande -> prochaine échéance (perf_counter)
+        self._stop = False
+        self._thread = None
+        self.rounds = 0
+        self.polls = 0
+        self.errors = 0         # exceptions levées par des rappels
+        self.failed_rounds = 0  # tours dont le polling a levé une exception
+        self.failure = None     # MonitorStopped, une fois arrêté sur erreur
+
+    # --- abonnements --------------------------------------------------
+    def subscribe(self, cmds, callback, period: float = None,
+                  changes_only: bool = True, cadence=None) -> Subscription:
+        """
+        callback(Update) à chaque réponse à cmds (changes_only: seulement
+        si la réponse a changé). cmds peut être un tuple de commandes:
+        callback(tuple d'Update) quand toutes ont répondu dans le même tour.
+        cadence: fonction rendant le délai avant l'envoi suivant, appelée à
+        chaque tour (ex. parkAxis.PollScheduler.next_delay), au lieu de period.
+        """
+        group = cmds if isinstance(cmds, tuple) else (cmds,)
+        sub = Subscription(self, cmds, callback, period or self.period, changes_only, cadence)
+        with self.cond:
+            now = time.perf_counter()
+            for c in group:
+                self._due.setdefault(c, now)
+            self._subs.append(sub)
+            self.cond.notify()
+        return sub
+
+    def _remove(self, sub):
+        with self.cond:
+            if sub in self._subs:
+                self._subs.remove(sub)
+            polled = {c for s in self._subs for c in self._group(s)}
+            for c in list(self._due):
+                if c not in polled:
+                    del self._due[c]
+
+    @staticmethod
+    def _group(sub):
+        return sub.cmds if isinstance(sub.cmds, tuple) else (sub.cmds,)
+
+    def when(self, cmd: str, test, period: float = None, cadence=None) -> threading.Event:
+        """
+        Event levé à la première réponse à cmd (envoyée après cet appel)
+        pour laquelle test(resp) est vrai; event.resp = cette réponse,
+        event.cancel() abandonne l'attente. cadence: voir subscribe.
+        Si le moniteur s'arrête sur erreur, l'event est levé avec
+        event.error = MonitorStopped.
+        """
+        ev = threading.Event()
+        ev.resp = None
+        ev.error = None
+
+        def check(u):
+            if u.ok and test(u.resp):
+                ev.resp = u.resp
+                sub.cancel()
+                ev.set()
+        def fail(exc):
+            ev.error = exc
+            ev.set()
+        sub = self.subscribe(cmd, check, period, changes_only=False, cadence=cadence)
+        sub.fail = fail
+        ev.cancel = sub.cancel
+        if self.failure is not None:
+            fail(self.failure)
+        return ev
+
+    def wait(self, cmd: str, test, timeout: float = None, period: float = None) -> str:
+        """Bloque jusqu'à test(resp); TimeoutError au-delà de timeout s."""
+        ev = self.when(cmd, test, period)
+        if not ev.wait(timeout):
+            ev.cancel()
+            raise TimeoutError(f"{cmd}: condition not reached after {timeout:.1f} s")
+        if ev.error is not None:
+            raise ev.error
+        return ev.resp
+
+    def stopped(self, axis: str, period: float = None) -> threading.Event:
+        return self.when(f":f{axis}", lambda resp: mountStatus.test(resp, "Stopped"), period)
+
+    def within(self, axis: str, target: int, counts: int,
+               period: float = None) -> threading.Event:
+        """Event levé quand la position de l'axe est à moins de counts de target."""
+        return self.when(f":X{axis}0003",
+                         lambda resp: abs(mountCodec.int32(resp) - target) <= counts, period)
+
+    async def updates(self, cmds, period: float = None, changes_only: bool = True):
+        """Itérateur asynchrone des Update de cmds (voir subscribe)."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        sub = self.subscribe(cmds, lambda u: loop.call_soon_threadsafe(queue.put_nowait, u),
+                             period, changes_only)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            sub.cancel()
+
+    # --- thread de polling --------------------------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="status-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self.cond:
+            self._stop = True
+            self.cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self.cond:
+            return {"rounds": self.rounds, "polls": self.polls,
+                    "subscribers": len(self._subs), "commands": len(self._due),
+                    "callback_errors": self.errors,
+                    "failed_rounds": self.failed_rounds}
+
+    def _loop(self):
+        failed = 0
+        while True:
+            try:
+                polled = self._round()
+                if polled is None:
+                    return
+                if polled:
+                    failed = 0
+            except Exception as exc:
+                failed += 1
+                with self.cond:
+                    self.failed_rounds += 1
+                    cmds = list(self._due)
+                    subs = list(self._subs)
+                now = time.perf_counter()
+                self._publish(subs, {c: Update(c, False, None, now) for c in cmds})
+                if failed >= MAX_FAILED_ROUNDS:
+                    self._fail(MonitorStopped(f"status monitor stopped: {exc!r}"))
+                    return
+                with self.cond:
+                    if not self._stop:
+                        self.cond.wait(self.period)
+
+    def _fail(self, exc):
+        """Arrêt sur erreur: les attentes en cours se terminent sur exc."""
+        with self.cond:
+            self.failure = exc
+            self._stop = True
+            subs = list(self._subs)
+        for sub in subs:
+            if sub.fail is not None:
+                sub.fail(exc)
+
+    def _round(self) -> Optional[int]:
+        """
+        Un tour de polling, ou une attente jusqu'à la prochaine échéance:
+        nombre de commandes envoyées (0 après une attente), None une fois
+        le moniteur arrêté.
+        """
+        with self.cond:
+            while not self._stop and not self._due:
+                self.cond.wait()
+            if self._stop:
+                return None
+            now = time.perf_counter()
+            first = min(self._due.values())
+            if first > now:
+                self.cond.wait(first - now)
+                return 0
+            # même tour pour les commandes à moins d'une demi-période
+            periods = {c: min(s.delay for s in self._subs if c in self._group(s))
+                       for c in self._due}
+            slack = min(periods.values()) / 2
+            cmds = [c for c, t in self._due.items() if t <= now + slack]
+            for s in self._subs:
+                if s.cadence is not None and any(c in cmds for c in self._group(s)):
+                    s.delay = s.cadence()
+            for c in cmds:
+                self._due[c] = now + min(s.delay for s in self._subs if c in self._group(s))
+            subs = list(self._subs)
+            self.rounds += 1
+            self.polls += len(cmds)
+        results = parkAxis.poll_round(self.client, cmds)
+        got = {c: Update(c, ok, resp, now) for c, (ok, resp, err) in zip(cmds, results)}
+        self._publish(subs, got)
+        return len(cmds)
+
+    def _publish(self, subs, got):
+        for sub in subs:
+            group = self._group(sub)
+            if not all(c in got for c in group):
+                continue
+            updates = tuple(got[c] for c in group)
+            if updates[0].t < sub.since:
+                continue        # tour envoyé avant l'inscription
+            value = tuple(u.resp for u in updates)
+            if sub.changes_only and value == sub.last:
+                continue
+            sub.last = value
+            try:
+                sub.callback(updates if isinstance(sub.cmds, tuple) else updates[0])
+            except Exception:
+                self.errors += 1
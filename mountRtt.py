@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estimation du RTT d'une monture et délai de réémission (RTO) adaptatif
+pour les clients UDP (ThreadSafeUDPClient, PipelinedUDPClient) et série
+(ThreadSafeSerialClient, qui ajoute au RTO la durée de transmission).
+
+Jacobson (RFC 6298): RTT lissé et variation lissée,
+    RTO = SRTT + 4 * RTTVAR, borné par [RTO_MIN, rto_max].
+Karn: seules les commandes répondues au premier envoi donnent une mesure
+(la réponse à une commande réémise peut venir de n'importe quel envoi);
+à chaque timeout le RTO double, jusqu'à la prochaine mesure valide, pour
+que l'estimation suive une liaison devenue plus lente.
+
+Sur le Wifi de la monture (RTT de quelques ms), une réponse perdue est
+réémise après quelques dizaines de ms au lieu de DEFAULT_TIMEOUT.
+"""
+
+import threading
+
+
+ALPHA = 1 / 8           # gain du RTT lissé
+BETA = 1 / 4            # gain de la variation
+K = 4
+RTO_MIN = 0.03          # s
+
+
+class RttEstimator:
+    """RTT lissé et RTO d'une monture; sample() après chaque réponse au premier envoi."""
+
+    def __init__(self, initial: float = 1.0, rto_max: float = 1.0, rto_min: float = RTO_MIN):
+        self.lock = threading.Lock()
+        self.rto_min = rto_min
+        self.rto_max = rto_max
+        self.srtt = None
+        self.rttvar = None
+        self._rto = min(initial, rto_max)
+        self.samples = 0
+        self.backoffs = 0
+
+    def rto(self) -> float:
+        return self._rto
+
+    def sample(self, rtt: float):
+        with self.lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar += BETA * (abs(self.srtt - rtt) - self.rttvar)
+                self.srtt += ALPHA * (rtt - self.srtt)
+            self._rto = min(self.rto_max, max(self.rto_min, self.srtt + K * self.rttvar))
+            self.samples += 1
+
+    def backoff(self):
+        """Timeout: RTO doublé (Karn) jusqu'à la prochaine mesure."""
+        with self.lock:
+            self._rto = min(self.rto_max, self._rto * 2)
+            self.backoffs += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"srtt_ms": round(self.srtt * 1e3, 3) if self.srtt is not None else None,
+                    "rttvar_ms": round(self.rttvar * 1e3, 3) if self.rttvar is not None else None,
+                    "rto_ms": round(self._rto * 1e3, 3),
+                    "samples": self.samples, "backoffs": self.backoffs}
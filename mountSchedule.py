@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Horloge de session à échéances absolues pour les WAIT et les délais
+entre commandes (piloteDepuisFichierWave150, piloteInteractifWave150AvecLoop).
+
+Chaque commande a un instant d'envoi prévu, compté depuis le début de la
+session sur l'horloge monotone: un WAIT ou un --delay décale l'échéance
+suivante au lieu d'ajouter un sleep après la réponse, donc le RTT de la
+commande précédente est absorbé et les retards ne s'accumulent pas.
+L'instant prévu et l'instant réel de chaque envoi sont gardés pour le
+rapport final (retard moyen / max, durée prévue / réelle).
+"""
+
+import time
+
+
+SPIN = 0.001    # s: fin de l'attente en boucle active (précision du sleep)
+
+
+class Schedule:
+    """Échéances d'une session: delay() décale l'échéance, wait() l'attend."""
+
+    def __init__(self, spin: float = SPIN):
+        self.t0 = time.monotonic()
+        self.spin = spin
+        self.next = 0.0         # prochaine échéance (s depuis t0)
+        self.planned = []       # échéances attendues
+        self.actual = []        # instants atteints
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.t0
+
+    def delay(self, dt: float):
+        """L'échéance suivante est dt après la précédente."""
+        self.next += dt
+
+    def mark(self):
+        """Repartir de maintenant (session interactive: après une saisie)."""
+        self.next = max(self.next, self.elapsed())
+
+    def wait(self, target: float = None) -> float:
+        """
+        Attend l'échéance (self.next, ou `target` en s depuis t0) et la note.
+        Retourne le retard (s, >= 0) sur l'échéance.
+        """
+        if target is not None:
+            self.next = target
+        deadline = self.t0 + self.next
+        remaining = deadline - time.monotonic()
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        while time.monotonic() < deadline:
+            pass
+        now = self.elapsed()
+        self.planned.append(self.next)
+        self.actual.append(now)
+        return max(0.0, now - self.next)
+
+    def summary(self) -> dict:
+        late = [a - p for p, a in zip(self.planned, self.actual)]
+        if not late:
+            return {"events": 0}
+        return {
+            "events": len(late),
+            "late_mean_ms": round(sum(late) / len(late) * 1e3, 3),
+            "late_max_ms": round(max(late) * 1e3, 3),
+            "planned_s": round(self.planned[-1], 3),
+            "actual_s": round(self.actual[-1], 3),
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        if not s["events"]:
+            return "[TIMING] aucune commande"
+        return (f"[TIMING] {s['events']} envois, retard moyen {s['late_mean_ms']} ms, "
+                f"max {s['late_max_ms']} ms; dernier envoi prévu {s['planned_s']} s, "
+                f"réel {s['actual_s']} s")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+État connu de la monture, conservé entre deux exécutions.
+
+Après un parking complet (homing par les 3 gotos + slew jusqu'à l'index),
+le repère du codeur est connu: l'index de home vaut la position de parking
+du driver (X.01 envoyé sur l'index). Tant que ce repère est valable, un
+nouveau parking se réduit à un goto vers cette position.
+
+Règles d'invalidation (un axe repasse par le homing complet si):
+- aucun état pour cette monture / cet axe, ou driver différent
+- dernier homing complet plus vieux que MAX_AGE
+- l'axe a été initialisé pendant cette exécution (mise sous tension:
+  init_mount redéfinit la position), ou répond NotInit / Blocked
+- la réponse à :e (firmware) diffère: autre monture à la même adresse
+- parking précédent interrompu ou en erreur, ou option --rehome
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import mountCodec
+import mountStatus
+
+
+STATE_PATH = Path.home() / ".wave150i_state.json"
+MAX_AGE = 12 * 3600.    # s
+
+
+def mount_id(client) -> str:
+    """Identifiant de la monture derrière un client (host:port ou port série)."""
+    if hasattr(client, "mount_id"):         # mountDaemon.DaemonClient
+        return client.mount_id
+    if hasattr(client, "host"):
+        return f"{client.host}:{client.port}"
+    ser = getattr(client, "ser", None)
+    return getattr(ser, "port", None) or "unknown"
+
+
+class MountStateCache:
+    """Cache JSON {monture: {"axes": {"Axis1": {...}, "Axis2": {...}}}}."""
+
+    def __init__(self, path=STATE_PATH, max_age=MAX_AGE):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        try:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.data = {}
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _axis(self, client, name):
+        return self.data.get(mount_id(client), {}).get("axes", {}).get(name)
+
+    def check(self, client, name, driver):
+        """
+        Le repère de l'axe est-il encore valable ? Deux requêtes (:f, :e).
+        Retourne (valide, raison).
+        """
+        with self.lock:
+            st = self._axis(client, name)
+        if st is None:
+            return False, "aucun état connu"
+        if st.get("driver") != driver:
+            return False, f"driver {st.get('driver')} != {driver}"
+        age = time.time() - st.get("homed", 0)
+        if age > self.max_age:
+            return False, f"état trop ancien ({age / 3600:.1f} h)"
+        axis = name[-1]
+        ok, resp, err = client.send_and_recv(f":f{axis}")
+        if not ok:
+            return False, f"statut illisible ({err})"
+        status = mountStatus.decode(resp)
+        if not status.init_done or status.blocked:
+            return False, f"statut {status.describe()}"
+        ok, fw, err = client.send_and_recv(f":e{axis}")
+        if not ok or fw != st.get("firmware"):
+            return False, f"firmware {fw} != {st.get('firmware')}"
+        return True, f"repère connu depuis {age / 60:.0f} min"
+
+    def record(self, client, name, driver, ctx, firmware=None):
+        """Mémorise le résultat d'un parking de l'axe (ctx: parkAxis.ParkContext)."""
+        if firmware is None:
+            ok, firmware, err = client.send_and_recv(f":e{name[-1]}")
+        pep = ctx.params["parkEncoderPosition"][driver]
+        park = mountCodec.int32(pep)
+        with self.lock:
+            mount = self.data.setdefault(mount_id(client), {"axes": {}})
+            old = mount["axes"].get(name, {})
+            homed = ctx.index is not None       # homing complet (slew jusqu'à l'index)
+            index = ctx.index if homed else old.get("index")
+            mount["axes"][name] = {
+                "driver": driver,
+                "firmware": firmware,
+                "index": index,             # index lu par le slew (repère d'avant)
+                "offset": None if index is None else park - index,
+                "park": park,               # position codeur de l'index / du parking
+                "homed": time.time() if homed else old.get("homed", 0),
+                "time": time.time(),
+            }
+            self._save()
+
+    def invalidate(self, client, name=None):
+        """Oublie l'état d'un axe (ou de toute la monture)."""
+        with self.lock:
+            mount = self.data.get(mount_id(client))
+            if mount is None:
+                return
+            if name is None:
+                del self.data[mount_id(client)]
+            else:
+                mount.get("axes", {}).pop(name, None)
+            self._save()
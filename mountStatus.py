@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Décodage du statut moteur (réponse à :f1 / :f2) et conditions de LOOP.
+
+La réponse de :f est 3 chiffres hexa A B C:
+    A: bit0 Tracking/Goto, bit1 CCW/CW, bit2 Fast/Slow
+    B: bit0 Running/Stopped, bit1 Blocked/Normal
+    C: bit0 InitDone/NotInit, bit1 LevelOn/LevelOff
+Les 4096 statuts possibles sont décodés une fois pour toutes à l'import;
+decode() et test() ne font plus qu'une conversion hexa et un masque.
+
+compile_condition() transforme une condition de LOOP (ex: "Running",
+"resp != '80000000'", "value > 1000 and not Blocked") en fonction,
+sans eval: seule une petite partie de la syntaxe Python est acceptée.
+"""
+
+import ast
+import operator
+from typing import Callable, NamedTuple
+
+import mountCodec
+
+
+# nom -> (masque, valeur attendue) sur la réponse convertie en entier
+FLAGS = {
+    "Tracking": (0x100, 0x100), "Goto":     (0x100, 0),
+    "CCW":      (0x200, 0x200), "CW":       (0x200, 0),
+    "Fast":     (0x400, 0x400), "Slow":     (0x400, 0),
+    "Running":  (0x010, 0x010), "Stopped":  (0x010, 0),
+    "Blocked":  (0x020, 0x020), "Normal":   (0x020, 0),
+    "InitDone": (0x001, 0x001), "NotInit":  (0x001, 0),
+    "LevelOn":  (0x002, 0x002), "LevelOff": (0x002, 0),
+}
+
+
+class AxisStatus(NamedTuple):
+    """Statut décodé d'un axe (immuable)."""
+    raw: int
+    tracking: bool
+    ccw: bool
+    fast: bool
+    running: bool
+    blocked: bool
+    init_done: bool
+    level_on: bool
+
+    def is_(self, name: str) -> bool:
+        mask, val = FLAGS[name]
+        return (self.raw & mask) == val
+
+    def describe(self) -> str:
+        return " | ".join([
+            "Tracking" if self.tracking else "Goto",
+            "CCW" if self.ccw else "CW",
+            "Fast" if self.fast else "Slow",
+            "Running" if self.running else "Stopped",
+            "Blocked" if self.blocked else "Normal",
+            "Init done" if self.init_done else "Not Init",
+            "Level on" if self.level_on else "Level off",
+        ])
+
+
+def _build(raw: int) -> AxisStatus:
+    return AxisStatus(raw,
+                      bool(raw & 0x100), bool(raw & 0x200), bool(raw & 0x400),
+                      bool(raw & 0x010), bool(raw & 0x020),
+                      bool(raw & 0x001), bool(raw & 0x002))
+
+
+_TABLE = tuple(_build(v) for v in range(0x1000))
+
+
+def decode(resp: str) -> AxisStatus:
+    """Statut décodé de la réponse de :f (sans le '=')."""
+    return _TABLE[int(resp, 16) & 0xFFF]
+
+
+def test(resp: str, status: str) -> bool:
+    """Équivalent de l'ancien parkAxis.TestStatus, sans eval."""
+    try:
+        mask, val = FLAGS[status]
+    except KeyError:
+        raise ValueError("cannot test on unknown status %s" % (status))
+    return (decode(resp).raw & mask) == val
+
+
+# =================================================================
+#
+#                 Conditions de LOOP
+#
+# =================================================================
+_CMP = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+        ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+        ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b}
+# ni *, ni **, ni <<: pas de calcul dont le résultat grossit sans borne
+_ARITH = {ast.Add: operator.add, ast.Sub: operator.sub,
+          ast.BitAnd: operator.and_, ast.BitOr: operator.or_,
+          ast.RShift: operator.rshift,
+          ast.Mod: operator.mod, ast.FloorDiv: operator.floordiv}
+_FUNCS = {"int": int, "h2i": mountCodec.int32, "abs": abs, "len": len}
+
+
+def _value(resp: str) -> int:
+    try:
+        return mountCodec.int32(resp)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _compile(node) -> Callable[[str], object]:
+    """Compile un noeud AST autorisé en fonction f(resp)."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        v = node.value
+        return lambda resp: v
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name == "resp":
+            return lambda resp: resp
+        if name == "value":
+            return _value
+        if name in FLAGS:
+            mask, val = FLAGS[name]
+            return lambda resp: (decode(resp).raw & mask) == val
+        raise ValueError(f"nom inconnu dans la condition: {name}")
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda resp: all(p(resp) for p in parts)
+        return lambda resp: any(p(resp) for p in parts)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        f = _compile(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda resp: not f(resp)
+        return lambda resp: -f(resp)
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        op, left, right = _ARITH[type(node.op)], _compile(node.left), _compile(node.right)
+        return lambda resp: op(left(resp), right(resp))
+    if isinstance(node, ast.Compare):
+        left = _compile(node.left)
+        ops = [_CMP[type(o)] for o in node.ops if type(o) in _CMP]
+        if len(ops) != len(node.ops):
+            raise ValueError("opérateur de comparaison non autorisé")
+        rights = [_compile(c) for c in node.comparators]
+
+        def compare(resp):
+            a = left(resp)
+            for op, r in zip(ops, rights):
+                b = r(resp)
+                if not op(a, b):
+                    return False
+                a = b
+            return True
+        return compare
+    if isinstance(node, ast.Subscript):
+        target = _compile(node.value)
+        sl = node.slice
+        if isinstance(sl, ast.Slice):
+            lo = _compile(sl.lower) if sl.lower else (lambda resp: None)
+            hi = _compile(sl.upper) if sl.upper else (lambda resp: None)
+            return lambda resp: target(resp)[lo(resp):hi(resp)]
+        idx = _compile(sl)
+        return lambda resp: target(resp)[idx(resp)]
+    if isinstance(node, ast.Tuple):
+        items = [_compile(e) for e in node.elts]
+        return lambda resp: tuple(i(resp) for i in items)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id in _FUNCS and not node.keywords):
+        fn = _FUNCS[node.func.id]
+        args = [_compile(a) for a in node.args]
+        return lambda resp: fn(*(a(resp) for a in args))
+    raise ValueError(f"syntaxe non autorisée dans la condition: {ast.dump(node)}")
+
+
+def compile_condition(text: str) -> Callable[[str], bool]:
+    """
+    Compile une condition de LOOP en fonction f(resp) -> bool.
+    Noms disponibles: resp (réponse hexa, sans '='), value (resp en int32),
+    les statuts de FLAGS (Running, Stopped, ...), int(), h2i(), abs(), len().
+    """
+    tree = ast.parse(text.strip(), mode="eval")
+    f = _compile(tree.body)
+    return lambda resp: bool(f(resp))
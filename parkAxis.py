@@ -6,20 +6,23 @@ Created on Tue Sep  9 08:18:41 2025
 @author: Olivier Coutant
 
 """
-import ctypes
 import time
+import weakref
+
+import mountCodec
+import mountStatus
 
 DEBUG = True
 
 def set_cmd(s):
     if DEBUG:
-        print(s)
+        print(s if isinstance(s, str) else s.decode("ascii").strip())
     return s
 
 def h2i(x):
-    return ctypes.c_int32(int(x, 16)).value
+    return mountCodec.int32(x)
 
-# unused for the moment, but summarizes axis1/axis2 parameters
+# axis1/axis2 parameters, used by init_commands and the park engine (park_axis)
 axisParam = {"Axis1":        
                    {
                    # set slew direction and speed according to X#000B return value
@@ -45,193 +48,589 @@ axisParam = {"Axis1":
 
     
 def TestStatus(resp, status):
-    StatusDict = {
-    "Tracking" : "((h2i(resp) & 0xF00)>>8 & 0b001) == 1",
-    "Goto"     : "((h2i(resp) & 0xF00)>>8 & 0b001) == 0",
-    "CCW"      : "((h2i(resp) & 0xF00)>>8 & 0b010) == 2",
-    "CW"       : "((h2i(resp) & 0xF00)>>8 & 0b010) == 0",
-    "Fast"     : "((h2i(resp) & 0xF00)>>8 & 0b100) == 4",
-    "Slow"     : "((h2i(resp) & 0xF00)>>8 & 0b100) == 0",
-    "Blocked"  : "((h2i(resp) & 0x0F0)>>4 & 0b010) == 2",
-    "Normal"   : "((h2i(resp) & 0x0F0)>>4 & 0b010) == 0",
-    "Running"  : "((h2i(resp) & 0x0F0)>>4 & 0b001) == 1",
-    "Stopped"  : "((h2i(resp) & 0x0F0)>>4 & 0b001) == 0",
-    "InitDone" : "((h2i(resp) & 0x00F)    & 0b001) == 1",
-    "NotInit"  : "((h2i(resp) & 0x00F)    & 0b001) == 0"
-    }
-    if status not in StatusDict:
-        raise ValueError ("cannot test on unknown status %s"%(status))
-    return (eval(StatusDict[status]))        
-
-def wait_for_status(client, cmd, status):
+    """
+    True if status (Tracking, Goto, CCW, CW, Fast, Slow, Blocked, Normal, 
+    Running, Stopped, InitDone, NotInit) is set in the :f response resp.
+    Precomputed masks, see mountStatus.
+
+    """
+    return mountStatus.test(resp, status)
+
+# Status polling parameters (s)
+POLL_MIN = 0.02         # tightest poll interval, near the end of a motion
+POLL_MAX = 1.0          # loosest poll interval, far from the target
+POLL_TIMEOUT = 120.     # overall timeout when the motion time cannot be predicted
+
+# measured step rate (counts/s) learnt from past gotos: 
+# client -> {status command: rate}, so mounts of a fleet learn apart
+stepRate = weakref.WeakKeyDictionary()
+
+class PollScheduler:
+    """
+    Poll interval for a motion of `distance` encoder counts: 
+    half the predicted remaining time (so the mount is queried less while far 
+    from the target), clamped to [POLL_MIN, POLL_MAX]; past the predicted end 
+    it widens again slowly. Without any rate estimate, geometric back-off.
+    The rate is learnt per client (stepRate); without a client, nothing 
+    is learnt.
+
+    """
+    def __init__(self, key, distance=None, timeout=None, client=None):
+        self.key = key
+        self.rates = stepRate.setdefault(client, {}) if client is not None else {}
+        self.distance = abs(distance) if distance is not None else None
+        self.t0 = time.monotonic()
+        self.n = 0
+        rate = self.rates.get(key)
+        self.predicted = None
+        if self.distance is not None and rate:
+            self.predicted = self.distance / rate
+        if timeout is None:
+            timeout = POLL_TIMEOUT if self.predicted is None \
+                else max(10., 3. * self.predicted)
+        self.deadline = self.t0 + timeout
+
+    def elapsed(self):
+        return time.monotonic() - self.t0
+
+    def next_delay(self):
+        self.n += 1
+        if self.predicted is None:
+            return min(POLL_MAX, POLL_MIN * 1.5 ** self.n)
+        remaining = self.predicted - self.elapsed()
+        if remaining < 0:
+            # later than predicted: back off again slowly
+            remaining = -remaining / 2.
+        return min(POLL_MAX, max(POLL_MIN, remaining / 2.))
+
+    def expired(self):
+        return time.monotonic() > self.deadline
+
+    def done(self):
+        """Motion finished: update the step rate estimate of this axis."""
+        t = self.elapsed()
+        if self.distance and t > 0.1:
+            rate = self.distance / t
+            old = self.rates.get(self.key)
+            self.rates[self.key] = rate if old is None else 0.5 * (old + rate)
+
+def wait_for_status(client, cmd, status, distance=None, timeout=None):
     """
     Wait for status "status" to become True by sending command f1 or f2 
+    When the goto distance (encoder counts) is given, the poll interval 
+    follows the predicted remaining motion time (see PollScheduler).
+    Raise TimeoutError if status is not reached in time.
 
     """
+    sched = PollScheduler(cmd, distance, timeout, client)
     cmd = set_cmd(cmd)
     ok, resp, err = client.send_and_recv(cmd)
-    while not TestStatus(resp, status):
-        time.sleep(client.inter_cmd_delay)
+    while not (ok and TestStatus(resp, status)):
+        if sched.expired():
+            raise TimeoutError(f"{cmd}: status {status} not reached after "
+                               f"{sched.elapsed():.1f} s")
+        time.sleep(sched.next_delay())
         ok, resp, err = client.send_and_recv(cmd)
+    if status == "Stopped":
+        sched.done()
         
-def init_mount(driver, client):
+def init_commands(axis, driver):
+    """
+    Initialization commands of one axis, as sent by SynScan Pro 
+    when the axis reports NotInit.
+
+    """
+    pep = axisParam[f"Axis{axis}"]["parkEncoderPosition"][driver]
+    if axis == "1":
+        return [":e1",
+                # inquire extended, not clear
+                ":q1010000",
+                ":X10002",
+                ":b1",
+                ":s1",
+                # set autoguide speed
+                ":P12",
+                ":V100",
+                ":X10006",
+                ":X10503",
+                ":X10E00000000000000000000000000000000",
+                # Set origin position
+                f":X101{pep}",
+                # declared motor Initialized
+                ":F1"]
+    return [":e2",
+            ":X20002",
+            # set autoguide speed
+            ":P22",
+            ":V200",
+            # Set origin position
+            f":X201{pep}",
+            # declared motor Initialized
+            ":F2"]
+
+# max commands in flight per axis during the init sequence
+INIT_WINDOW = 4
+
+def send_batch(client, cmds, window=INIT_WINDOW):
+    """
+    Send an ordered list of commands, pipelined if the client supports it
+    (send_batch), one by one otherwise. Returns the list of (ok, resp, err).
+
+    """
+    cmds = [set_cmd(c) for c in cmds]
+    if hasattr(client, "send_batch"):
+        return client.send_batch(cmds, window)
+    return [client.send_and_recv(c) for c in cmds]
+
+def init_mount(driver, client, state=None):
     """
     Initialization sequence taken from the sequence sent by 
     SynScan Pro to the Wave150i.
     The sequence was analysed using Wireshark on a Mac
     connected to the Wave150i Wifi and running SynScan Pro
-    The sequence is reproduced as such
+    The sequence is reproduced as such, sent as one batch for both axes
+    (replies are checked at the end, then InitDone is verified)
 
     """
-    # is axis 1 initialized
-    cmd = set_cmd(":f1")
-    ok, resp, err = client.send_and_recv(cmd)
-    if TestStatus(resp, "NotInit"):
-        print('Initialize axis 1')
-        cmd = set_cmd(":e1")
-        ok, _, err = client.send_and_recv(cmd)
-        # inquire extended, not clear
-        cmd = set_cmd(":q1010000")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":X10002")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":b1")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":s1")
-        ok, _, err = client.send_and_recv(cmd)
-        # set autoguide speed
-        cmd = set_cmd(":P12")
-        ok, _, err = client.send_and_recv(cmd)
-        
-        cmd = set_cmd(":V100")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":X10006")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":X10503")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":X10E00000000000000000000000000000000")
-        ok, _, err = client.send_and_recv(cmd)
-        # Set origin position
-        pep = axisParam["Axis1"]["parkEncoderPosition"][driver]
-        cmd = set_cmd(f":X101{pep}")
-        ok, _, err = client.send_and_recv(cmd)
-        # declared motor Initialized
-        cmd = set_cmd(":F1")
-        ok, _, err = client.send_and_recv(cmd)
-        
-    # is axis 2 initialized
-    cmd = set_cmd(":f2")
-    ok, resp, err = client.send_and_recv(cmd)
-    if TestStatus(resp, "NotInit"):
-        print('Initialize axis 2')
-        cmd = set_cmd(":e2")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":X20002")
-        ok, _, err = client.send_and_recv(cmd)
-        # set autoguide speed
-        cmd = set_cmd(":P22")
-        ok, _, err = client.send_and_recv(cmd)
-        cmd = set_cmd(":V200")
-        ok, _, err = client.send_and_recv(cmd)
-        # Set origin position
-        pep = axisParam["Axis2"]["parkEncoderPosition"][driver]
-        cmd = set_cmd(f":X201{pep}")
-        ok, _, err = client.send_and_recv(cmd)
-        # declared motor Initialized
-        cmd = set_cmd(":F2")
-        ok, _, err = client.send_and_recv(cmd)                
-        
+    # are axes initialized
+    todo = []
+    cmds = []
+    for axis, (ok, resp, err) in zip("12", send_batch(client, [":f1", ":f2"])):
+        if not ok:
+            print(f'axis {axis} does not answer: {err}')
+            return False
+        if TestStatus(resp, "NotInit"):
+            print(f'Initialize axis {axis}')
+            todo.append(axis)
+            cmds += init_commands(axis, driver)
+            # init sets the encoder position: the known frame is lost
+            if state is not None:
+                state.invalidate(client, f"Axis{axis}")
+    if not todo:
+        return True
+
+    results = send_batch(client, cmds)
+    failed = [c for c, (ok, _, err) in zip(cmds, results) if not ok]
+    if failed:
+        print(f'init commands failed: {" ".join(failed)}')
+        return False
+    # declared motor Initialized ?
+    for axis, (ok, resp, err) in zip(todo, send_batch(client, [f":f{a}" for a in todo])):
+        if not ok or not TestStatus(resp, "InitDone"):
+            print(f'axis {axis} not initialized: {resp} {err}')
+            return False
     return True
     
+# =================================================================
+#
+#                 Park engine
+#
+# =================================================================
+# Park sequence as a list of (step, argument), see PARK_STEPS.
+# This is the sequence sent by SynScan Pro: three gotos back and forth,
+# slew until the home index is latched, goto the index, set the encoder 
+# position of the park position for the driver.
+PARK_PLAN = [
+    ("stop", None),
+    ("reset_index", None),
+    ("read_direction", None),       # determine if motor is W or E
+    ("goto_relative", "delta+"),
+    ("reset_index", None),
+    ("read_index", None),
+    ("goto_relative", "-delta-"),
+    ("reset_index", None),
+    ("read_index", None),
+    ("goto_relative", "delta+"),
+    ("reset_index", None),
+    ("slew_to_index", None),
+    ("goto_index", None),
+    ("set_park_position", None),
+    ("stop", None),
+]
+
+# Park when the encoder frame is known (see mountState): the home index 
+# is at the park encoder position, a single goto is enough.
+QUICK_PARK_PLAN = [
+    ("stop", None),
+    ("goto_park_position", None),
+    ("stop", None),
+]
+
+# home index not latched yet (X#000B return value)
+INDEX_UNKNOWN = ("80000000", "7FFFFFFF")
+SLEW_POLL = 0.05
+STOP_CHECK = 0.1        # stop_event check interval while waiting on a monitor
+
+class ParkInterrupted(RuntimeError):
+    """The park was stopped (stop_event set) before the end of its plan."""
+
+def check_stop(what, stop_event):
+    if stop_event is not None and stop_event.is_set():
+        raise ParkInterrupted(f"{what}: interrupted")
+
+def pause(delay, what, stop_event=None):
+    """Sleep `delay` s; with a stop_event, raise ParkInterrupted as soon as it is set."""
+    if stop_event is None:
+        time.sleep(delay)
+    elif stop_event.wait(delay):
+        raise ParkInterrupted(f"{what}: interrupted")
+
+class Wait:
+    """
+    What a park step waits for: test(resp) true on the reply to `cmd`.
+    Park steps are generators yielding a Wait per motion; the engine 
+    (park_axis: blocking, park_both: both axes in one poll loop) sends 
+    `cmd` until done() and resumes the step, the reply is in .resp.
+    sched: PollScheduler of a goto (poll interval and timeout), 
+    otherwise fixed `period` and no timeout.
+
+    """
+    def __init__(self, cmd, test, sched=None, period=SLEW_POLL):
+        self.cmd = cmd
+        self.test = test
+        self.sched = sched
+        self.period = period
+        self.resp = None
+
+    def done(self, ok, resp):
+        if not (ok and self.test(resp)):
+            return False
+        self.resp = resp
+        if self.sched is not None:
+            self.sched.done()
+        return True
+
+    def next_delay(self):
+        return self.sched.next_delay() if self.sched is not None else self.period
+
+    def check_timeout(self):
+        if self.sched is not None and self.sched.expired():
+            raise TimeoutError(f"{self.cmd}: condition not reached after "
+                               f"{self.sched.elapsed():.1f} s")
+
+class Send:
+    """
+    A command a park step sends, for engines that do their own I/O
+    (asyncWave150i): the engine sends `cmd` and resumes the step with the
+    reply (ok, resp, err). ParkContext sends at once and never yields it.
+
+    """
+    def __init__(self, cmd):
+        self.cmd = cmd
+
+def wait_stopped(axis, distance=None, timeout=None, client=None):
+    """Wait for the end of a goto of `distance` counts (see wait_for_status)."""
+    cmd = f":f{axis}"
+    return Wait(cmd, lambda resp: TestStatus(resp, "Stopped"),
+                PollScheduler(cmd, distance, timeout, client))
+
+def wait_index(axis):
+    """Wait for the home index to be latched during a slew."""
+    return Wait(f":X{axis}000B", lambda resp: resp not in INDEX_UNKNOWN)
+
+def block_on(client, wait, monitor=None, stop_event=None):
+    """
+    Poll `wait.cmd` until the condition holds (one axis, blocking).
+    With a monitor (mountMonitor.StatusMonitor), wait on its shared 
+    poll stream instead of polling, at the same cadence (wait.next_delay).
+    stop_event (set): raise ParkInterrupted; a monitor stopped on an 
+    error raises its mountMonitor.MonitorStopped.
+
+    """
+    if monitor is not None:
+        set_cmd(wait.cmd)
+        ev = monitor.when(wait.cmd, lambda resp: wait.done(True, resp),
+                          cadence=wait.next_delay)
+        try:
+            while not ev.wait(STOP_CHECK):
+                check_stop(wait.cmd, stop_event)
+                wait.check_timeout()
+        finally:
+            ev.cancel()
+        if ev.error is not None:
+            raise ev.error
+        return wait.resp
+    ok, resp, err = client.send_and_recv(set_cmd(wait.cmd))
+    while not wait.done(ok, resp):
+        wait.check_timeout()
+        pause(wait.next_delay(), wait.cmd, stop_event)
+        ok, resp, err = client.send_and_recv(wait.cmd)
+    return wait.resp
+
+class ParkContext:
+    """
+    State of the park sequence of one axis.
+    send, position and goto are generators (`yield from ctx.send(cmd)`): 
+    here the commands go straight to the client, a subclass may yield 
+    them as Send to its engine instead (asyncWave150i.AsyncParkContext).
+
+    """
+    def __init__(self, client, name, driver, params):
+        self.client = client
+        self.name = name
+        self.axis = name[-1]
+        self.driver = driver
+        self.params = params
+        self.slew = None        # slew command payload, from the direction
+        self.pos = None         # last position read
+        self.index = None       # home index found by the slew
+        self.timings = []       # (step, seconds)
+
+    def send(self, cmd):
+        """Generator returning the reply (ok, resp, err) to cmd."""
+        return self.client.send_and_recv(set_cmd(cmd))
+        yield
+
+    def position(self):
+        ok, resp, err = yield from self.send(f":X{self.axis}0003")
+        if not ok:
+            raise RuntimeError(f"{self.name}: position unavailable ({err})")
+        self.pos = h2i(resp)
+        return self.pos
+
+    def goto(self, target):
+        """Generator: start the goto, yield the wait for the axis to stop."""
+        yield from self.send(mountCodec.encode_goto(self.axis, target))
+        yield wait_stopped(self.axis, distance=target - self.pos, client=self.client)
+
+def _step_stop(ctx, arg):
+    # make sur motor is stable
+    yield from ctx.send(f":X{ctx.axis}020000000000000000")
+
+def _step_reset_index(ctx, arg):
+    # reinit ?
+    yield from ctx.send(f":W{ctx.axis}080000")
+
+def _step_read_direction(ctx, arg):
+    ok, direction, err = yield from ctx.send(f":X{ctx.axis}000B")
+    ctx.slew = ctx.params["slew"].get(direction)
+    if ctx.slew is None:
+        raise RuntimeError(f"{ctx.name}: unexpected direction {direction} {err}")
+
+def _step_read_index(ctx, arg):
+    yield from ctx.send(f":X{ctx.axis}000B")
+
+def _step_goto_relative(ctx, arg):
+    # arg: key of params, "-" prefix for a backward motion
+    sign = -1 if arg.startswith("-") else 1
+    delta = sign * ctx.params[arg.lstrip("-")]
+    yield from ctx.goto((yield from ctx.position()) + delta)
+
+def _step_slew_to_index(ctx, arg):
+    yield from ctx.send(f":X{ctx.axis}02{ctx.slew}")
+    w = wait_index(ctx.axis)
+    yield w
+    ctx.index = h2i(w.resp)
+    yield from _step_stop(ctx, arg)
+    yield from ctx.position()
+
+def _step_goto_index(ctx, arg):
+    yield from ctx.goto(ctx.index)
+
+def _step_goto_park_position(ctx, arg):
+    pep = ctx.params["parkEncoderPosition"][ctx.driver]
+    yield from ctx.position()
+    yield from ctx.goto(h2i(pep))
+
+def _step_set_park_position(ctx, arg):
+    pep = ctx.params["parkEncoderPosition"][ctx.driver]
+    yield from ctx.send(f":X{ctx.axis}01{pep}")
+
+# a step is a generator (ctx, arg) yielding the Wait objects of its motions
+# (and, with an AsyncParkContext, the Send of its commands)
+PARK_STEPS = {
+    "stop": _step_stop,
+    "reset_index": _step_reset_index,
+    "read_direction": _step_read_direction,
+    "read_index": _step_read_index,
+    "goto_relative": _step_goto_relative,
+    "slew_to_index": _step_slew_to_index,
+    "goto_index": _step_goto_index,
+    "goto_park_position": _step_goto_park_position,
+    "set_park_position": _step_set_park_position,
+}
+
+def park_axis(client, name, driver, params=None, plan=None, monitor=None,
+              stop_event=None):
+    """
+    Execute the park plan of axis `name` ("Axis1", "Axis2") with its 
+    parameters (default: axisParam[name], plan: params "plan" or PARK_PLAN).
+    monitor: shared StatusMonitor to wait on instead of polling.
+    stop_event (set): ParkInterrupted between two steps or during a wait.
+    Returns the ParkContext, with the duration of each step in .timings
+
+    """
+    params = params or axisParam[name]
+    ctx = ParkContext(client, name, driver, params)
+    for wait in run_plan(ctx, plan or params.get("plan") or PARK_PLAN, stop_event):
+        block_on(client, wait, monitor, stop_event)
+    return ctx
+
+def run_plan(ctx, plan, stop_event=None):
+    """
+    Generator running the steps of `plan` on ctx, yielding the Wait of 
+    each motion; the duration of each step is appended to ctx.timings.
+    stop_event (set): ParkInterrupted before the next step.
+
+    """
+    for step, arg in plan:
+        if step not in PARK_STEPS:
+            raise ValueError(f"unknown park step {step}")
+    for step, arg in plan:
+        check_stop(ctx.name, stop_event)
+        t0 = time.perf_counter()
+        yield from PARK_STEPS[step](ctx, arg)
+        ctx.timings.append((step, time.perf_counter() - t0))
+
+def load_axis_params(path):
+    """
+    Update axisParam from a JSON file, e.g. for another SkyWatcher mount:
+    {"Axis1": {"slew": {...}, "delta+": ..., "delta-": ..., 
+               "parkEncoderPosition": {...}, "plan": [[step, arg], ...]}, ...}
+
+    """
+    import json
+    with open(path, encoding="utf-8") as f:
+        conf = json.load(f)
+    for name, params in conf.items():
+        if "plan" in params:
+            params["plan"] = [tuple(p) for p in params["plan"]]
+        axisParam.setdefault(name, {}).update(params)
+
+def park_with_state(name, worker):
+    """
+    Park axis `name` with the client and driver of `worker`. If worker.state
+    (mountState.MountStateCache) says the encoder frame is still valid, 
+    only QUICK_PARK_PLAN is run; the state is updated after the park and
+    invalidated if it fails.
+
+    """
+    state = getattr(worker, "state", None)
+    plan = None
+    if state is not None:
+        valid, reason = state.check(worker.client, name, worker.driver)
+        print(f'{name}: {"quick park" if valid else "full homing"} ({reason})')
+        if valid:
+            plan = QUICK_PARK_PLAN
+    try:
+        worker.park = park_axis(worker.client, name, worker.driver, plan=plan,
+                                monitor=getattr(worker, "monitor", None),
+                                stop_event=getattr(worker, "stop_event", None))
+    except BaseException:
+        if state is not None:
+            state.invalidate(worker.client, name)
+        raise
+    if state is not None:
+        state.record(worker.client, name, worker.driver, worker.park)
+
+# =================================================================
+#
+#                 Two-axis planner
+#
+# =================================================================
+def poll_round(client, cmds):
+    """
+    Send the poll commands of all the waiting axes as one round: in 
+    flight together if the client has submit(), as a batch otherwise.
+
+    """
+    if hasattr(client, "submit"):
+        futures = [client.submit(c) for c in cmds]
+        return [f.result() for f in futures]
+    if hasattr(client, "send_batch"):
+        return client.send_batch(cmds, 1)
+    return [client.send_and_recv(c) for c in cmds]
+
+def park_both(client, driver, plans=None, state=None, stop_event=None):
+    """
+    Park Axis1 and Axis2 from a single thread. The plans of both axes run
+    side by side: each axis starts its next motion as soon as its previous
+    one is over, so both motors move at every stage, and the axes that are
+    waiting are polled in one round (:f1 and :f2 together, :X.000B during
+    the slews) at the shortest poll interval among them. The park lasts 
+    about as long as the slowest axis.
+    plans: {name: plan}; by default QUICK_PARK_PLAN when `state` says the
+    encoder frame is known (see park_with_state), else the axis plan.
+    stop_event (set) or Ctrl-C: the axes still moving are reported as 
+    interrupted.
+    Returns ({name: ParkContext}, [errors "Axis1: ..."]).
+
+    """
+    names = ("Axis1", "Axis2")
+    plans = dict(plans or {})
+    ctxs, runs, waits, due, errors = {}, {}, {}, {}, []
+
+    def fail(name, msg):
+        errors.append(f"{name}: {msg}")
+        waits.pop(name, None)
+        due.pop(name, None)
+        runs[name].close()
+        if state is not None:
+            state.invalidate(client, name)
+
+    def advance(name):
+        """Run the steps of `name` up to its next wait (or the end of its plan)."""
+        try:
+            w = next(runs[name])
+        except StopIteration:
+            if state is not None:
+                state.record(client, name, driver, ctxs[name])
+            return
+        except Exception as e:
+            fail(name, repr(e))
+            return
+        set_cmd(w.cmd)
+        waits[name] = w
+        due[name] = time.monotonic()
+
+    for name in names:
+        plan = plans.get(name)
+        if plan is None and state is not None:
+            valid, reason = state.check(client, name, driver)
+            print(f'{name}: {"quick park" if valid else "full homing"} ({reason})')
+            if valid:
+                plan = QUICK_PARK_PLAN
+        params = axisParam[name]
+        ctxs[name] = ParkContext(client, name, driver, params)
+        runs[name] = run_plan(ctxs[name], plan or params.get("plan") or PARK_PLAN)
+    try:
+        for name in names:
+            print(f'start {name}')
+            advance(name)
+        while waits:
+            if stop_event is not None and stop_event.is_set():
+                raise KeyboardInterrupt
+            delay = min(due.values()) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            order = list(waits)
+            results = poll_round(client, [waits[n].cmd for n in order])
+            now = time.monotonic()
+            for name, (ok, resp, err) in zip(order, results):
+                w = waits[name]
+                if w.done(ok, resp):
+                    del waits[name], due[name]
+                    advance(name)
+                    continue
+                try:
+                    w.check_timeout()
+                except TimeoutError as e:
+                    fail(name, repr(e))
+                    continue
+                due[name] = now + w.next_delay()
+    except KeyboardInterrupt:
+        for name in list(waits):
+            fail(name, "interrupted")
+    return ctxs, errors
+
 def axis1(name, a1):
     """
     move axis 1 to parking position
 
     """
     print(f'start {name}')
-    # make sur motor is stable
-    cmd = set_cmd(":X102 00000000 00000000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    
-    # reinit ?
-    cmd = set_cmd(":W1080000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    
-    # determine if motor is W or E
-    cmd = set_cmd(":X1000B")
-    ok, direction, err = a1.client.send_and_recv(cmd)
-    if direction == "80000000":
-        slew = "0000000008CA96EB"#"ccwise"
-    elif direction == "7FFFFFFF" :
-        slew = "FFFFFFFFF7356915"
-         #"cwise"
-    
-    # Pas clair sur la valeur renvoyée
-    cmd = set_cmd(":X10003")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # first GOTO
-    goto = pos + 215467
-    cmd = set_cmd(f":X104{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    wait_for_status(a1.client, ":f1", "Stopped")
-    cmd = set_cmd(":W1080000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X1000B")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X10003")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # second GOTO
-    goto = pos - 430933
-    cmd = set_cmd(f":X104{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    wait_for_status(a1.client, ":f1", "Stopped")
-    cmd = set_cmd(":W1080000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X1000B")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X10003")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # third goto
-    goto = pos + 215467
-    cmd = set_cmd(f":X104{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    wait_for_status(a1.client, ":f1", "Stopped")
-    cmd = set_cmd(":W1080000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-
-    # SLEW
-    cmd = set_cmd(f":X102{slew}")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X1000B")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-
-    while resp=="80000000" or resp=="7FFFFFFF":
-        time.sleep(0.05)
-        ok, resp, err = a1.client.send_and_recv(cmd)
-    goto = ctypes.c_int32(int(resp, 16)).value
-    cmd = set_cmd(":X1020000000000000000")
-    ok, _, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X10003")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-
-    # goto
-    cmd = set_cmd(f":X104{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a1.client.send_and_recv(cmd)
-    wait_for_status(a1.client, ":f1", "Stopped")
-    
-    # set position
-    pep = axisParam[name]["parkEncoderPosition"][a1.driver]
-    cmd = set_cmd(f":X101{pep}")
-    ok, _, err = a1.client.send_and_recv(cmd)
-    cmd = set_cmd(":X1020000000000000000")
-    ok, _, err = a1.client.send_and_recv(cmd)
-    time.sleep(1.)
+    park_with_state(name, a1)
+    pause(1., name, getattr(a1, "stop_event", None))
     
 def axis2(name, a2):
     """
@@ -239,84 +638,4 @@ def axis2(name, a2):
 
     """
     print(f'start {name}')
-    # make sur motor is stable
-    cmd = set_cmd(":X202 00000000 00000000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    
-    # reinit ?
-    cmd = set_cmd(":W2080000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    
-    # determine if motor is W or E
-    cmd = set_cmd(":X2000B")
-    ok, direction, err = a2.client.send_and_recv(cmd)
-    if direction == "80000000":
-        slew = "0000000007FD95D8"
-    elif direction == "7FFFFFFF" :
-        slew = "FFFFFFFFF8026A28"
-    
-    # position
-    cmd = set_cmd(":X20003")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # first GOTO
-    goto = pos + 195840
-    cmd = set_cmd(f":X204{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    wait_for_status(a2.client, ":f2", "Stopped")
-    cmd = set_cmd(":W2080000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X2000B")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X20003")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # second GOTO
-    goto = pos - 391680
-    cmd = set_cmd(f":X204{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    wait_for_status(a2.client, ":f2", "Stopped")
-    cmd = set_cmd(":W2080000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X2000B")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X20003")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    pos = ctypes.c_int32(int(resp, 16)).value
-    
-    # third goto
-    goto = pos + 195840
-    cmd = set_cmd(f":X204{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    wait_for_status(a2.client, ":f2", "Stopped")
-    cmd = set_cmd(":W2080000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-
-    # SLEW
-    cmd = set_cmd(f":X202{slew}")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X2000B")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    while resp=="80000000" or resp=="7FFFFFFF":                            #BUG? mettre 80000000 ou 7FFFFFFF
-        time.sleep(0.05)
-        ok, resp, err = a2.client.send_and_recv(cmd)
-    goto = ctypes.c_int32(int(resp, 16)).value
-    cmd = set_cmd(":X2020000000000000000")
-    ok, _, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X20003")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-
-    # goto
-    cmd = set_cmd(f":X204{goto & 0xFFFFFFFF:08X}0000000000000000")
-    ok, resp, err = a2.client.send_and_recv(cmd)
-    wait_for_status(a2.client, ":f2", "Stopped")
-    
-    # set position
-    pep = axisParam[name]["parkEncoderPosition"][a2.driver]
-    cmd = set_cmd(f":X201{pep}")
-    ok, goto, err = a2.client.send_and_recv(cmd)
-    cmd = set_cmd(":X2020000000000000000")
-    ok, _, err = a2.client.send_and_recv(cmd)
-    
\ No newline at end of file
+    park_with_state(name, a2)
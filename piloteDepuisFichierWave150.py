@@ -7,6 +7,15 @@ Envoi de commandes UDP à une monture (ex. Wave 150i) et lecture des réponses.
 - Les lignes de commande peuvent contenir le littéral <cr> qui sera remplacé par '\r'.
 - Les lignes vides sont ignorées; les lignes commençant par '#' ou ';' sont des commentaires.
 - Directive spéciale: WAIT <secondes>  -> pause entre commandes (ex: WAIT 0.5)
+- WAIT et --delay décalent l'instant d'envoi prévu de la commande suivante,
+  compté depuis le début de la session (mountSchedule): le RTT est absorbé.
+  Le CSV donne l'instant prévu et l'instant réel de chaque envoi.
+
+Mode rapide (--fast): le fichier est compilé une fois (commandes en
+bytes, WAIT et --delay convertis en échéances absolues depuis le début),
+jusqu'à --window commandes sont en vol (PipelinedUDPClient, ou le démon),
+de longueurs de réponse différentes pour qu'une réponse perdue ne décale
+pas l'appariement des suivantes, et le CSV est écrit par un thread en tâche de fond, par lots.
 
 Exemple de fichier:
     # Test basique
@@ -17,12 +26,19 @@ Exemple de fichier:
 
 import argparse
 import csv
+import queue
 import socket
 import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
 from typing import Optional, Tuple
 
+import mountCapture
+import mountDaemon
+from mountSchedule import Schedule
+
 def parse_args():
     p = argparse.ArgumentParser(
         description="Envoi de commandes UDP à la monture et lecture des réponses."
@@ -40,11 +56,23 @@ def parse_args():
                    help="Port UDP local à binder (0 = auto)")
     p.add_argument("--out", type=Path, default=Path("session_log.csv"),
                    help="Fichier CSV de log [def: session_log.csv]")
+    p.add_argument("--daemon", nargs="?", const=mountDaemon.DAEMON_PATH, default=None,
+                   help="Passer par le démon local (mountDaemon.py) au lieu de host:port "
+                        f"[def: {mountDaemon.DAEMON_PATH}]")
+    p.add_argument("--capture", type=Path, default=None,
+                   help="Capture binaire des envois/réponses (mountCapture) en plus du CSV")
+    p.add_argument("--fast", action="store_true",
+                   help="Rejeu rapide: commandes pipelinées, CSV en tâche de fond")
+    p.add_argument("--window", type=int, default=8,
+                   help="Mode rapide: commandes en vol au plus [def: 8]")
     return p.parse_args()
 
 def load_commands(path: Path):
+    return load_commands_from_lines(path.read_text(encoding="utf-8").splitlines())
+
+def load_commands_from_lines(lines):
     cmds = []
-    for ln, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+    for ln, raw in enumerate(lines, start=1):
         line = raw.strip()
         if not line or line.startswith("#") or line.startswith(";"):
             continue
@@ -91,11 +119,183 @@ def send_and_recv(sock: socket.socket, host: str, port: int, payload: bytes,
             break
     return False, None, 0.0, last_err
 
+def send_via_daemon(client, payload: str) -> Tuple[bool, Optional[bytes], float, str]:
+    """Même retour que send_and_recv, la monture étant partagée par le démon."""
+    t0 = time.perf_counter()
+    ok, resp, err = client.send_and_recv(payload)
+    if ok:
+        return True, ("=" + resp + "\r").encode("ascii"), time.perf_counter() - t0, ""
+    return False, None, 0.0, err or "réponse d'erreur"
+
 def normalize_text_resp(b: bytes) -> str:
     # Décodage robuste ASCII; strip des CR/LF
     txt = b.decode("ascii", errors="replace").strip("\r\n")
     return txt
 
+# ----------------------------
+# Mode rapide
+# ----------------------------
+def compile_commands(commands, delay: float = 0.0):
+    """
+    Commandes chargées -> étapes (kind, échéance, raw, payload_str, payload_bytes).
+    échéance: instant (s depuis le début du rejeu) avant lequel l'étape ne
+    commence pas: somme des WAIT et des --delay qui la précèdent.
+    """
+    steps = []
+    t = 0.0
+    for kind, val, raw in commands:
+        if kind == "WAIT":
+            steps.append(("WAIT", t, raw, "", b""))
+            t += float(val)
+            continue
+        t += delay
+        steps.append(("SEND", t, raw, val, val.encode("ascii", errors="strict")))
+    return steps
+
+CSV_HEADER = [
+    "timestamp_iso", "cmdline_raw", "directive", "payload_sent",
+    "payload_hex", "ok", "response_text", "response_hex",
+    "rtt_ms", "error", "planned_ms", "sent_ms"
+]
+
+class CsvLogWriter(threading.Thread):
+    """
+    Écrit le CSV de session dans un thread: les lignes sont mises en file
+    sous forme brute, formatées (date, hexdump) et écrites par lots.
+    """
+
+    def __init__(self, path: Path, batch: int = 256):
+        super().__init__(name="csv-writer", daemon=True)
+        self.path = path
+        self.batch = batch
+        self.queue = queue.SimpleQueue()
+        self._stamp = (None, "")
+
+    def log(self, *row):
+        self.queue.put(row)
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+    def _iso(self, t: float) -> str:
+        sec = int(t)
+        if self._stamp[0] != sec:
+            self._stamp = (sec, time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec)))
+        return self._stamp[1]
+
+    def _format(self, row):
+        t, kind, raw, payload_str, payload, ok, resp, rtt, err, planned, sent = row
+        if kind == "WAIT":
+            return [self._iso(t), raw, "WAIT", "", "", True, "", "", 0.0, "", "", ""]
+        txt = normalize_text_resp(resp) if resp is not None else ""
+        return [self._iso(t), raw, "SEND", payload_str.replace("\r", "<CR>"),
+                hexdump(payload), ok, txt, hexdump(resp) if resp is not None else "",
+                round(rtt * 1000.0, 2), err,
+                round(planned * 1000.0, 3), round(sent * 1000.0, 3)]
+
+    def run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w", newline="", encoding="utf-8") as fcsv:
+            w = csv.writer(fcsv)
+            w.writerow(CSV_HEADER)
+            done = False
+            while not done:
+                rows = [self.queue.get()]
+                while len(rows) < self.batch:
+                    try:
+                        rows.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if rows[-1] is None:
+                    rows.pop()
+                    done = True
+                w.writerows(self._format(r) for r in rows)
+
+def replay_fast(steps, client, log: Optional[CsvLogWriter] = None, window: int = 8) -> dict:
+    """
+    Rejoue les étapes compilées sur un client à submit() (PipelinedUDPClient,
+    DaemonClient) avec au plus `window` commandes en vol. L'appariement
+    des réponses revient au client: PipelinedUDPClient ne met en vol
+    ensemble que des commandes de longueurs de réponse différentes (voir
+    initAndParkWave150i._joins), le démon ordonne les siennes.
+    Retourne {"sent", "failed", "wall_s", "rtts", "timing"}.
+    """
+    inflight = deque()      # (future, instant d'envoi, envoi réel, étape), dans l'ordre du fichier
+    rtts = []
+    failed = 0
+    sched = Schedule()
+
+    def complete():
+        nonlocal failed
+        fut, t_sent, sent, (kind, planned, raw, payload_str, payload) = inflight.popleft()
+        if fut is None:     # WAIT: journalisé à son rang dans le fichier
+            if log is not None:
+                log.log(time.time(), "WAIT", raw, "", b"", True, None, 0.0, "", 0.0, 0.0)
+            return
+        ok, resp, err = fut.result()
+        # t_done est posé par le callback, qui peut suivre result() de peu
+        rtt = getattr(fut, "t_done", time.perf_counter()) - t_sent
+        if ok:
+            rtts.append(rtt)
+        else:
+            failed += 1
+        if log is not None:
+            data = None if resp is None else ("=" + resp + "\r").encode("ascii")
+            log.log(time.time(), kind, raw, payload_str, payload, ok, data,
+                    rtt if ok else 0.0, "" if ok else (err or "réponse d'erreur"),
+                    planned, sent)
+
+    def stamp(f):
+        f.t_done = time.perf_counter()
+
+    t0 = time.perf_counter()
+    for step in steps:
+        kind, deadline, raw = step[:3]
+        if kind == "WAIT":
+            inflight.append((None, 0.0, 0.0, step))
+            continue
+        if deadline > sched.elapsed():
+            # attente: on journalise d'abord les réponses déjà arrivées
+            while inflight and (inflight[0][0] is None or inflight[0][0].done()):
+                complete()
+        while len(inflight) >= window:
+            complete()
+        sched.wait(deadline)
+        t_sent = time.perf_counter()
+        fut = client.submit(step[4], window=window)
+        fut.add_done_callback(stamp)
+        inflight.append((fut, t_sent, sched.actual[-1], step))
+    while inflight:
+        complete()
+    return {"sent": len(rtts) + failed, "failed": failed,
+            "wall_s": time.perf_counter() - t0, "rtts": rtts, "timing": sched}
+
+def main_fast(args, commands):
+    steps = compile_commands(commands, args.delay)
+    if args.daemon:
+        client = mountDaemon.DaemonClient(args.daemon)
+    else:
+        from initAndParkWave150i import Connection, PipelinedUDPClient
+        conn = Connection("UDP", host=args.host, port=args.port)
+        conn.DEFAULT_TIMEOUT = args.timeout
+        conn.DEFAULT_RETRIES = args.retries
+        client = PipelinedUDPClient(conn, window=args.window)
+    if args.capture:
+        client = mountCapture.CapturingClient(client, mountCapture.CaptureWriter(args.capture))
+    client.verbose = False
+    log = CsvLogWriter(args.out)
+    log.start()
+    try:
+        res = replay_fast(steps, client, log, max(1, args.window))
+    finally:
+        log.close()
+        client.close()
+    wall = res["wall_s"]
+    print(f"[FAST] {res['sent']} commandes en {wall:.3f} s "
+          f"({res['sent'] / wall if wall > 0 else 0:.0f} cmd/s), {res['failed']} en échec")
+    print(res["timing"].report())
+
 def main():
     args = parse_args()
 
@@ -106,33 +306,50 @@ def main():
         print(f"[ERREUR] Chargement commandes: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Socket UDP
+    if args.fast:
+        try:
+            main_fast(args, commands)
+        except RuntimeError as e:
+            print(f"[ERREUR] {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\n[LOG] Écrit: {args.out.resolve()}")
+        return
+
+    # Socket UDP, ou connexion au démon
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
         sock.bind(("", args.bind))  # port local auto si 0
     except OSError as e:
         print(f"[ERREUR] Bind UDP local: {e}", file=sys.stderr)
         sys.exit(1)
+    daemon = None
+    if args.daemon:
+        try:
+            daemon = mountDaemon.DaemonClient(args.daemon)
+        except RuntimeError as e:
+            print(f"[ERREUR] {e}", file=sys.stderr)
+            sys.exit(1)
+        daemon.verbose = False
+
+    capture = mountCapture.CaptureWriter(args.capture) if args.capture else None
 
     # CSV log
     args.out.parent.mkdir(parents=True, exist_ok=True)
+    sched = Schedule()
     with args.out.open("w", newline="", encoding="utf-8") as fcsv:
         w = csv.writer(fcsv)
-        w.writerow([
-            "timestamp_iso", "cmdline_raw", "directive", "payload_sent",
-            "payload_hex", "ok", "response_text", "response_hex",
-            "rtt_ms", "error"
-        ])
+        w.writerow(CSV_HEADER)
 
         for kind, val, raw in commands:
             if kind == "WAIT":
                 wait_s = float(val)
                 print(f"[WAIT] {wait_s}s")
-                time.sleep(wait_s)
+                # l'envoi suivant est prévu wait_s après le précédent
+                sched.delay(wait_s)
                 # Log la directive
                 w.writerow([
                     time.strftime("%Y-%m-%dT%H:%M:%S"),
-                    raw, "WAIT", "", "", True, "", "", 0.0, ""
+                    raw, "WAIT", "", "", True, "", "", 0.0, "", "", ""
                 ])
                 continue
 
@@ -140,13 +357,22 @@ def main():
             payload_str: str = val
             payload_bytes = payload_str.encode("ascii", errors="strict")
 
-            if args.delay > 0:
-                time.sleep(args.delay)
+            sched.delay(args.delay)
+            sched.wait()
+            planned_ms = round(sched.planned[-1] * 1000.0, 3)
+            sent_ms = round(sched.actual[-1] * 1000.0, 3)
 
             print(f"[SEND] {repr(payload_str)}")
-            ok, resp, rtt, err = send_and_recv(
-                sock, args.host, args.port, payload_bytes, args.timeout, args.retries
-            )
+            if capture is not None:
+                t_sent = capture.sent(payload_bytes)
+            if daemon is not None:
+                ok, resp, rtt, err = send_via_daemon(daemon, payload_str)
+            else:
+                ok, resp, rtt, err = send_and_recv(
+                    sock, args.host, args.port, payload_bytes, args.timeout, args.retries
+                )
+            if capture is not None:
+                capture.received(payload_bytes, resp if ok else None, t_sent, err)
 
             if ok and resp is not None:
                 txt = normalize_text_resp(resp)
@@ -162,7 +388,8 @@ def main():
                     txt,
                     hexdump(resp),
                     round(rtt * 1000.0, 2),
-                    "" if looks_ok else "Unexpected format"
+                    "" if looks_ok else "Unexpected format",
+                    planned_ms, sent_ms
                 ])
             else:
                 print(f"[TIMEOUT/ERR] {err}")
@@ -170,10 +397,15 @@ def main():
                     time.strftime("%Y-%m-%dT%H:%M:%S"),
                     raw, "SEND", payload_str.replace("\r", "<CR>"),
                     hexdump(payload_bytes),
-                    False, "", "", 0.0, err
+                    False, "", "", 0.0, err, planned_ms, sent_ms
                 ])
 
+    print(sched.report())
+    if capture is not None:
+        capture.close()
     sock.close()
+    if daemon is not None:
+        daemon.close()
     print(f"\n[LOG] Écrit: {args.out.resolve()}")
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ import ctypes
 import time
 from typing import Optional, Tuple
 
+import mountStatus
+from mountSchedule import Schedule
+
 
 # ------------------------
 # Paramètres de connexion
@@ -11,6 +14,7 @@ MOUNT_IP = "192.168.4.1"   # IP de la monture (à adapter)
 MOUNT_PORT = 11880         # Port UDP de la monture (à adapter)
 TIMEOUT = 2.
 RETRIES = 20
+LOOP_PERIOD = 0.1          # s entre deux envois de la commande d'un LOOP
 
 def send_and_recv(sock: socket.socket, host: str, port: int, payload: bytes,
                   timeout: float, retries: int) -> Tuple[bool, Optional[bytes], float, str]:
@@ -40,21 +44,28 @@ def send_and_recv(sock: socket.socket, host: str, port: int, payload: bytes,
 def processLoop(cmd, sock, ip, port, timeout, retries):
     
     parts = cmd.split(maxsplit=2)
-    print (f'LOOP on {parts[1]} waiting  {parts[2]}')
     if len(parts) != 3:
-        raise ValueError('syntaxe fausse pour LOOP: {cmd}')
+        raise ValueError(f'syntaxe fausse pour LOOP: {cmd}')
+    print (f'LOOP on {parts[1]} waiting  {parts[2]}')
+    # condition compilée une fois (pas d'eval), voir mountStatus.compile_condition
+    condition = mountStatus.compile_condition(parts[2])
     sw_cmd = parts[1]+'\r'
+    # un envoi toutes les LOOP_PERIOD s, RTT compris
+    sched = Schedule()
     ok, resp, rtt, err = send_and_recv(
         sock, ip, port, sw_cmd.encode("ascii"), 
         timeout, retries
     )
-    print(f'> {parts[1]} => Response {resp}, condition {parts[2]}',eval(parts[2]))
-    while (eval(parts[2])):
-        time.sleep(0.1)
+    test = condition(resp)
+    print(f'> {parts[1]} => Response {resp}, condition {parts[2]}', test)
+    while (test):
+        sched.delay(LOOP_PERIOD)
+        sched.wait()
         ok, resp, rtt, err = send_and_recv(
             sock, ip, port, sw_cmd.encode("ascii"), 
             timeout, retries)
-        print(f'> {parts[1]} => Response {resp}, condition {parts[2]}',eval(parts[2]))
+        test = condition(resp)
+        print(f'> {parts[1]} => Response {resp}, condition {parts[2]}', test)
 
         
 def decode_status(s: str) -> str:
@@ -62,27 +73,7 @@ def decode_status(s: str) -> str:
     Décode une chaîne hexa de 3 caractères (ex: '0FA')
     et renvoie une description compacte des statuts.
     """
-
-    # Convertir en entier
-    value = int(s, 16)
-
-    # Extraire les 3 digits hex
-    c1 = (value >> 8) & 0xF   # premier caractère
-    c2 = (value >> 4) & 0xF   # deuxième
-    c3 = value & 0xF          # troisième
-
-    # Décodage
-    parts = [
-        "Tracking" if (c1 & 0b001) else "Goto",
-        "CCW" if (c1 & 0b010) else "CW",
-        "Fast" if (c1 & 0b100) else "Slow",
-        "Running" if (c2 & 0b001) else "Stopped",
-        "Blocked" if (c2 & 0b010) else "Normal",
-        "Init done" if (c3 & 0b001) else "Not Init",
-        "Level on" if (c3 & 0b010) else "Level off",
-    ]
-
-    return " | ".join(parts)
+    return mountStatus.decode(s).describe()
 
 def decode_position(hexstr: str) -> int:
     """
@@ -108,6 +99,8 @@ def decode_position(hexstr: str) -> int:
 
 def interactive_session(ip, port, timeout, retries):
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # WAIT t: la commande suivante part t s après l'envoi de la précédente
+    sched = Schedule()
 
     print("=== Session interactive SkyWatcher (UDP) ===")
     print("Tapez une commande (ex: :f1 ou :GVP). Tapez 'quit' pour sortir.\n")
@@ -120,14 +113,16 @@ def interactive_session(ip, port, timeout, retries):
 
 # process WAIT        
         if cmd.upper().startswith("WAIT"):
-            parts = cmd.split()
+            parts = raw.split()     # cmd n'a plus d'espaces
             if len(parts) != 2:
                 raise ValueError(f"Input: syntaxe WAIT invalide -> {cmd}")
             try:
                 wait_s = float(parts[1])
             except ValueError:
                 raise ValueError(f"Input: durée WAIT invalide -> {cmd}")
-            time.sleep(wait_s)
+            sched.delay(wait_s)
+            sched.wait()
+            continue
 
 #process LOOP      
         if cmd.upper().startswith("LOOP"):
@@ -146,6 +141,7 @@ def interactive_session(ip, port, timeout, retries):
         if not cmd.endswith("\r"):
             cmd += "\r"
 
+        sched.mark()
         ok, resp, rtt, err = send_and_recv(
             sock, ip, port, cmd.encode("ascii"), 
             timeout, retries
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulateur local du contrôleur moteur de la Wave150i (UDP et port série pty).
+
+Implémente les commandes utilisées par les scripts:
+    :f  :e  :q  :X..02/03/06/0B  :X..01/02/04/05/0E/0F  :W  :F  :j  :P  :V  :b  :s
+avec un modèle de mouvement en temps réel:
+- goto (:X.04) à vitesse constante `goto_rate` (pas/s)
+- slew (:X.02) à la vitesse codée dans la commande (x `slew_scale` pas/s)
+- un index de "home" par axe, mémorisé au passage et lu par :X.000B
+  (80000000 / 7FFFFFFF tant qu'il n'a pas été franchi, selon le côté),
+  effacé par :W.08....
+Latence, gigue et perte de paquets sont configurables.
+Port série pty avec --baud: le temps de ligne est émulé (10 bits par
+octet, dans chaque sens, une trame après l'autre), et un port ouvert à un
+autre débit ne reçoit aucune réponse, comme la vraie monture.
+
+usage: python simulWave150i.py [--host 127.0.0.1] [--port 11880] [--pty] [--baud N]
+                               [--latency s] [--jitter s] [--loss p] [--speedup k]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import selectors
+import socket
+import termios
+import threading
+import time
+
+from parkAxis import axisParam
+
+
+INDEX_UNKNOWN_PLUS = 0x80000000     # index devant (sens +)
+INDEX_UNKNOWN_MINUS = 0x7FFFFFFF    # index derrière (sens -)
+
+
+def _hex24_le(value: int) -> str:
+    """Entier 24 bits codé à la SkyWatcher: octets dans l'ordre 56 34 12."""
+    v = value & 0xFFFFFF
+    return f"{v & 0xFF:02X}{(v >> 8) & 0xFF:02X}{(v >> 16) & 0xFF:02X}"
+
+
+def _s32(hexstr: str) -> int:
+    v = int(hexstr, 16)
+    return v - (1 << 32) if v & 0x80000000 else v
+
+
+def _s64(hexstr: str) -> int:
+    v = int(hexstr, 16)
+    return v - (1 << 64) if v & (1 << 63) else v
+
+
+class SimAxis:
+    """Un moteur: position, mode de mouvement, index de home."""
+
+    def __init__(self, home: int, goto_rate: float, slew_scale: float):
+        self.home = home
+        self.goto_rate = goto_rate
+        self.slew_scale = slew_scale
+        self.pos = 0.0
+        self.t = 0.0
+        self.mode = None          # None, "goto", "slew"
+        self.target = 0
+        self.velocity = 0.0       # pas/s (signé)
+        self.index = None         # valeur mémorisée au passage du home
+        self.init_done = False
+
+    def update(self, now: float):
+        dt = now - self.t
+        self.t = now
+        if self.mode is None or dt <= 0:
+            return
+        old = self.pos
+        if self.mode == "goto":
+            step = self.goto_rate * dt
+            dist = self.target - self.pos
+            if abs(dist) <= step:
+                self.pos = float(self.target)
+                self.mode = None
+                self.velocity = 0.0
+            else:
+                self.velocity = self.goto_rate if dist > 0 else -self.goto_rate
+                self.pos += step if dist > 0 else -step
+        else:
+            self.pos += self.velocity * dt
+        lo, hi = min(old, self.pos), max(old, self.pos)
+        if self.index is None and lo <= self.home <= hi and old != self.pos:
+            self.index = self.home
+
+    def position(self) -> int:
+        return int(round(self.pos))
+
+    def status(self) -> str:
+        running = self.mode is not None
+        c1 = (1 if self.mode == "slew" else 0) \
+            | (2 if self.velocity < 0 else 0) \
+            | (4 if running and abs(self.velocity) > 1000 else 0)
+        c2 = 1 if running else 0
+        c3 = 1 if self.init_done else 0
+        return f"{c1:X}{c2:X}{c3:X}"
+
+    def index_value(self) -> int:
+        if self.index is not None:
+            return self.index & 0xFFFFFFFF
+        return INDEX_UNKNOWN_PLUS if self.home > self.pos else INDEX_UNKNOWN_MINUS
+
+
+class MountSimulator:
+    """
+    Monture simulée. start() lance la boucle de service dans un thread;
+    .port donne le port UDP effectif, .pty_name le port série éventuel.
+    """
+
+    def __init__(self, host="127.0.0.1", port=11880, pty=False,
+                 latency=0.0, jitter=0.0, loss=0.0, speedup=1.0,
+                 goto_rate=20000.0, slew_scale=1e-4, homes=(123456, -54321),
+                 seed=None, baud=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.speedup = speedup
+        self.rng = random.Random(seed)
+        self.axes = {"1": SimAxis(homes[0], goto_rate, slew_scale),
+                     "2": SimAxis(homes[1], goto_rate, slew_scale)}
+        self.requests = 0
+        self._t0 = time.monotonic()
+        self._sel = selectors.DefaultSelector()
+        self._replies = []        # tas (échéance, n, cible, octets)
+        self._n = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self._sel.register(self.sock, selectors.EVENT_READ, "udp")
+
+        self.pty_name = None
+        self._pty_master = None
+        self._pty_buf = bytearray()
+        self.baud = baud            # pty: débit émulé (None: pas de temps de ligne)
+        self._rx_free = 0.0         # fin de réception de la dernière commande (monotonic)
+        self._tx_free = 0.0         # fin d'émission de la dernière réponse
+        if pty:
+            master, slave = os.openpty()
+            os.set_blocking(master, False)
+            self._pty_master = master
+            self._pty_slave = slave
+            self.pty_name = os.ttyname(slave)
+            self._sel.register(master, selectors.EVENT_READ, "pty")
+
+    # --- temps simulé ---------------------------------------------------
+    def now(self) -> float:
+        return (time.monotonic() - self._t0) * self.speedup
+
+    # --- protocole --------------------------------------------------------
+    def handle(self, cmd: str) -> str:
+        """Traite une commande (sans <cr>) et renvoie la réponse (sans <cr>)."""
+        self.requests += 1
+        if len(cmd) < 3 or cmd[0] != ":" or cmd[2] not in self.axes:
+            return "!0"
+        op, ax, arg = cmd[1], self.axes[cmd[2]], cmd[3:]
+        ax.update(self.now())
+        if op == "f":
+            return "=" + ax.status()
+        if op == "e":
+            return "=0B3032"
+        if op == "q":
+            return "=000000"
+        if op == "j":
+            return "=" + _hex24_le(ax.position() + 0x800000)
+        if op == "b":
+            return "=" + _hex24_le(0x1E8480)
+        if op == "s":
+            return "=" + _hex24_le(int(4 * axisParam[f"Axis{cmd[2]}"]["delta+"]))
+        if op == "F":
+            ax.init_done = True
+            return "="
+        if op == "W":
+            if arg[:2] == "08":
+                ax.index = None
+            return "="
+        if op in "PV":
+            return "="
+        if op == "X":
+            return self._handle_x(ax, arg[:2], arg[2:])
+        return "!0"
+
+    def _handle_x(self, ax: SimAxis, sub: str, data: str) -> str:
+        if sub == "00":
+            if data == "03":
+                return f"={ax.position() & 0xFFFFFFFF:08X}"
+            if data == "0B":
+                return f"={ax.index_value():08X}"
+            return "=00000000"
+        if sub == "01" and len(data) >= 8:
+            # le home physique ne bouge pas: il change de valeur avec le repère
+            new = float(_s32(data[:8]))
+            ax.home += int(round(new - ax.pos))
+            ax.pos = new
+            return "="
+        if sub == "02" and len(data) >= 16:
+            v = _s64(data[:16]) * ax.slew_scale
+            if v == 0:
+                ax.mode, ax.velocity = None, 0.0
+            else:
+                ax.mode, ax.velocity = "slew", v
+            return "="
+        if sub == "04" and len(data) >= 8:
+            ax.target = _s32(data[:8])
+            ax.mode = "goto"
+            return "="
+        if sub == "0F":
+            a1, a2 = self.axes["1"], self.axes["2"]
+            a1.update(self.now())
+            a2.update(self.now())
+            return (f"=0{a1.position() & 0xFFFFFFFF:08X}{a2.position() & 0xFFFFFFFF:08X}"
+                    f"{0:08X}{0:08X}")
+        if sub in ("05", "0E"):
+            return "="
+        return "!0"
+
+    # --- transport ----------------------------------------------------------
+    def _line_time(self, nbytes: int) -> float:
+        return nbytes * 10 / self.baud
+
+    def _baud_matches(self) -> bool:
+        """Le port pty est-il ouvert au débit émulé ? (vitesse posée par le client)"""
+        try:
+            ispeed, ospeed = termios.tcgetattr(self._pty_slave)[4:6]
+        except termios.error:
+            return True
+        return ospeed == getattr(termios, f"B{self.baud}", ospeed)
+
+    def _queue_reply(self, dest, payload: bytes, t: float = None):
+        """Réponse envoyée après la latence, comptée depuis t (réception de la commande)."""
+        if self.loss and self.rng.random() < self.loss:
+            return
+        now = time.monotonic()
+        due = (t or now) + self.latency
+        if self.jitter:
+            due += self.rng.uniform(0.0, self.jitter)
+        if dest == "pty" and self.baud:
+            # la réponse part quand la ligne est libre et arrive en entier
+            self._tx_free = max(self._tx_free, due) + self._line_time(len(payload))
+            due = self._tx_free
+        if due <= now:
+            self._send(dest, payload)
+            return
+        self._n += 1
+        heapq.heappush(self._replies, (due, self._n, dest, payload))
+
+    def _send(self, dest, payload: bytes):
+        try:
+            if dest == "pty":
+                os.write(self._pty_master, payload)
+            else:
+                self.sock.sendto(payload, dest)
+        except OSError:
+            pass
+
+    def _on_command(self, dest, raw: bytes, t: float = None):
+        cmd = raw.decode("ascii", errors="ignore").strip().replace(" ", "")
+        if not cmd:
+            return
+        self._queue_reply(dest, (self.handle(cmd) + "\r").encode("ascii"), t)
+
+    def serve_forever(self):
+        while not self._stop.is_set():
+            timeout = 0.1
+            if self._replies:
+                timeout = max(0.0, min(timeout, self._replies[0][0] - time.monotonic()))
+            for key, _ in self._sel.select(timeout):
+                if key.data == "udp":
+                    while True:
+                        try:
+                            data, addr = self.sock.recvfrom(2048)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            break
+                        self._on_command(addr, data)
+                else:
+                    try:
+                        self._pty_buf += os.read(self._pty_master, 4096)
+                    except (BlockingIOError, OSError):
+                        continue
+                    now = time.monotonic()
+                    while b"\r" in self._pty_buf:
+                        line, _, rest = self._pty_buf.partition(b"\r")
+                        self._pty_buf = bytearray(rest)
+                        t = None
+                        if self.baud:
+                            if not self._baud_matches():
+                                continue    # débit différent: trame illisible
+                            self._rx_free = max(self._rx_free, now) + self._line_time(len(line) + 1)
+                            t = self._rx_free
+                        self._on_command("pty", bytes(line), t)
+            now = time.monotonic()
+            while self._replies and self._replies[0][0] <= now:
+                _, _, dest, payload = heapq.heappop(self._replies)
+                self._send(dest, payload)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name="wave150i-sim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._sel.close()
+        self.sock.close()
+        if self._pty_master is not None:
+            os.close(self._pty_master)
+            os.close(self._pty_slave)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Simulateur de monture Wave150i.")
+    p.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute [def: 127.0.0.1]")
+    p.add_argument("--port", type=int, default=11880, help="Port UDP [def: 11880]")
+    p.add_argument("--pty", action="store_true", help="Ouvrir aussi un port série pty")
+    p.add_argument("--baud", type=int, default=None,
+                   help="Débit émulé du port pty (temps de ligne) [def: aucun]")
+    p.add_argument("--latency", type=float, default=0.0, help="Latence de réponse (s)")
+    p.add_argument("--jitter", type=float, default=0.0, help="Gigue max ajoutée (s)")
+    p.add_argument("--loss", type=float, default=0.0, help="Probabilité de perte [0-1]")
+    p.add_argument("--speedup", type=float, default=1.0,
+                   help="Accélération du temps simulé (mouvements) [def: 1]")
+    p.add_argument("--goto-rate", type=float, default=20000.0,
+                   help="Vitesse de goto (pas/s) [def: 20000]")
+    p.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    sim = MountSimulator(args.host, args.port, args.pty, args.latency, args.jitter,
+                         args.loss, args.speedup, args.goto_rate, seed=args.seed,
+                         baud=args.baud)
+    print(f"[SIM] UDP {args.host}:{sim.port}")
+    if sim.pty_name:
+        print(f"[SIM] série {sim.pty_name}" + (f" ({args.baud} bauds)" if args.baud else ""))
+    try:
+        sim.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[SIM] {sim.requests} requêtes servies")
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
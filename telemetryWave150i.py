@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enregistreur de télémétrie: position (:X10003 / :X20003) et statut
+(:f1 / :f2) des deux axes échantillonnés en continu.
+
+Les échantillons (horodatés avec perf_counter) sont rangés dans un
+tampon circulaire binaire de taille fixe, vidé périodiquement sur disque
+par un thread d'écriture: la mémoire reste bornée quelle que soit la durée.
+
+Fichier: en-tête MAGIC + enregistrements RECORD (little endian)
+    t (float64, s depuis le début) | pos1, pos2 (int32) |
+    status1, status2 (uint16, réponse de :f) | valid (uint8, bits pos1 pos2 st1 st2)
+
+usage: python telemetryWave150i.py [--host H] [--port P] [--rate Hz]
+                                   [--duration s] [--pipeline] [--daemon [PATH]] out.tlm
+"""
+
+import argparse
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+import mountCodec
+from initAndParkWave150i import Connection, make_client
+
+
+MAGIC = b"W150TLM1"
+RECORD = struct.Struct("<diiHHB")
+
+POLL_CMDS = (":X10003", ":X20003", ":f1", ":f2")
+
+
+class TelemetryRing:
+    """
+    Tampon circulaire d'enregistrements RECORD dans un bytearray préalloué.
+    Un seul producteur (push) et un seul consommateur (drain).
+    Si le consommateur prend trop de retard, les plus anciens échantillons
+    non écrits sont écrasés et comptés dans `dropped`.
+    """
+
+    def __init__(self, capacity: int = 8192):
+        self.capacity = capacity
+        self.buf = bytearray(capacity * RECORD.size)
+        self.head = 0           # nombre total d'échantillons écrits
+        self.tail = 0           # nombre total d'échantillons vidés
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def push(self, t, pos1, pos2, st1, st2, valid):
+        with self.lock:
+            RECORD.pack_into(self.buf, (self.head % self.capacity) * RECORD.size,
+                             t, pos1, pos2, st1, st2, valid)
+            self.head += 1
+            if self.head - self.tail > self.capacity:
+                self.dropped += self.head - self.tail - self.capacity
+                self.tail = self.head - self.capacity
+
+    def drain(self) -> bytes:
+        """Octets des échantillons non encore vidés, dans l'ordre."""
+        with self.lock:
+            n = self.head - self.tail
+            if n == 0:
+                return b""
+            start = (self.tail % self.capacity) * RECORD.size
+            end = start + n * RECORD.size
+            if end <= len(self.buf):
+                out = bytes(self.buf[start:end])
+            else:
+                out = bytes(self.buf[start:]) + bytes(self.buf[:end - len(self.buf)])
+            self.tail = self.head
+            return out
+
+
+class TelemetrySampler:
+    """
+    Échantillonne les deux axes à `rate` Hz sur `client` (dans un thread)
+    et écrit les échantillons dans `path` toutes les `flush_every` secondes.
+    monitor: mountMonitor.StatusMonitor; les échantillons sont alors pris
+    sur son polling, partagé avec les attentes de fin de mouvement.
+    """
+
+    def __init__(self, client, path: Path, rate: float = 50.0,
+                 flush_every: float = 0.5, capacity: int = 8192, monitor=None):
+        self.client = client
+        self.monitor = monitor
+        self._sub = None
+        self.path = Path(path)
+        self.period = 1.0 / rate
+        self.flush_every = flush_every
+        self.ring = TelemetryRing(capacity)
+        self.samples = 0
+        self.late = 0           # cycles commencés après leur échéance
+        self._stop = threading.Event()
+        self._threads = []
+        self._file = None
+
+    def _poll(self):
+        """Une série de 4 commandes; pipelinée si le client le permet."""
+        if hasattr(self.client, "submit"):
+            futures = [self.client.submit(c) for c in POLL_CMDS]
+            return [f.result() for f in futures]
+        return [self.client.send_and_recv(c) for c in POLL_CMDS]
+
+    def _record(self, t, results):
+        valid = 0
+        vals = [0, 0, 0, 0]
+        for i, (ok, resp, err) in enumerate(results):
+            if ok and resp:
+                try:
+                    vals[i] = mountCodec.int32(resp) if i < 2 else int(resp, 16) & 0xFFFF
+                    valid |= 1 << i
+                except ValueError:
+                    pass
+        self.ring.push(t, vals[0], vals[1], vals[2], vals[3], valid)
+        self.samples += 1
+
+    def _on_round(self, updates):
+        """Rappel du moniteur: un tour contenant les 4 commandes."""
+        self._record(updates[0].t - self._t0, [(u.ok, u.resp, "") for u in updates])
+
+    def _sample_loop(self):
+        t0 = self._t0
+        next_t = t0
+        while not self._stop.is_set():
+            t = time.perf_counter()
+            self._record(t - t0, self._poll())
+            # échéances absolues: pas de dérive si un cycle est plus long
+            next_t += self.period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                self.late += 1
+                next_t = time.perf_counter()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_every):
+            self.flush()
+
+    def flush(self):
+        data = self.ring.drain()
+        if data:
+            self._file.write(data)
+            self._file.flush()
+
+    def start(self):
+        self._file = self.path.open("wb")
+        self._file.write(MAGIC)
+        self._t0 = time.perf_counter()
+        self._threads = [threading.Thread(target=self._flush_loop, name="tlm-flush", daemon=True)]
+        if self.monitor is not None:
+            self._sub = self.monitor.subscribe(POLL_CMDS, self._on_round, self.period,
+                                               changes_only=False)
+        else:
+            self._threads.append(threading.Thread(target=self._sample_loop,
+                                                  name="tlm-sample", daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        if self._sub is not None:
+            self._sub.cancel()
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=5.0)
+        self.flush()            # derniers échantillons, threads arrêtés
+        self._file.close()
+
+
+def read_telemetry(path: Path):
+    """Itère sur les enregistrements (t, pos1, pos2, st1, st2, valid) d'un fichier."""
+    with Path(path).open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: pas un fichier de télémétrie")
+        while True:
+            chunk = f.read(RECORD.size * 4096)
+            if not chunk:
+                break
+            usable = len(chunk) - len(chunk) % RECORD.size
+            yield from RECORD.iter_unpack(chunk[:usable])
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Enregistreur de télémétrie des deux axes.")
+    p.add_argument("out", type=Path, help="Fichier de sortie (.tlm)")
+    p.add_argument("--host", default=None, help="Adresse de la monture [def: 192.168.4.1]")
+    p.add_argument("--port", type=int, default=None, help="Port UDP [def: 11880]")
+    p.add_argument("--rate", type=float, default=50.0, help="Échantillons/s [def: 50]")
+    p.add_argument("--duration", type=float, default=10.0, help="Durée (s) [def: 10]")
+    p.add_argument("--pipeline", action="store_true",
+                   help="Client pipeliné: les 4 requêtes d'un échantillon en parallèle")
+    p.add_argument("--daemon", nargs="?", const="/tmp/wave150i.sock", default=None,
+                   help="Passer par le démon local (mountDaemon.py) [def: /tmp/wave150i.sock]")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.daemon:
+        conn = Connection("DAEMON", port=args.daemon)
+    else:
+        conn = Connection("UDP", host=args.host, port=args.port)
+    client = make_client(conn, args.pipeline)
+    client.verbose = False
+    sampler = TelemetrySampler(client, args.out, args.rate).start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        client.close()
+    print(f"[TLM] {sampler.samples} échantillons ({sampler.late} en retard, "
+          f"{sampler.ring.dropped} perdus) -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
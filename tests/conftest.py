@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures communes: les modules sont des scripts à la racine du dépôt, et
+les clients sont testés contre simulWave150i sur la boucle locale.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import parkAxis                             # noqa: E402
+from simulWave150i import MountSimulator    # noqa: E402
+
+parkAxis.DEBUG = False
+
+
+@pytest.fixture
+def sim():
+    """Monture simulée sans perte, mouvements accélérés."""
+    s = MountSimulator(port=0, latency=0.002, speedup=50, seed=1).start()
+    yield s
+    s.stop()
+
+
+@pytest.fixture
+def lossy_sim():
+    """Monture simulée qui perd 10 % des réponses."""
+    s = MountSimulator(port=0, latency=0.002, loss=0.1, speedup=50, seed=2).start()
+    yield s
+    s.stop()
+
+
+@pytest.fixture
+def connection():
+    """Connection UDP vers un simulateur (délais courts pour les tests)."""
+    pytest.importorskip("serial")       # initAndParkWave150i importe pyserial
+    from initAndParkWave150i import Connection
+
+    def make(s, iface="UDP", baud=None):
+        if iface == "UDP":
+            return Connection("UDP", host="127.0.0.1", port=s.port)
+        return Connection("USB", port=s.pty_name, baud=baud)
+    return make
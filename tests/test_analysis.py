@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Chargement vectorisé des captures et statistiques de mountAnalysis."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import mountAnalysis    # noqa: E402
+import mountCapture     # noqa: E402
+from mountCapture import CaptureWriter   # noqa: E402
+
+
+def _session(path):
+    """Envois entrelacés des deux axes; une réponse perdue sur l'axe 2."""
+    w = CaptureWriter(path)
+    for i in range(300):
+        t1 = w.sent(b":X10003\r")
+        t2 = w.sent(b":f2\r")
+        w.received(b":f2\r", None if i % 10 == 0 else b"=101\r", t2,
+                   "timeout (attempt 1)" if i % 10 == 0 else "")
+        w.received(b":X10003\r", f"={i:08X}\r".encode(), t1)
+    return w
+
+
+def test_load_capture_pairs_replies_per_axis(tmp_path):
+    path = tmp_path / "s.cap"
+    _session(path).close()
+    ex = mountAnalysis.load_capture(path)
+    assert len(ex.t) == 600 and np.all(np.diff(ex.t) >= 0)
+    x = ex.axis == ord("1")
+    assert mountAnalysis.int32_field(ex.reply[x]).tolist() == list(range(300))
+    f = ex.axis == ord("2")
+    assert (ex.status[f] == mountCapture.TIMEOUT).sum() == 30
+    assert set(ex.reply[f & (ex.status == mountCapture.OK)].tolist()) == {b"=101\r"}
+    rates = mountAnalysis.failure_rates(ex)
+    assert rates["2"]["timeouts"] == 30 and rates["1"]["failure_rate"] == 0.0
+
+
+def test_load_capture_without_footer_matches_index(tmp_path):
+    path = tmp_path / "s.cap"
+    w = _session(path)
+    w._f.flush()
+    partial = mountAnalysis.load_capture(path)      # pas de pied: parcours
+    w.close()
+    full = mountAnalysis.load_capture(path)
+    for a, b in zip(partial, full):
+        assert np.array_equal(a, b, equal_nan=a.dtype.kind == "f")
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import time
+
+import mountCache
+
+
+def test_ttl_of():
+    assert mountCache.ttl_of(b":f1\r") == mountCache.TTL[b":f"]
+    assert mountCache.ttl_of(b":e1\r") == 3600.
+    assert mountCache.ttl_of(b":Z1\r") == mountCache.DEFAULT_TTL
+
+
+def test_reads_served_within_ttl(sim, connection):
+    from initAndParkWave150i import make_client
+    client = make_client(connection(sim), cache=True)
+    client.verbose = False
+    try:
+        n = sim.requests
+        first = client.send_and_recv(":e1")
+        assert first[0] and client.send_and_recv(":e1") == first
+        assert sim.requests == n + 1
+        client.send_and_recv(":f1")
+        time.sleep(mountCache.TTL[b":f"] * 2)
+        client.send_and_recv(":f1")
+        assert sim.requests == n + 3
+        assert client.stats()["hits"] == 1
+    finally:
+        client.close()
+
+
+def test_write_invalidates_axis(sim, connection):
+    from initAndParkWave150i import make_client
+    client = make_client(connection(sim), cache=True)
+    client.verbose = False
+    try:
+        client.send_and_recv(":X10003")
+        client.send_and_recv(":X20003")
+        client.send_and_recv(":X10100010000")     # position de l'axe 1
+        n = sim.requests
+        assert client.send_and_recv(":X10003") == (True, "00010000", "")
+        client.send_and_recv(":X20003")
+        assert sim.requests == n + 1              # axe 2 toujours en cache
+    finally:
+        client.close()
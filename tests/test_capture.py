@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import mountCapture
+from mountCapture import CaptureReader, CaptureWriter
+
+
+def _write(path, n):
+    w = CaptureWriter(path)
+    for i in range(n):
+        t = w.sent(b":f1\r" if i % 2 else b":X20003\r")
+        w.received(b":f1\r" if i % 2 else b":X20003\r", b"=101\r" if i % 2 else None,
+                   t, "" if i % 2 else "timeout (attempt 1)")
+    return w
+
+
+def test_round_trip_with_index(tmp_path):
+    path = tmp_path / "s.cap"
+    _write(path, 600).close()
+    with CaptureReader(path) as r:
+        assert len(r) == 1200
+        assert len(r.times) == 1200 // mountCapture.INDEX_EVERY + 1
+        recs = list(r)
+        assert recs[0].direction == mountCapture.SENT and recs[0].cmd == "X"
+        assert recs[0].axis == "2" and recs[0].data == b":X20003\r"
+        assert recs[1].status == mountCapture.TIMEOUT
+        assert recs[3].status == mountCapture.OK and recs[3].data == b"=101\r"
+        assert len(list(r.by_command("f"))) == 600
+        t = recs[700].t
+        assert next(r.seek(t)).t >= t
+
+
+def test_interrupted_capture_is_readable(tmp_path):
+    path = tmp_path / "s.cap"
+    w = _write(path, 10)
+    w._f.flush()
+    with CaptureReader(path) as r:       # pas de pied: index reconstruit
+        assert len(r) == 20
+        assert len(list(r.by_command("f"))) == 10
+    w.close()
+
+
+def test_capturing_client(tmp_path, sim, connection):
+    from initAndParkWave150i import make_client
+    path = tmp_path / "c.cap"
+    client = make_client(connection(sim), pipeline=True, capture=path)
+    client.verbose = False
+    client.send_and_recv(":e1")
+    client.send_batch([":f1", ":f2"], 2)
+    client.close()
+    with CaptureReader(path) as r:
+        data = [rec.data for rec in r if rec.direction == mountCapture.RECV]
+    assert data[0] == b"=0B3032\r" and len(data) == 3
+
+
+def test_no_reply_keeps_pairing(tmp_path, sim, connection):
+    import csv
+    import time
+    from initAndParkWave150i import make_client
+    path = tmp_path / "n.cap"
+    client = make_client(connection(sim), pipeline=True, capture=path)
+    client.verbose = False
+    client.send_and_recv(":K1", expect_response=False)
+    time.sleep(0.05)        # la réponse de :K1 arrive sans demandeur
+    client.send_and_recv(":e1")
+    client.close()
+    with CaptureReader(path) as r:
+        recv = [rec for rec in r if rec.direction == mountCapture.RECV]
+        assert [rec.status for rec in recv] == [mountCapture.NO_REPLY, mountCapture.OK]
+        assert mountCapture.to_csv(r, tmp_path / "n.csv") == 2
+    with (tmp_path / "n.csv").open(newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["payload_sent"] for r in rows] == [":K1<CR>", ":e1<CR>"]
+    assert rows[1]["response_text"] == "=0B3032"
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Clients UDP et série contre le simulateur, avec et sans pertes."""
+
+import threading
+
+import pytest
+
+pytest.importorskip("serial")
+
+from initAndParkWave150i import (PipelinedUDPClient, ThreadSafeSerialClient,   # noqa: E402
+                                 ThreadSafeUDPClient)
+
+# lectures des deux axes; :j et :e ont la même longueur de réponse (6)
+MIXED = [":j1", ":f1", ":e1", ":X10003", ":j2", ":f2", ":e2", ":X20003"]
+
+
+def _expected(sim):
+    """Réponse de référence de chaque lecture de MIXED (axes à l'arrêt)."""
+    return {c: sim.handle(c)[1:] for c in MIXED}
+
+
+def _client(cls, conn, **kw):
+    c = cls(conn, **kw)
+    c.verbose = False
+    return c
+
+
+@pytest.mark.parametrize("cls", [ThreadSafeUDPClient, PipelinedUDPClient])
+def test_send_and_recv(sim, connection, cls):
+    client = _client(cls, connection(sim))
+    try:
+        assert client.send_and_recv(":e1") == (True, "0B3032", "")
+        ok, resp, err = client.send_and_recv(":f3")       # axe inconnu: erreur
+        assert not ok and resp is None
+        assert client.send_and_recv(":X1020000000000000000", expect_response=False)[0]
+    finally:
+        client.close()
+
+
+def test_concurrent_axes(sim, connection):
+    client = _client(PipelinedUDPClient, connection(sim), window=4)
+    ref = _expected(sim)
+    errors = []
+
+    def run(axis):
+        for _ in range(50):
+            for c in MIXED:
+                if c[2] == axis:
+                    ok, resp, err = client.send_and_recv(c)
+                    if not ok or resp != ref[c]:
+                        errors.append((c, resp, err))
+    threads = [threading.Thread(target=run, args=(a,)) for a in "12"]
+    try:
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+    finally:
+        client.close()
+    assert errors == []
+
+
+@pytest.mark.parametrize("cls", [ThreadSafeUDPClient, PipelinedUDPClient])
+def test_batch_pairing_under_loss(lossy_sim, connection, cls):
+    """Une réponse perdue ne doit jamais être remplacée par celle d'une autre commande."""
+    client = _client(cls, connection(lossy_sim))
+    ref = _expected(lossy_sim)
+    cmds = MIXED * 25
+    try:
+        results = client.send_batch(cmds, 8)
+    finally:
+        client.close()
+    assert [r[1] for r in results] == [ref[c] for c in cmds]
+    assert client.metrics.snapshot()["timeouts"] > 0
+
+
+def test_pipelined_window_keeps_reply_lengths_distinct(sim, connection):
+    client = _client(PipelinedUDPClient, connection(sim), window=8)
+    try:
+        futs = [client.submit(c) for c in [":j1", ":e1", ":f1", ":X10003"]]
+        ch = client._channels["1"]
+        with ch.lock:
+            lengths = [p.expected for p in ch.inflight]
+        assert len(lengths) == len(set(lengths))
+        assert all(f.result()[0] for f in futs)
+    finally:
+        client.close()
+
+
+def test_retry_timeout_backs_off_once_per_timeout(lossy_sim, connection):
+    client = _client(ThreadSafeUDPClient, connection(lossy_sim))
+    waits = []          # (tentative, délai d'attente de la réponse)
+    attempt_timeout = client._attempt_timeout
+
+    def record(safe, attempt):
+        waits.append((attempt, attempt_timeout(safe, attempt)))
+        return waits[-1][1]
+    client._attempt_timeout = record
+    try:
+        assert all(client.send_and_recv(":f1")[0] for _ in range(60))
+        timeouts = client.metrics.snapshot()["timeouts"]
+        assert timeouts > 0 and client.rtt.backoffs == timeouts
+        retried = [(prev, cur) for (_, prev), (n, cur) in zip(waits, waits[1:]) if n > 1]
+        assert len(retried) == timeouts
+        for prev, cur in retried:       # doublé une fois par timeout, pas plus
+            assert cur == pytest.approx(min(client.timeout, client.rtt.rto_max, 2 * prev))
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("window", [1, 2])
+def test_serial_client_on_pty(connection, window):
+    from simulWave150i import MountSimulator
+    s = MountSimulator(port=0, pty=True, latency=0.002, baud=115200).start()
+    ref = _expected(s)
+    client = _client(ThreadSafeSerialClient, connection(s, "USB", 115200), window=window)
+    try:
+        assert client.send_and_recv(":e1") == (True, "0B3032", "")
+        results = client.send_batch(MIXED * 5, 4)
+        assert [r[1] for r in results] == [ref[c] for c in MIXED * 5]
+    finally:
+        client.close()
+        s.stop()
+
+
+def test_detect_baudrate(connection):
+    from initAndParkWave150i import detect_baudrate
+    from simulWave150i import MountSimulator
+    s = MountSimulator(port=0, pty=True, baud=9600).start()
+    try:
+        assert detect_baudrate(s.pty_name) == 9600
+    finally:
+        s.stop()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import mountCodec
+
+
+def test_encode_normalizes_and_caches():
+    assert mountCodec.encode(" :f 1 ") == b":f1\r"
+    assert mountCodec.encode(":f1") is mountCodec.encode(":f1")
+    assert mountCodec.encode(b":e1\r") == b":e1\r"
+
+
+def test_encode_goto_in_place():
+    out = bytearray()
+    assert mountCodec.encode_goto("2", -1, out) == b":X204FFFFFFFF0000000000000000\r"
+    assert mountCodec.encode_goto("1", 0x1234, out) is out
+    assert bytes(out) == b":X10400001234" + b"0" * 16 + b"\r"
+
+
+def test_decode_reply():
+    assert mountCodec.decode_reply(b"=0B3032\r", 8) == (True, "0B3032")
+    assert mountCodec.decode_reply(bytearray(b"=\r\n"), 3) == (True, "")
+    assert mountCodec.decode_reply(b"!0\r", 3) == (False, None)
+    assert mountCodec.decode_reply(b"", 0) == (False, None)
+
+
+def test_int32():
+    assert mountCodec.int32("00000010") == 16
+    assert mountCodec.int32("FFFFFFFF") == -1
+    assert mountCodec.int32(b"80000000") == -0x80000000
+
+
+def test_retry_safe():
+    enc = mountCodec.encode
+    assert mountCodec.retry_safe(enc(":f1"))
+    assert mountCodec.retry_safe(enc(":X10003"))
+    assert mountCodec.retry_safe(enc(":X1010000100"))
+    assert mountCodec.retry_safe(enc(":X1020000000000000000"))      # arrêt
+    assert not mountCodec.retry_safe(enc(":X102FFFFFFFFF7356915"))   # slew
+    assert not mountCodec.retry_safe(bytes(mountCodec.encode_goto("1", 10)))
+    assert not mountCodec.retry_safe(enc(":W1080000"))
+
+
+def test_reply_length():
+    enc = mountCodec.encode
+    assert mountCodec.reply_length(enc(":f1")) == 3
+    assert mountCodec.reply_length(enc(":e2")) == 6
+    assert mountCodec.reply_length(enc(":X10003")) == 8
+    assert mountCodec.reply_length(enc(":X1000B")) == 8
+    assert mountCodec.reply_length(bytes(mountCodec.encode_goto("1", 10))) == 0
+    assert mountCodec.reply_length(enc(":X10F")) is None
+    assert mountCodec.reply_length(enc(":X10501")) is None      # non vérifiée
+    assert mountCodec.reply_length(enc(":b1")) is None
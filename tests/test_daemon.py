@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Démon local: partage de la liaison et regroupement des lectures."""
+
+import os
+import tempfile
+import threading
+
+import pytest
+
+pytest.importorskip("serial")
+
+from mountDaemon import DaemonClient, MountDaemon     # noqa: E402
+
+
+@pytest.fixture
+def daemon(sim, connection):
+    path = os.path.join(tempfile.mkdtemp(), "w150.sock")     # chemin Unix court
+    d = MountDaemon(connection(sim), path).start()
+    yield d
+    d.stop()
+    os.rmdir(os.path.dirname(path))
+
+
+def test_identical_reads_are_coalesced(daemon):
+    a, b = daemon.submit(":f1"), daemon.submit(":f1")
+    assert a is b and daemon.coalesced == 1
+    assert a.result()[0]
+    assert daemon.submit(":f1") is not a      # plus en vol: renvoyée
+
+
+def test_write_separates_reads(daemon):
+    a = daemon.submit(":X10003")
+    daemon.submit(":X1020000000000000000", expect_response=False)
+    b = daemon.submit(":X10003")
+    assert a is not b and daemon.coalesced == 0
+    assert a.result()[0] and b.result()[0]
+
+
+def test_clients_share_the_link(daemon, sim):
+    clients = [DaemonClient(daemon.path) for _ in range(3)]
+    try:
+        for c in clients:
+            c.verbose = False
+        assert clients[0].mount_id == daemon.mount
+        results = {}
+
+        def run(i, c):
+            results[i] = c.send_batch([":e1", ":f1", ":X20003"] * 5)
+        threads = [threading.Thread(target=run, args=(i, c)) for i, c in enumerate(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        want = [sim.handle(c)[1:] for c in (":e1", ":f1", ":X20003")] * 5
+        assert all([r[1] for r in results[i]] == want for i in range(3))
+        assert clients[1].send_and_recv(":K1", expect_response=False) == (True, None, "")
+        ok, stats, _ = clients[2].submit("?stats").result()
+        assert ok and "clients=3" in stats
+    finally:
+        for c in clients:
+            c.close()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Découverte des montures simulées (UDP sur la boucle locale, pty)."""
+
+import pytest
+
+pytest.importorskip("serial")
+
+import mountDiscovery   # noqa: E402
+from simulWave150i import MountSimulator     # noqa: E402
+
+
+def test_broadcast_address():
+    assert mountDiscovery.broadcast_address("192.168.4.0/24") == "192.168.4.255"
+    assert mountDiscovery.broadcast_address("127.0.0.1/32") == "127.0.0.1"
+
+
+def test_discover_udp_finds_each_mount(sim):
+    other = MountSimulator(port=0, latency=0.002, seed=3).start()
+    try:
+        found = mountDiscovery.discover_udp(["127.0.0.1/32"], [sim.port, other.port], 0.2)
+    finally:
+        other.stop()
+    assert sorted(f.port for f in found) == sorted([sim.port, other.port])
+    f = found[0]
+    assert f.iface == "UDP" and f.firmware == "0B3032" and 0 < f.rtt < 0.2
+    assert f.address == f"127.0.0.1:{f.port}"
+    assert (f.connection().MOUNT_IP, f.connection().MOUNT_PORT) == ("127.0.0.1", f.port)
+
+
+def test_probe_serial_tries_each_rate():
+    s = MountSimulator(port=0, pty=True, latency=0.002, seed=4, baud=9600).start()
+    try:
+        f = mountDiscovery.probe_serial(s.pty_name, (115200, 9600))
+    finally:
+        s.stop()
+    assert f is not None and f.iface == "USB" and f.baud == 9600
+    assert f.address == s.pty_name
+
+
+def test_serial_candidates_skip_acm_unless_asked(monkeypatch):
+    ports = ["/dev/ttyUSB0", "/dev/ttyACM0"]
+    monkeypatch.setattr(mountDiscovery.glob, "glob",
+                        lambda pattern: [p for p in ports if mountDiscovery.fnmatch.fnmatch(p, pattern)])
+    assert mountDiscovery.serial_candidates() == ["/dev/ttyUSB0"]
+    assert mountDiscovery.serial_candidates(
+        mountDiscovery.SERIAL_PATTERNS + (mountDiscovery.ACM_PATTERN,)) == ports[::-1]
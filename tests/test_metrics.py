@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Mesures par type de commande et leurs sorties."""
+
+import json
+import urllib.request
+
+import pytest
+
+import mountMetrics
+from mountMetrics import ClientMetrics, Histogram, command_type
+
+
+def test_command_type():
+    assert command_type(b":f1\r") == ":f"
+    assert command_type(b":X10003\r") == ":X0003"
+    assert command_type(b":X10400000010" + b"0" * 16 + b"\r") == ":X04"
+
+
+def test_histogram_quantiles():
+    h = Histogram()
+    for v in [0.0008] * 90 + [0.03] * 10:
+        h.observe(v)
+    assert h.quantile(0.5) == 0.001 and h.quantile(0.99) == 0.03
+    s = h.summary()
+    assert s["count"] == 100 and s["buckets"] == {"0.001": 90, "0.05": 10}
+
+
+def test_record_and_outputs(tmp_path):
+    m = ClientMetrics()
+    m.record(b":f1\r", 0.002, True, received=5, wait=0.0001, channel="1")
+    m.record(b":f2\r", None, False, attempts=3, timeouts=2, channel="2")
+    m.record(b":X10003\r", 0.004, True, received=10)
+    s = m.snapshot()
+    assert (s["requests"], s["failures"], s["timeouts"], s["retries"]) == (3, 1, 2, 2)
+    assert s["commands"][":f"]["latency"]["count"] == 1
+    assert s["bytes_sent"] == 4 + 3 * 4 + 8 and s["bytes_received"] == 15
+    assert list(s["wait_by_channel"]) == ["1"]
+    text = m.prometheus(labels={"mount": "m1"})
+    assert 'wave150i_timeouts_total{cmd=":f",mount="m1"} 2' in text
+    assert 'wave150i_latency_seconds_bucket{cmd=":X0003",mount="m1",le="+Inf"} 1' in text
+    dumper = mountMetrics.JsonDumper(m, str(tmp_path / "m.json"), period=60).start()
+    dumper.stop()
+    assert json.loads((tmp_path / "m.json").read_text())["requests"] == 3
+
+
+def test_client_metrics_against_simulator(sim, connection):
+    from initAndParkWave150i import make_client
+    client = make_client(connection(sim), pipeline=True)
+    client.verbose = False
+    try:
+        client.send_batch([":f1", ":f2", ":X10003"] * 4, 3)
+        s = client.metrics.snapshot()
+    finally:
+        client.close()
+    assert s["requests"] == 12 and s["failures"] == 0
+    assert s["commands"][":f"]["requests"] == 8 and s["rtt"]["srtt_ms"] > 0
+
+
+def test_prometheus_endpoint():
+    m = ClientMetrics()
+    m.record(b":e1\r", 0.001, True)
+    server = mountMetrics.serve_prometheus(m, 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=2) as r:
+            body = r.read().decode()
+    finally:
+        server.shutdown()
+    assert 'wave150i_requests_total{cmd=":e"} 1' in body
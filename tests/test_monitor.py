@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Moniteur de statut partagé contre le simulateur."""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+
+import mountMonitor     # noqa: E402
+import mountStatus      # noqa: E402
+from initAndParkWave150i import make_client     # noqa: E402
+
+
+@pytest.fixture
+def client(sim, connection):
+    c = make_client(connection(sim), pipeline=True)
+    c.verbose = False
+    yield c
+    c.close()
+
+
+class FailingClient:
+    """Client dont chaque envoi lève une exception."""
+
+    def send_and_recv(self, cmd, expect_response=True):
+        raise OSError("link down")
+
+
+def test_waiters_share_one_poll(client):
+    with mountMonitor.StatusMonitor(client, period=0.02) as monitor:
+        events = [monitor.stopped("1") for _ in range(10)]
+        assert all(ev.wait(2.0) for ev in events)
+        stats = monitor.stats()
+    assert mountStatus.test(events[0].resp, "Stopped")
+    assert stats["polls"] == stats["rounds"]        # une seule commande par tour
+    assert stats["failed_rounds"] == 0
+
+
+def test_group_subscription_gets_one_round(client):
+    got = []
+    done = threading.Event()
+
+    def callback(updates):
+        got.append(updates)
+        done.set()
+    with mountMonitor.StatusMonitor(client, period=0.02) as monitor:
+        sub = monitor.subscribe((":f1", ":f2"), callback)
+        assert done.wait(2.0)
+        sub.cancel()
+        assert monitor.stats()["subscribers"] == 0
+    updates = got[0]
+    assert [u.cmd for u in updates] == [":f1", ":f2"]
+    assert all(u.ok for u in updates) and updates[0].t == updates[1].t
+
+
+def test_cadence_sets_the_poll_delay(client):
+    delays = iter([0.01, 0.2, 0.2, 0.2])
+    with mountMonitor.StatusMonitor(client, period=0.01) as monitor:
+        ev = monitor.when(":f1", lambda resp: False, cadence=lambda: next(delays))
+        time.sleep(0.3)
+        ev.cancel()
+        rounds = monitor.stats()["rounds"]
+    assert 2 <= rounds <= 4
+
+
+def test_failing_client_stops_monitor_and_waiters():
+    failed = []
+    with mountMonitor.StatusMonitor(FailingClient(), period=0.01) as monitor:
+        monitor.subscribe(":f1", failed.append)
+        ev = monitor.stopped("1")
+        assert ev.wait(2.0)
+        assert isinstance(ev.error, mountMonitor.MonitorStopped)
+        with pytest.raises(mountMonitor.MonitorStopped):
+            monitor.wait(":f1", lambda resp: True, timeout=1.0)
+        stats = monitor.stats()
+    assert stats["failed_rounds"] == mountMonitor.MAX_FAILED_ROUNDS
+    assert failed and not failed[0].ok and failed[0].resp is None
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Initialisation et parking complets contre le simulateur."""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("serial")
+
+import mountMonitor     # noqa: E402
+import mountState       # noqa: E402
+import parkAxis         # noqa: E402
+from initAndParkWave150i import make_client, park_axes, run_initialization   # noqa: E402
+
+PARKED = {"1": "FFC4D200", "2": "0035CA00"}     # parkEncoderPosition SynScan
+
+
+@pytest.fixture
+def client(sim, connection):
+    c = make_client(connection(sim), pipeline=True)
+    c.verbose = False
+    yield c
+    c.close()
+
+
+def _positions(client):
+    return {a: client.send_and_recv(f":X{a}0003")[1] for a in "12"}
+
+
+def test_init_then_park(client):
+    assert run_initialization("SynScan", client)
+    assert run_initialization("SynScan", client)      # déjà initialisée
+    assert park_axes("SynScan", client, threading.Event()) == []
+    assert _positions(client) == PARKED
+
+
+def test_park_both_single_thread(client):
+    assert run_initialization("SynScan", client)
+    ctxs, errors = parkAxis.park_both(client, "SynScan")
+    assert errors == []
+    assert [s for s, _ in ctxs["Axis1"].timings] == [s for s, _ in parkAxis.PARK_PLAN]
+    assert _positions(client) == PARKED
+
+
+def test_park_on_monitor(client):
+    assert run_initialization("SynScan", client)
+    with mountMonitor.StatusMonitor(client) as monitor:
+        assert park_axes("SynScan", client, threading.Event(), monitor=monitor) == []
+    assert _positions(client) == PARKED
+
+
+def test_quick_park_with_known_frame(client, tmp_path):
+    state = mountState.MountStateCache(tmp_path / "state.json")
+    assert run_initialization("SynScan", client, state)
+    assert park_axes("SynScan", client, threading.Event(), state) == []
+    ctx = parkAxis.park_axis(client, "Axis1", "SynScan", plan=parkAxis.QUICK_PARK_PLAN)
+    assert [s for s, _ in ctx.timings] == ["stop", "goto_park_position", "stop"]
+    assert state.check(client, "Axis1", "SynScan")[0]
+
+
+def test_stop_event_interrupts_park(client):
+    assert run_initialization("SynScan", client)
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    errors = park_axes("SynScan", client, stop)
+    assert len(errors) == 2 and all("interrupted" in e for e in errors)
+
+
+def test_async_park_runs_shared_steps(sim):
+    asyncWave150i = pytest.importorskip("asyncWave150i")
+    from initAndParkWave150i import Connection
+
+    async def main():
+        c = await asyncWave150i.AsyncUDPClient.create(
+            Connection("UDP", host="127.0.0.1", port=sim.port))
+        c.verbose = False
+        try:
+            assert await asyncWave150i.init_mount("SynScan", c)
+            ctxs = await asyncio.gather(asyncWave150i.park_axis(c, "SynScan", "Axis1"),
+                                        asyncWave150i.park_axis(c, "SynScan", "Axis2"))
+            return ctxs, [await c.send_and_recv(f":X{a}0003") for a in "12"]
+        finally:
+            await c.close()
+
+    ctxs, pos = asyncio.run(main())
+    assert [s for s, _ in ctxs[0].timings] == [s for s, _ in parkAxis.PARK_PLAN]
+    assert [r[1] for r in pos] == [PARKED["1"], PARKED["2"]]
+
+
+def test_step_rate_is_learnt_per_client():
+    class Client:
+        pass
+    a, b = Client(), Client()
+    sched = parkAxis.PollScheduler(":f1", 1000, client=a)
+    sched.t0 -= 1.0                 # goto d'une seconde
+    sched.done()
+    assert parkAxis.PollScheduler(":f1", 1000, client=a).predicted == pytest.approx(1.0, rel=0.1)
+    assert parkAxis.PollScheduler(":f1", 1000, client=b).predicted is None
+
+
+@pytest.mark.parametrize("iface", ["UDP", "USB"])
+def test_async_client_skips_late_replies(iface, connection):
+    asyncWave150i = pytest.importorskip("asyncWave150i")
+    from simulWave150i import MountSimulator
+    slow = MountSimulator(port=0, pty=iface == "USB", latency=0.03, seed=5).start()
+    cls = asyncWave150i.AsyncUDPClient if iface == "UDP" else asyncWave150i.AsyncSerialClient
+
+    async def main():
+        c = await cls.create(connection(slow, iface, 115200))
+        c.verbose = False
+        try:
+            c.timeout = 0.01            # les deux envois de :X10003 expirent
+            lost = await c.send_and_recv(":X10003")
+            c.timeout = 1.0             # leurs réponses arrivent pendant :f1
+            return lost, await c.send_and_recv(":f1")
+        finally:
+            await c.close()
+    try:
+        lost, got = asyncio.run(main())
+    finally:
+        slow.stop()
+    assert not lost[0] and "timeout" in lost[2]
+    assert got == (True, slow.handle(":f1")[1:], "")
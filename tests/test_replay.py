@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Rejeu rapide de piloteDepuisFichierWave150 contre le simulateur."""
+
+import csv
+import sys
+
+import pytest
+
+pytest.importorskip("serial")
+
+import mountCapture     # noqa: E402
+import piloteDepuisFichierWave150 as pilote     # noqa: E402
+from initAndParkWave150i import PipelinedUDPClient     # noqa: E402
+
+LINES = [":e1<cr>", ":f1<cr>", ":X10003<cr>", "WAIT 0.05", ":j2<cr>", ":f2<cr>",
+         ":X20003<cr>", ":f3<cr>"] * 10
+
+
+def _rows(path):
+    with path.open(newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_replay_fast_logs_in_file_order(lossy_sim, connection, tmp_path):
+    steps = pilote.compile_commands(pilote.load_commands_from_lines(LINES))
+    conn = connection(lossy_sim)
+    client = PipelinedUDPClient(conn, window=8)
+    client.verbose = False
+    log = pilote.CsvLogWriter(tmp_path / "log.csv")
+    log.start()
+    try:
+        res = pilote.replay_fast(steps, client, log, 8)
+    finally:
+        log.close()
+        client.close()
+    rows = _rows(tmp_path / "log.csv")
+    assert [r["cmdline_raw"] for r in rows] == LINES
+    sent = [r for r in rows if r["directive"] == "SEND"]
+    assert res["sent"] == len(sent) == 70 and res["failed"] == 10     # :f3 en erreur
+    for r in sent:
+        cmd = r["payload_sent"].replace("<CR>", "")
+        if r["ok"] == "True":
+            assert r["response_text"] == lossy_sim.handle(cmd)
+    planned = [float(r["planned_ms"]) for r in sent]
+    assert planned == sorted(planned)
+
+
+def test_fast_with_capture(sim, tmp_path, monkeypatch):
+    cmdfile = tmp_path / "cmds.txt"
+    cmdfile.write_text("\n".join(LINES[:8]) + "\n", encoding="utf-8")
+    out, cap = tmp_path / "log.csv", tmp_path / "s.cap"
+    monkeypatch.setattr(sys, "argv", ["pilote", "127.0.0.1", str(sim.port), str(cmdfile),
+                                      "--fast", "--capture", str(cap), "--out", str(out)])
+    pilote.main()
+    sent = [r for r in _rows(out) if r["directive"] == "SEND"]
+    with mountCapture.CaptureReader(cap) as reader:
+        assert len(reader) == 2 * len(sent) == 14
+        assert mountCapture.to_csv(reader, tmp_path / "cap.csv") == 7
+    from_cap = _rows(tmp_path / "cap.csv")
+    assert [r["payload_sent"] for r in from_cap] == [r["payload_sent"] for r in sent]
+    assert [r["ok"] for r in from_cap] == [r["ok"] for r in sent] == ["True"] * 6 + ["False"]
+    assert [r["response_text"] for r in from_cap[:6]] == [r["response_text"] for r in sent[:6]]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from mountRtt import RTO_MIN, RttEstimator
+
+
+def test_first_sample():
+    rtt = RttEstimator(initial=1.0, rto_max=1.0)
+    assert rtt.rto() == 1.0
+    rtt.sample(0.1)
+    assert rtt.srtt == 0.1 and rtt.rttvar == 0.05
+    assert rtt.rto() == pytest.approx(0.1 + 4 * 0.05)
+
+
+def test_bounds():
+    rtt = RttEstimator(initial=1.0, rto_max=0.5)
+    for _ in range(50):
+        rtt.sample(0.001)
+    assert rtt.rto() == RTO_MIN
+    for _ in range(10):
+        rtt.sample(2.0)
+    assert rtt.rto() == 0.5
+
+
+def test_backoff_doubles_until_next_sample():
+    rtt = RttEstimator(initial=1.0, rto_max=1.0)
+    for _ in range(30):
+        rtt.sample(0.01)
+    rto = rtt.rto()
+    rtt.backoff()
+    assert rtt.rto() == pytest.approx(2 * rto)
+    rtt.backoff()
+    assert rtt.rto() == pytest.approx(4 * rto)
+    rtt.sample(0.01)
+    assert rtt.rto() == pytest.approx(rto, rel=0.2)
+    assert rtt.snapshot()["backoffs"] == 2
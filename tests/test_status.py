@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import mountStatus
+
+
+def test_decode_table():
+    st = mountStatus.decode("111")
+    assert st.running and st.tracking and st.init_done
+    assert not st.blocked and not st.ccw
+    assert st.is_("Running") and not st.is_("Stopped")
+    assert mountStatus.decode("001").describe().startswith("Goto | CW | Slow | Stopped")
+
+
+def test_test_flags():
+    assert mountStatus.test("101", "InitDone")
+    assert mountStatus.test("100", "NotInit")
+    with pytest.raises(ValueError):
+        mountStatus.test("100", "Parked")
+
+
+def test_compile_condition():
+    stopped = mountStatus.compile_condition("Stopped and InitDone")
+    assert stopped("101") and not stopped("111")
+    near = mountStatus.compile_condition("abs(h2i(resp) - 100) < 5")
+    assert near("00000062") and not near("FFFFFF9C")
+    assert mountStatus.compile_condition("value < 0")("FFFFFFFE")
+    assert mountStatus.compile_condition("resp[0:2] == 'AB'")("ABCD")
+
+
+@pytest.mark.parametrize("text", ["__import__('os')", "resp.upper()", "open('x')",
+                                  "[c for c in resp]", "unknown > 1",
+                                  "value << 4000000 > 0", "resp * 1000000000",
+                                  "value ** 1000000"])
+def test_compile_condition_rejects(text):
+    with pytest.raises(ValueError):
+        mountStatus.compile_condition(text)
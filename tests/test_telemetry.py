@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Tampon circulaire et échantillonneur de télémétrie."""
+
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+
+import mountMonitor     # noqa: E402
+from initAndParkWave150i import make_client     # noqa: E402
+from telemetryWave150i import RECORD, TelemetryRing, TelemetrySampler, read_telemetry  # noqa: E402
+
+
+@pytest.fixture
+def client(sim, connection):
+    c = make_client(connection(sim), pipeline=True)
+    c.verbose = False
+    yield c
+    c.close()
+
+
+def test_ring_wraps_and_counts_dropped():
+    ring = TelemetryRing(capacity=4)
+    for i in range(3):
+        ring.push(float(i), i, -i, 0x101, 0x101, 0xF)
+    assert [r[0] for r in RECORD.iter_unpack(ring.drain())] == [0.0, 1.0, 2.0]
+    assert ring.drain() == b""
+    for i in range(3, 9):           # 6 de plus: 2 écrasés
+        ring.push(float(i), i, -i, 0, 0, 0)
+    assert [r[0] for r in RECORD.iter_unpack(ring.drain())] == [5.0, 6.0, 7.0, 8.0]
+    assert ring.dropped == 2
+
+
+def test_sampler_records_both_axes(client, sim, tmp_path):
+    path = tmp_path / "s.tlm"
+    sampler = TelemetrySampler(client, path, rate=100.0, flush_every=0.05).start()
+    time.sleep(0.3)
+    sampler.stop()
+    recs = list(read_telemetry(path))
+    assert len(recs) == sampler.samples > 5
+    t, pos1, pos2, st1, st2, valid = recs[-1]
+    assert valid == 0xF
+    assert f"{pos1 & 0xFFFFFFFF:08X}" == sim.handle(":X10003")[1:]
+    assert f"{st2:03X}" == sim.handle(":f2")[1:]
+    assert all(b[0] > a[0] for a, b in zip(recs, recs[1:]))
+
+
+def test_sampler_on_monitor(client, tmp_path):
+    path = tmp_path / "m.tlm"
+    with mountMonitor.StatusMonitor(client) as monitor:
+        sampler = TelemetrySampler(client, path, rate=50.0, monitor=monitor).start()
+        time.sleep(0.3)
+        sampler.stop()
+        polls = monitor.stats()["polls"]
+    recs = list(read_telemetry(path))
+    assert recs and all(r[5] == 0xF for r in recs)
+    assert 4 * len(recs) <= polls <= 4 * (len(recs) + 1)     # un tour de 4 commandes par échantillon